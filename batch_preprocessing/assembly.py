@@ -0,0 +1,89 @@
+"""
+Single-pass assembly of the pipeline's output table.
+
+Each stage returns one result per distinct key: canonical names per mention,
+context analyses per (mention, context) pair, URIs per canonical name. Instead of
+joining stage DataFrames with pandas merges (which copy the frames and multiply rows
+when a key repeats), each input row is mapped to the id of its distinct (mention,
+context) pair, the stage results are joined once per pair through dict indexes, and
+every output column is gathered from its per-pair values by row id. The output has
+exactly one row per input record, in input order.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = [
+    'mention', 'context', 'canonical_name', 'entity_type', 'confidence', 'keywords', 'description', 'dbpedia_uri'
+]
+ANALYSIS_FIELDS = ('entity_type', 'confidence', 'keywords', 'description')
+
+
+def index_rows(rows: Iterable[Dict[str, Any]], key: Callable[[Dict[str, Any]], Hashable]) -> Dict[Hashable, Dict[str, Any]]:
+    """Index rows by key; the first row for a key wins, as in dedupe_first."""
+    index: Dict[Hashable, Dict[str, Any]] = {}
+    for row in rows:
+        index.setdefault(key(row), row)
+    return index
+
+
+def assemble_results(
+    entity_contexts: List[Dict[str, str]],
+    analysis_rows: Iterable[Dict[str, Any]],
+    dbpedia_rows: Iterable[Dict[str, Any]],
+    canonical_rows: Optional[Iterable[Dict[str, Any]]] = None
+) -> pd.DataFrame:
+    """
+    Build the final result table with one row per input record.
+    Args:
+        entity_contexts: Input records with 'mention' and 'context' (defines the output rows and their order).
+        analysis_rows: Context analysis rows (or fused rows) with 'mention', 'context' and the analysis fields.
+        dbpedia_rows: Rows with 'canonical_name' and 'dbpedia_uri'; a name's first non-null URI is used.
+        canonical_rows: Rows with 'mention' and 'canonical_name'; if None (fused mode), the canonical
+            name is taken from analysis_rows.
+    Returns:
+        DataFrame with RESULT_COLUMNS and len(entity_contexts) rows; missing stage results are null.
+    """
+    # Row id -> distinct (mention, context) pair: the only per-row work done in Python
+    pair_ids: Dict[Tuple[Any, Any], int] = {}
+    codes = np.fromiter(
+        (pair_ids.setdefault((record['mention'], record['context']), len(pair_ids)) for record in entity_contexts),
+        dtype=np.int64, count=len(entity_contexts)
+    )
+    pairs = list(pair_ids)
+    del pair_ids
+
+    # Every output column is a per-pair value, joined per pair and then gathered by row
+    analyses = index_rows(analysis_rows, key=lambda r: (r.get('mention'), r.get('context')))
+    empty: Dict[str, Any] = {}
+    found = [analyses.get(pair, empty) for pair in pairs]
+    del analyses
+    if canonical_rows is not None:
+        canonical_names = index_rows(canonical_rows, key=lambda r: r.get('mention'))
+        names = [canonical_names.get(mention, empty).get('canonical_name') for mention, _ in pairs]
+        del canonical_names
+    else:
+        names = [analysis.get('canonical_name') for analysis in found]
+    uris: Dict[Any, Any] = {}
+    for row in dbpedia_rows:
+        if uris.get(row.get('canonical_name')) is None:
+            uris[row.get('canonical_name')] = row.get('dbpedia_uri')
+
+    per_pair = {
+        'mention': [mention for mention, _ in pairs],
+        'context': [context for _, context in pairs],
+        'canonical_name': names,
+        **{field: [analysis.get(field) for analysis in found] for field in ANALYSIS_FIELDS},
+        'dbpedia_uri': [uris.get(name) if name is not None else None for name in names],
+    }
+    del found, names, uris
+    # Dtypes are inferred on the per-pair values (so strings are converted once per pair) and
+    # columns are gathered one at a time so only one row-length temporary is alive at once
+    result = pd.DataFrame(index=pd.RangeIndex(len(entity_contexts)))
+    for name in RESULT_COLUMNS:
+        values = np.empty(len(pairs), dtype=object)
+        for i, value in enumerate(per_pair.pop(name)):  # element-wise so list values (keywords) stay lists
+            values[i] = value
+        result[name] = pd.Series(values).infer_objects().array.take(codes)
+    return result
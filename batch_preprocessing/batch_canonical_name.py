@@ -1,64 +1,150 @@
-import math
+import logging
 import json
 import re
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Tuple, Union, Optional
 import pandas as pd
-from hybrid_linking.gemini_api import call_gemini
+from hybrid_linking.gemini_api import call_gemini, invalidate_gemini_response
+from batch_preprocessing.chunking import split_into_chunks, map_chunks, dedupe_first
+from batch_preprocessing.stats import StageStats
+from batch_preprocessing.checkpoint import RunJournal
+from batch_preprocessing.bisection import run_with_bisection
+from hybrid_linking.fuzzy_index import FuzzyLabelIndex
+from hybrid_linking.columnar import ColumnBatch
+
+logger = logging.getLogger(__name__)
+
+# Column kinds of the columnar output (see hybrid_linking.columnar)
+COLUMNS = {"mention": "str", "canonical_name": "str"}
+
+
+def resolve_from_label_index(
+    mentions: List[str],
+    label_index: Optional[FuzzyLabelIndex],
+    threshold: float = 0.9
+) -> Tuple[List[Dict], List[str]]:
+    """
+    Resolve mentions whose best label index match scores at least threshold, without an LLM call.
+    Returns:
+        (results for the resolved mentions, mentions still to be sent to Gemini)
+    """
+    if label_index is None:
+        return [], list(mentions)
+    resolved = []
+    remaining = []
+    for mention in mentions:
+        matches = label_index.search(mention, limit=1, min_score=threshold)
+        if matches:
+            resolved.append({"mention": mention, "canonical_name": matches[0].label})
+        else:
+            remaining.append(mention)
+    return resolved, remaining
+
+
+def _parse_json_list(response: str) -> List[Dict]:
+    """Extract the JSON list of result objects from a Gemini response (raises ValueError if there is none)."""
+    match = re.search(r'\[.*\]', response, re.DOTALL)
+    results = json.loads(match.group() if match else response)
+    if not isinstance(results, list):
+        raise ValueError(f"Expected a JSON list, got {type(results).__name__}")
+    return [r for r in results if isinstance(r, dict)]
+
+
+def _normalize_mentions(batch: List[str], stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Send one list of mentions to Gemini and parse the results. Raises if the call fails
+    or the response cannot be parsed (the cached response is dropped in that case).
+    """
+    prompt = (
+        "Given the following list of entity mentions, return the canonical DBpedia name for each. "
+        "Respond as a JSON list of objects with fields 'mention' and 'canonical_name'.\n\n"
+        "Entities:\n" +
+        "\n".join(f"- {e}" for e in batch)
+    )
+    response = call_gemini(prompt, on_retry=stats.record_retry if stats is not None else None)
+    try:
+        return _parse_json_list(response)
+    except Exception:
+        invalidate_gemini_response(prompt)
+        raise
+
+
+def _normalize_chunk(batch: List[str], i: int, n_chunks: int, journal: Optional[RunJournal] = None,
+                     stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Send one chunk of mentions to Gemini and return one result per mention (None on failure).
+    Transient errors are retried; a chunk that keeps failing is bisected until the mentions
+    causing the failure are isolated, and only those are set to None.
+    If a journal is given, chunks it already holds are restored instead of sent, and
+    fully successful chunks are recorded in it.
+    """
+    if journal is not None:
+        restored = journal.get("canonical", batch)
+        if restored is not None:
+            logger.debug("Restored batch %d/%s from run %s.", i + 1, n_chunks, journal.run_id)
+            return restored
+    logger.debug("Processing batch %d/%s (%d names)...", i + 1, n_chunks, len(batch))
+    batch_results, gave_up = run_with_bisection(
+        batch,
+        lambda items: _normalize_mentions(items, stats),
+        item_key=lambda e: e,
+        result_key=lambda r: r.get("mention"),
+        fallback=lambda e: {"mention": e, "canonical_name": None},
+        align=lambda r, e: {**r, "mention": e},
+        stats=stats
+    )
+    if gave_up:
+        logger.error("Gemini batch %d: gave up on %d of %d names", i + 1, gave_up, len(batch))
+    if journal is not None and not gave_up:
+        journal.record("canonical", batch, batch_results)
+    logger.debug("Completed batch %d/%s.", i + 1, n_chunks)
+    return batch_results
+
 
 def batch_canonical_name_normalization(
     entities: List[str],
     chunk_size: int = 20,
-    output_format: str = "dataframe"
-) -> Union[pd.DataFrame, List[Dict], str]:
+    output_format: str = "dataframe",
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None,
+    journal: Optional[RunJournal] = None,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9
+) -> Union[pd.DataFrame, List[Dict], str, ColumnBatch]:
     """
     Batch canonical name normalization using Gemini, with chunking, progress, and robust error handling.
+    Each distinct mention is sent to Gemini once, however often it appears in the input.
     Args:
         entities: List of entity mentions.
         chunk_size: Max number of entities per Gemini call (default: 20).
-        output_format: 'dataframe', 'json', or 'list'.
+        output_format: 'dataframe', 'json', 'list', or 'columnar' (a ColumnBatch).
+        max_workers: Number of chunks sent to Gemini concurrently (default: 1, sequential).
+        stats: Optional StageStats to record chunk timings in.
+        journal: Optional RunJournal used to skip chunks completed by an earlier run and record new ones.
+        label_index: Optional FuzzyLabelIndex; mentions matching a label with similarity >= index_threshold
+            take that label as canonical name and are not sent to Gemini.
+        index_threshold: Minimum similarity for a label index match to be accepted (default: 0.9).
     Returns:
-        DataFrame, JSON string, or list of dicts with 'mention' and 'canonical_name'.
+        DataFrame, JSON string, or list of dicts with 'mention' and 'canonical_name' (one per distinct mention).
     """
-    results = []
-    total = len(entities)
-    n_chunks = math.ceil(total / chunk_size)
-    for i in range(n_chunks):
-        batch = entities[i * chunk_size : (i + 1) * chunk_size]
-        print(f"[PROGRESS] Processing batch {i+1}/{n_chunks} ({len(batch)} names)...")
-        prompt = (
-            "Given the following list of entity mentions, return the canonical DBpedia name for each. "
-            "Respond as a JSON list of objects with fields 'mention' and 'canonical_name'.\n\n"
-            "Entities:\n" +
-            "\n".join(f"- {e}" for e in batch)
-        )
-        try:
-            response = call_gemini(prompt)
-            match = re.search(r'\[.*\]', response, re.DOTALL)
-            if match:
-                batch_results = json.loads(match.group())
-            else:
-                batch_results = json.loads(response)
-        except Exception as e:
-            print(f"[ERROR] Gemini batch failed for batch {i+1}: {e}")
-            batch_results = [{"mention": e, "canonical_name": None} for e in batch]
-        # Ensure all batch entities are present
-        mention_set = set(batch)
-        found_mentions = {r["mention"] for r in batch_results if "mention" in r}
-        for missing in mention_set - found_mentions:
-            batch_results.append({"mention": missing, "canonical_name": None})
-        results.extend(batch_results)
-        print(f"[PROGRESS] Completed batch {i+1}/{n_chunks}.")
+    stats = stats if stats is not None else StageStats("canonical")
+    stats.start()
+    unique_entities = list(dict.fromkeys(entities))
+    stats.record_dedup(len(entities), len(unique_entities), chunk_size)
+    resolved, remaining = resolve_from_label_index(unique_entities, label_index, index_threshold)
+    stats.record_index_hits(len(unique_entities), len(remaining), chunk_size)
+    chunks = split_into_chunks(remaining, chunk_size)
+    n_chunks = len(chunks)
+    chunk_results = map_chunks(lambda i, batch: _normalize_chunk(batch, i, n_chunks, journal, stats), chunks, max_workers, stats)
+    results = resolved + [r for batch_results in chunk_results for r in batch_results]
     # Remove duplicates (keep first occurrence)
-    seen = set()
-    deduped = []
-    for r in results:
-        key = r["mention"]
-        if key not in seen:
-            deduped.append(r)
-            seen.add(key)
-    if output_format == "dataframe":
+    deduped = dedupe_first(results, key=lambda r: r["mention"])
+    stats.finish()
+    logger.info("%s", stats.summary())
+    if output_format == "columnar":
+        return ColumnBatch.from_records(deduped, COLUMNS)
+    elif output_format == "dataframe":
         return pd.DataFrame(deduped)
     elif output_format == "json":
         return json.dumps(deduped, indent=2)
     else:
-        return deduped 
\ No newline at end of file
+        return deduped
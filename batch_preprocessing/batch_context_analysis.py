@@ -1,67 +1,114 @@
-import math
+import logging
 import json
-import re
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Optional
 import pandas as pd
-from hybrid_linking.gemini_api import call_gemini
+from hybrid_linking.gemini_api import call_gemini, invalidate_gemini_response
+from hybrid_linking.columnar import ColumnBatch
+from batch_preprocessing.chunking import split_into_chunks, map_chunks, dedupe_first
+from batch_preprocessing.stats import StageStats
+from batch_preprocessing.checkpoint import RunJournal
+from batch_preprocessing.bisection import run_with_bisection
+from batch_preprocessing.batch_canonical_name import _parse_json_list
+
+logger = logging.getLogger(__name__)
+
+# Column kinds of the columnar output (see hybrid_linking.columnar)
+COLUMNS = {"mention": "str", "context": "str", "entity_type": "category", "confidence": "float",
+           "keywords": "object", "description": "str"}
+
+
+def _analyze_pairs(batch: List[Dict[str, str]], stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Send one list of mention/context pairs to Gemini and parse the results. Raises if the
+    call fails or the response cannot be parsed (the cached response is dropped in that case).
+    """
+    prompt = (
+        "Given the following list of entity mentions and their contexts, "
+        "analyze each pair and return a JSON list of objects with fields: "
+        "'mention', 'context', 'entity_type' (person, company, place, product, concept, or other), "
+        "'confidence' (0-1), 'keywords' (list), and 'description' (brief description).\n\n"
+        "Pairs:\n" +
+        "\n".join(f"- mention: {e['mention']}\n  context: {e['context']}" for e in batch)
+    )
+    response = call_gemini(prompt, on_retry=stats.record_retry if stats is not None else None)
+    try:
+        return _parse_json_list(response)
+    except Exception:
+        invalidate_gemini_response(prompt)
+        raise
+
+
+def _analyze_chunk(batch: List[Dict[str, str]], i: int, n_chunks: int, journal: Optional[RunJournal] = None,
+                   stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Send one chunk of mention/context pairs to Gemini and return one result per pair (None fields on failure).
+    Transient errors are retried; a chunk that keeps failing is bisected until the pairs
+    causing the failure are isolated, and only those get None fields.
+    If a journal is given, chunks it already holds are restored instead of sent, and
+    fully successful chunks are recorded in it.
+    """
+    if journal is not None:
+        restored = journal.get("context", batch)
+        if restored is not None:
+            logger.debug("Restored batch %d/%s from run %s.", i + 1, n_chunks, journal.run_id)
+            return restored
+    logger.debug("Processing batch %d/%s (%d pairs)...", i + 1, n_chunks, len(batch))
+    batch_results, gave_up = run_with_bisection(
+        batch,
+        lambda items: _analyze_pairs(items, stats),
+        item_key=lambda e: (e['mention'], e['context']),
+        result_key=lambda r: (r.get('mention'), r.get('context')),
+        fallback=lambda e: {"mention": e['mention'], "context": e['context'], "entity_type": None,
+                            "confidence": None, "keywords": [], "description": None},
+        align=lambda r, e: {**r, 'mention': e['mention'], 'context': e['context']},
+        stats=stats
+    )
+    if gave_up:
+        logger.error("Gemini batch %d: gave up on %d of %d pairs", i + 1, gave_up, len(batch))
+    if journal is not None and not gave_up:
+        journal.record("context", batch, batch_results)
+    logger.debug("Completed batch %d/%s.", i + 1, n_chunks)
+    return batch_results
+
 
 def batch_context_analysis(
     entity_contexts: List[Dict[str, str]],
     chunk_size: int = 10,
-    output_format: str = "dataframe"
-) -> Union[pd.DataFrame, List[Dict], str]:
+    output_format: str = "dataframe",
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None,
+    journal: Optional[RunJournal] = None
+) -> Union[pd.DataFrame, List[Dict], str, ColumnBatch]:
     """
     Batch context analysis using Gemini, with chunking, progress, and robust error handling.
+    Each distinct (mention, context) pair is sent to Gemini once, however often it appears in the input.
     Args:
         entity_contexts: List of dicts with 'mention' and 'context'.
         chunk_size: Max number of pairs per Gemini call (default: 10).
-        output_format: 'dataframe', 'json', or 'list'.
+        output_format: 'dataframe', 'json', 'list', or 'columnar' (a ColumnBatch).
+        max_workers: Number of chunks sent to Gemini concurrently (default: 1, sequential).
+        stats: Optional StageStats to record chunk timings in.
+        journal: Optional RunJournal used to skip chunks completed by an earlier run and record new ones.
     Returns:
-        DataFrame, JSON string, or list of dicts with context analysis for each pair.
+        DataFrame, JSON string, or list of dicts with context analysis for each distinct pair.
     """
-    results = []
-    total = len(entity_contexts)
-    n_chunks = math.ceil(total / chunk_size)
-    for i in range(n_chunks):
-        batch = entity_contexts[i * chunk_size : (i + 1) * chunk_size]
-        print(f"[PROGRESS] Processing batch {i+1}/{n_chunks} ({len(batch)} pairs)...")
-        prompt = (
-            "Given the following list of entity mentions and their contexts, "
-            "analyze each pair and return a JSON list of objects with fields: "
-            "'mention', 'context', 'entity_type' (person, company, place, product, concept, or other), "
-            "'confidence' (0-1), 'keywords' (list), and 'description' (brief description).\n\n"
-            "Pairs:\n" +
-            "\n".join(f"- mention: {e['mention']}\n  context: {e['context']}" for e in batch)
-        )
-        try:
-            response = call_gemini(prompt)
-            match = re.search(r'\[.*\]', response, re.DOTALL)
-            if match:
-                batch_results = json.loads(match.group())
-            else:
-                batch_results = json.loads(response)
-        except Exception as e:
-            print(f"[ERROR] Gemini batch failed for batch {i+1}: {e}")
-            batch_results = [{**e, "entity_type": None, "confidence": None, "keywords": [], "description": None} for e in batch]
-        # Ensure all batch pairs are present
-        mention_context_set = {(e['mention'], e['context']) for e in batch}
-        found_pairs = {(r.get('mention'), r.get('context')) for r in batch_results}
-        for missing in mention_context_set - found_pairs:
-            mention, context = missing
-            batch_results.append({"mention": mention, "context": context, "entity_type": None, "confidence": None, "keywords": [], "description": None})
-        results.extend(batch_results)
-        print(f"[PROGRESS] Completed batch {i+1}/{n_chunks}.")
+    stats = stats if stats is not None else StageStats("context")
+    stats.start()
+    unique_pairs = dedupe_first(entity_contexts, key=lambda e: (e['mention'], e['context']))
+    stats.record_dedup(len(entity_contexts), len(unique_pairs), chunk_size)
+    chunks = split_into_chunks(unique_pairs, chunk_size)
+    n_chunks = len(chunks)
+    chunk_results = map_chunks(lambda i, batch: _analyze_chunk(batch, i, n_chunks, journal, stats), chunks, max_workers, stats)
+    results = [r for batch_results in chunk_results for r in batch_results]
     # Remove duplicates (keep first occurrence)
-    seen = set()
-    deduped = []
-    for r in results:
-        key = (r["mention"], r["context"])
-        if key not in seen:
-            deduped.append(r)
-            seen.add(key)
-    if output_format == "dataframe":
+    deduped = dedupe_first(results, key=lambda r: (r["mention"], r["context"]))
+    stats.finish()
+    logger.info("%s", stats.summary())
+    if output_format == "columnar":
+        return ColumnBatch.from_records(deduped, COLUMNS)
+    elif output_format == "dataframe":
         return pd.DataFrame(deduped)
     elif output_format == "json":
         return json.dumps(deduped, indent=2)
     else:
-        return deduped 
\ No newline at end of file
+        return deduped
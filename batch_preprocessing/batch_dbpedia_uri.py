@@ -1,58 +1,118 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
+import logging
 from typing import List, Dict, Optional, Union
 import pandas as pd
-import math
+from hybrid_linking.dbpedia_sparql import DBPEDIA_SPARQL_ENDPOINT, build_labels_values_query, run_sparql_query
+from hybrid_linking.sparql_cache import get_sparql_cache
+from hybrid_linking.columnar import ColumnBatch
+from batch_preprocessing.chunking import split_into_chunks, map_chunks
+from batch_preprocessing.stats import StageStats
+from batch_preprocessing.checkpoint import RunJournal
+
+logger = logging.getLogger(__name__)
+
+# Column kinds of the columnar output (see hybrid_linking.columnar)
+COLUMNS = {"canonical_name": "str", "dbpedia_uri": "str"}
+
+
+def _lookup_chunk(batch: List[str], i: int, n_chunks: Union[int, str], use_cache: bool = True,
+                  journal: Optional[RunJournal] = None) -> List[Dict]:
+    """
+    Resolve one chunk of canonical names with a single VALUES query, skipping names already cached.
+    n_chunks is only used for progress output ("?" when the total is not known yet).
+    If a journal is given, chunks it already holds are restored instead of queried, and
+    successfully processed chunks are recorded in it.
+    """
+    if journal is not None:
+        restored = journal.get("dbpedia", batch)
+        if restored is not None:
+            logger.debug("Restored batch %d/%s from run %s.", i + 1, n_chunks, journal.run_id)
+            return restored
+    endpoint = DBPEDIA_SPARQL_ENDPOINT
+    failed = False
+    cache = get_sparql_cache()
+    logger.debug("Processing batch %d/%s (%d names)...", i + 1, n_chunks, len(batch))
+    uri_map = {}
+    to_query = []
+    for name in batch:
+        cached = cache.get("label", endpoint, name) if use_cache else None
+        if cached is None:
+            to_query.append(name)
+        elif cached:
+            uri_map[name] = cached[0][0]
+    if to_query:
+        query = build_labels_values_query(to_query)
+        logger.debug("SPARQL Query for batch %d/%s:\n%s", i + 1, n_chunks, query)
+        try:
+            batch_results = run_sparql_query(query, endpoint)
+            logger.debug("Raw SPARQL results for batch %d:\n%s", i + 1, batch_results)
+            rows_by_name = {name: [] for name in to_query}
+            for r in batch_results["results"]["bindings"]:
+                name = r["label"]["value"]
+                rows_by_name.setdefault(name, []).append([r["uri"]["value"], name])
+            for name, rows in rows_by_name.items():
+                if rows:
+                    uri_map[name] = rows[0][0]
+                if use_cache:
+                    cache.set("label", endpoint, name, rows)
+        except Exception as e:
+            logger.error("SPARQL query failed for batch %d: %s", i + 1, e)
+            failed = True
+    else:
+        logger.debug("All names in batch %d/%s served from cache", i + 1, n_chunks)
+    results = [{"canonical_name": name, "dbpedia_uri": uri_map.get(name)} for name in batch]
+    if journal is not None and not failed:
+        journal.record("dbpedia", batch, results)
+    logger.debug("Completed batch %d/%s.", i + 1, n_chunks)
+    return results
+
 
 def batch_dbpedia_uri_lookup(
     canonical_names: List[str],
     output_format: str = "dataframe",
-    chunk_size: int = 5
-) -> Union[pd.DataFrame, List[Dict], str]:
+    chunk_size: int = 5,
+    use_cache: bool = True,
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None,
+    journal: Optional[RunJournal] = None
+) -> Union[pd.DataFrame, List[Dict], str, ColumnBatch]:
     """
     Batch lookup of DBpedia URIs for a list of canonical names using multiple small SPARQL queries.
+    Each distinct name is looked up once and its result is fanned back out to every occurrence.
+    Names already in the shared SPARQL cache (hits or cached misses) are not queried again.
     Args:
         canonical_names: List of canonical names (e.g., 'Apple_Inc.').
-        output_format: 'dataframe', 'json', or 'list'.
+        output_format: 'dataframe', 'json', 'list', or 'columnar' (a ColumnBatch).
         chunk_size: Number of names per SPARQL query (default: 5).
+        use_cache: If False, query every name and do not update the cache.
+        max_workers: Number of SPARQL queries in flight at once (default: 1, sequential).
+        stats: Optional StageStats to record chunk timings in.
+        journal: Optional RunJournal used to skip chunks completed by an earlier run and record new ones.
     Returns:
-        DataFrame, JSON string, or list of dicts with 'canonical_name' and 'dbpedia_uri'.
+        DataFrame, JSON string, or list of dicts with 'canonical_name' and 'dbpedia_uri' (one per input name).
     """
-    endpoint = "https://dbpedia.org/sparql"
-    results = []
-    total = len(canonical_names)
-    n_chunks = math.ceil(total / chunk_size)
-    for i in range(n_chunks):
-        batch = canonical_names[i * chunk_size : (i + 1) * chunk_size]
-        print(f"[PROGRESS] Processing batch {i+1}/{n_chunks} ({len(batch)} names)...")
-        sparql = SPARQLWrapper(endpoint)
-        values = " ".join(f'"{name}"@en' for name in batch)
-        query = f'''
-        SELECT ?canonical_name ?uri WHERE {{
-          VALUES ?canonical_name {{ {values} }}
-          ?uri rdfs:label ?canonical_name .
-          FILTER (lang(?canonical_name) = 'en')
-        }}
-        '''
-        print(f"[DEBUG] SPARQL Query for batch {i+1}/{n_chunks}:\n", query)
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        try:
-            batch_results = sparql.query().convert()
-            print(f"[DEBUG] Raw SPARQL results for batch {i+1}:\n", batch_results)
-            uri_map = {r["canonical_name"]["value"]: r["uri"]["value"] for r in batch_results["results"]["bindings"]}
-        except Exception as e:
-            print(f"[ERROR] SPARQL query failed for batch {i+1}: {e}")
-            uri_map = {}
-        for name in batch:
-            results.append({
-                "canonical_name": name,
-                "dbpedia_uri": uri_map.get(name)
-            })
-        print(f"[PROGRESS] Completed batch {i+1}/{n_chunks}.")
+    stats = stats if stats is not None else StageStats("dbpedia")
+    stats.start()
+    unique_names = list(dict.fromkeys(canonical_names))
+    stats.record_dedup(len(canonical_names), len(unique_names), chunk_size)
+    chunks = split_into_chunks(unique_names, chunk_size)
+    n_chunks = len(chunks)
+    chunk_results = map_chunks(
+        lambda i, batch: _lookup_chunk(batch, i, n_chunks, use_cache=use_cache, journal=journal), chunks, max_workers, stats
+    )
+    uri_by_name = {r["canonical_name"]: r["dbpedia_uri"] for batch_results in chunk_results for r in batch_results}
+    stats.finish()
+    logger.info("%s", stats.summary())
+    if output_format == "columnar":
+        # Built column-wise, without a dict per input name
+        return ColumnBatch.from_columns(
+            {"canonical_name": canonical_names, "dbpedia_uri": [uri_by_name.get(name) for name in canonical_names]},
+            COLUMNS
+        )
+    results = [{"canonical_name": name, "dbpedia_uri": uri_by_name.get(name)} for name in canonical_names]
     if output_format == "dataframe":
         return pd.DataFrame(results)
     elif output_format == "json":
         import json
         return json.dumps(results, indent=2)
     else:
-        return results 
\ No newline at end of file
+        return results
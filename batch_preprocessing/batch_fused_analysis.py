@@ -0,0 +1,138 @@
+import logging
+import json
+from typing import List, Dict, Union, Optional
+import pandas as pd
+from hybrid_linking.gemini_api import call_gemini, invalidate_gemini_response
+from hybrid_linking.fuzzy_index import FuzzyLabelIndex
+from hybrid_linking.columnar import ColumnBatch
+from batch_preprocessing.chunking import split_into_chunks, map_chunks, dedupe_first
+from batch_preprocessing.stats import StageStats
+from batch_preprocessing.checkpoint import RunJournal
+from batch_preprocessing.bisection import run_with_bisection
+from batch_preprocessing.batch_canonical_name import _parse_json_list, resolve_from_label_index
+
+logger = logging.getLogger(__name__)
+
+# Column kinds of the columnar output (see hybrid_linking.columnar)
+COLUMNS = {"mention": "str", "context": "str", "canonical_name": "str", "entity_type": "category",
+           "confidence": "float", "keywords": "object", "description": "str"}
+
+
+def _fuse_pairs(batch: List[Dict[str, str]], stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Send one list of mention/context pairs to Gemini with the fused prompt and parse the results.
+    Raises if the call fails or the response cannot be parsed (the cached response is dropped in that case).
+    """
+    prompt = (
+        "Given the following list of entity mentions and their contexts, "
+        "return for each pair the canonical DBpedia name and an analysis of the entity, "
+        "as a JSON list of objects with fields: "
+        "'mention', 'context', 'canonical_name', "
+        "'entity_type' (person, company, place, product, concept, or other), "
+        "'confidence' (0-1), 'keywords' (list), and 'description' (brief description).\n\n"
+        "Pairs:\n" +
+        "\n".join(f"- mention: {e['mention']}\n  context: {e['context']}" for e in batch)
+    )
+    response = call_gemini(prompt, on_retry=stats.record_retry if stats is not None else None)
+    try:
+        return _parse_json_list(response)
+    except Exception:
+        invalidate_gemini_response(prompt)
+        raise
+
+
+def _fuse_chunk(batch: List[Dict[str, str]], i: int, n_chunks: int, journal: Optional[RunJournal] = None,
+                stats: Optional[StageStats] = None) -> List[Dict]:
+    """
+    Normalize and analyze one chunk of mention/context pairs with a single Gemini call per chunk,
+    returning one result per pair (None fields on failure). Failing chunks are retried and
+    bisected like the separate stages. If a journal is given, chunks it already holds are
+    restored instead of sent, and fully successful chunks are recorded in it.
+    """
+    if journal is not None:
+        restored = journal.get("fused", batch)
+        if restored is not None:
+            logger.debug("Restored batch %d/%s from run %s.", i + 1, n_chunks, journal.run_id)
+            return restored
+    logger.debug("Processing batch %d/%s (%d pairs)...", i + 1, n_chunks, len(batch))
+    batch_results, gave_up = run_with_bisection(
+        batch,
+        lambda items: _fuse_pairs(items, stats),
+        item_key=lambda e: (e['mention'], e['context']),
+        result_key=lambda r: (r.get('mention'), r.get('context')),
+        fallback=lambda e: {"mention": e['mention'], "context": e['context'], "canonical_name": None,
+                            "entity_type": None, "confidence": None, "keywords": [], "description": None},
+        align=lambda r, e: {**r, 'mention': e['mention'], 'context': e['context']},
+        stats=stats
+    )
+    if gave_up:
+        logger.error("Gemini batch %d: gave up on %d of %d pairs", i + 1, gave_up, len(batch))
+    if journal is not None and not gave_up:
+        journal.record("fused", batch, batch_results)
+    logger.debug("Completed batch %d/%s.", i + 1, n_chunks)
+    return batch_results
+
+
+def apply_label_index(results: List[Dict], label_index: Optional[FuzzyLabelIndex], threshold: float = 0.9) -> List[Dict]:
+    """
+    Replace canonical names in fused results (in place) with confident label index matches.
+    """
+    if label_index is None:
+        return results
+    resolved, _ = resolve_from_label_index(list(dict.fromkeys(r["mention"] for r in results)), label_index, threshold)
+    index_names = {r["mention"]: r["canonical_name"] for r in resolved}
+    for r in results:
+        r["canonical_name"] = index_names.get(r["mention"], r.get("canonical_name"))
+    return results
+
+
+def batch_fused_analysis(
+    entity_contexts: List[Dict[str, str]],
+    chunk_size: int = 10,
+    output_format: str = "dataframe",
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None,
+    journal: Optional[RunJournal] = None,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9
+) -> Union[pd.DataFrame, List[Dict], str, ColumnBatch]:
+    """
+    Canonical name normalization and context analysis in one pass: each Gemini call returns
+    canonical_name, entity_type, confidence, keywords and description for a chunk of pairs,
+    so mentions and contexts are sent once instead of twice.
+    Each distinct (mention, context) pair is sent to Gemini once, however often it appears in the input.
+    Args:
+        entity_contexts: List of dicts with 'mention' and 'context'.
+        chunk_size: Max number of pairs per Gemini call (default: 10).
+        output_format: 'dataframe', 'json', 'list', or 'columnar' (a ColumnBatch).
+        max_workers: Number of chunks sent to Gemini concurrently (default: 1, sequential).
+        stats: Optional StageStats to record chunk timings in.
+        journal: Optional RunJournal used to skip chunks completed by an earlier run and record new ones.
+        label_index: Optional FuzzyLabelIndex; mentions matching a label with similarity >= index_threshold
+            take that label as canonical name (their context is still analyzed).
+        index_threshold: Minimum similarity for a label index match to be accepted (default: 0.9).
+    Returns:
+        DataFrame, JSON string, or list of dicts with 'mention', 'context', 'canonical_name' and the
+        context analysis fields for each distinct pair.
+    """
+    stats = stats if stats is not None else StageStats("fused")
+    stats.start()
+    unique_pairs = dedupe_first(entity_contexts, key=lambda e: (e['mention'], e['context']))
+    stats.record_dedup(len(entity_contexts), len(unique_pairs), chunk_size)
+    chunks = split_into_chunks(unique_pairs, chunk_size)
+    n_chunks = len(chunks)
+    chunk_results = map_chunks(lambda i, batch: _fuse_chunk(batch, i, n_chunks, journal, stats), chunks, max_workers, stats)
+    results = [r for batch_results in chunk_results for r in batch_results]
+    # Remove duplicates (keep first occurrence)
+    deduped = dedupe_first(results, key=lambda r: (r["mention"], r["context"]))
+    apply_label_index(deduped, label_index, index_threshold)
+    stats.finish()
+    logger.info("%s", stats.summary())
+    if output_format == "columnar":
+        return ColumnBatch.from_records(deduped, COLUMNS)
+    elif output_format == "dataframe":
+        return pd.DataFrame(deduped)
+    elif output_format == "json":
+        return json.dumps(deduped, indent=2)
+    else:
+        return deduped
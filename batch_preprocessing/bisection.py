@@ -0,0 +1,112 @@
+import logging
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Type, TypeVar
+from batch_preprocessing.stats import StageStats
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors caused by the response content (unparseable or wrongly shaped output), which a smaller
+# batch may avoid; json.JSONDecodeError is a ValueError. Anything else (HTTP 4xx such as a bad
+# API key, exhausted retries of transient errors) fails every sub-batch the same way.
+BISECTABLE_ERRORS: Tuple[Type[BaseException], ...] = (ValueError, KeyError)
+
+
+def normalize_key(key: Hashable) -> Hashable:
+    """Key with strings casefolded and whitespace collapsed (element-wise for tuples)."""
+    if isinstance(key, tuple):
+        return tuple(normalize_key(part) for part in key)
+    if isinstance(key, str):
+        return " ".join(key.split()).casefold()
+    return key
+
+
+def run_with_bisection(
+    batch: Sequence[T],
+    attempt: Callable[[Sequence[T]], List[Dict]],
+    item_key: Callable[[T], Hashable],
+    result_key: Callable[[Dict], Hashable],
+    fallback: Callable[[T], Dict],
+    align: Callable[[Dict, T], Dict],
+    stats: Optional[StageStats] = None,
+    bisect_on: Tuple[Type[BaseException], ...] = BISECTABLE_ERRORS
+) -> Tuple[List[Dict], int]:
+    """
+    Process a batch with attempt(items), isolating items that make it fail.
+
+    If attempt raises one of bisect_on (an unparseable or malformed response) the batch is
+    split in half and each half is attempted on its own, recursively, so one bad item
+    only costs itself. Results are matched to items by key, exactly or else after
+    normalize_key (the model may not echo an item verbatim), and align(result, item)
+    restores the item's own identifiers on a result. Items missing from a response are
+    re-sent once on their own; a response that matches no item at all is given up
+    without further calls, as are single items that still fail and batches that fail
+    with any other error (HTTP errors such as 400/401/403, or transient errors after
+    attempt's own retries). Given-up items are replaced by fallback(item).
+    Args:
+        batch: Items to process.
+        attempt: Processes a list of items and returns result dicts (raises on failure).
+        item_key: Key identifying an item.
+        result_key: Key of the item a result belongs to.
+        fallback: Result used for an item that was given up.
+        align: Returns a result carrying the identifiers of the item it was matched to.
+        stats: Optional StageStats recording splits and give-ups.
+        bisect_on: Exception types that make a batch worth splitting.
+    Returns:
+        (one result per item, in item order; number of items given up)
+    """
+    def give_up(items: Sequence[T]) -> Tuple[List[Dict], int]:
+        if stats is not None:
+            stats.record_gave_up(len(items))
+        return [fallback(item) for item in items], len(items)
+
+    def bisect(items: Sequence[T], resend: bool) -> Tuple[List[Dict], int]:
+        if stats is not None:
+            stats.record_split()
+        mid = len(items) // 2
+        left, left_failed = solve(items[:mid], resend)
+        right, right_failed = solve(items[mid:], resend)
+        return left + right, left_failed + right_failed
+
+    def match(items: Sequence[T], results: List[Dict]) -> List[Optional[Dict]]:
+        exact: Dict[Hashable, Dict] = {}
+        normalized: Dict[Hashable, Dict] = {}
+        for r in results:
+            key = result_key(r)
+            exact.setdefault(key, r)
+            normalized.setdefault(normalize_key(key), r)
+        matched = []
+        for item in items:
+            key = item_key(item)
+            r = exact.get(key)
+            if r is None:
+                r = normalized.get(normalize_key(key))
+            matched.append(align(r, item) if r is not None else None)
+        return matched
+
+    def solve(items: Sequence[T], resend: bool = True) -> Tuple[List[Dict], int]:
+        try:
+            results = attempt(items)
+        except Exception as e:
+            if not isinstance(e, bisect_on) or len(items) == 1:
+                logger.error("Giving up on %d item(s): %s", len(items), e)
+                return give_up(items)
+            logger.warning("Batch of %d failed (%s); splitting", len(items), e)
+            return bisect(items, resend)
+        matched = match(items, results)
+        missing = [item for item, r in zip(items, matched) if r is None]
+        if not missing:
+            return matched, 0
+        if len(missing) == len(items) or not resend:
+            logger.error("Response matched %d of %d item(s); giving up the rest",
+                         len(items) - len(missing), len(items))
+            failed_results, failed = give_up(missing)
+            rest = iter(failed_results)
+            return [r if r is not None else next(rest) for r in matched], failed
+        if stats is not None:
+            stats.record_split()
+        retried, failed = solve(missing, resend=False)
+        rest = iter(retried)
+        return [r if r is not None else next(rest) for r in matched], failed
+
+    return solve(list(batch))
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_CHECKPOINT_DIR = ".runs"
+
+
+def new_run_id() -> str:
+    """Generate a sortable, unique run id."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+def chunk_key(chunk: Sequence[Any]) -> str:
+    """Content hash identifying a chunk, stable across runs for the same inputs."""
+    return hashlib.sha256(json.dumps(list(chunk), sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """
+    Durable per-run record of completed chunks, stored as a SQLite file per run.
+
+    Each stage records the results of every chunk it completes, keyed by the chunk's
+    content hash. A resumed run looks chunks up before dispatching them and skips
+    those already recorded. Only successful chunks should be recorded, so chunks that
+    failed are retried on resume.
+
+    Args:
+        run_id: Identifier of the run (the journal file is <directory>/<run_id>.sqlite).
+        directory: Directory holding run journals.
+        must_exist: If True, raise FileNotFoundError when the journal does not exist (resume).
+    """
+
+    def __init__(self, run_id: str, directory: str = DEFAULT_CHECKPOINT_DIR, must_exist: bool = False):
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.sqlite")
+        if must_exist and not os.path.exists(self.path):
+            raise FileNotFoundError(f"No checkpoint journal for run '{run_id}' at {self.path}")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "stage TEXT NOT NULL, chunk_key TEXT NOT NULL, results TEXT NOT NULL, "
+                "completed_at REAL NOT NULL, PRIMARY KEY (stage, chunk_key))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.commit()
+
+    def get(self, stage: str, chunk: Sequence[Any]) -> Optional[List[Dict]]:
+        """Return the recorded results for a chunk, or None if it has not completed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results FROM chunks WHERE stage = ? AND chunk_key = ?", (stage, chunk_key(chunk))
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def record(self, stage: str, chunk: Sequence[Any], results: List[Dict]):
+        """Durably record the results of a completed chunk."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (stage, chunk_key, results, completed_at) VALUES (?, ?, ?, ?)",
+                (stage, chunk_key(chunk), json.dumps(results, default=str), time.time()),
+            )
+            self._conn.commit()
+
+    def completed_chunks(self, stage: Optional[str] = None) -> int:
+        """Number of chunks recorded, for one stage or all stages."""
+        with self._lock:
+            if stage is None:
+                return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE stage = ?", (stage,)).fetchone()[0]
+
+    def set_meta(self, key: str, value: Any):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            self._conn.commit()
+
+    def get_meta(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+import contextvars
+import itertools
+import math
+import time
+from batch_preprocessing.stats import StageStats
+from hybrid_linking.metrics import span
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def split_into_chunks(items: Sequence[T], chunk_size: int) -> List[Sequence[T]]:
+    """
+    Split a sequence into consecutive chunks of at most chunk_size items.
+    """
+    n_chunks = math.ceil(len(items) / chunk_size)
+    return [items[i * chunk_size : (i + 1) * chunk_size] for i in range(n_chunks)]
+
+
+def iter_windows(items: Iterable[T], window_size: int) -> Iterator[List[T]]:
+    """
+    Lazily group an iterable into lists of at most window_size items.
+    """
+    iterator = iter(items)
+    while True:
+        window = list(itertools.islice(iterator, window_size))
+        if not window:
+            return
+        yield window
+
+
+def dedupe_first(results: List[dict], key: Callable[[dict], Hashable]) -> List[dict]:
+    """
+    Remove duplicate results, keeping the first occurrence of each key.
+    """
+    seen = set()
+    deduped = []
+    for r in results:
+        k = key(r)
+        if k not in seen:
+            deduped.append(r)
+            seen.add(k)
+    return deduped
+
+
+def _timed(process_chunk: Callable[[int, Sequence[T]], R], stats: Optional[StageStats]) -> Callable[[int, Sequence[T]], R]:
+    if stats is None:
+        return process_chunk
+
+    def run(i: int, chunk: Sequence[T]) -> R:
+        start = time.time()
+        try:
+            with span("batch.chunk", stage=stats.stage, chunk=i, items=len(chunk)):
+                return process_chunk(i, chunk)
+        finally:
+            stats.record_chunk(time.time() - start)
+    return run
+
+
+def iter_chunk_results(
+    process_chunk: Callable[[int, Sequence[T]], R],
+    chunks: List[Sequence[T]],
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None
+) -> Iterator[Tuple[int, R]]:
+    """
+    Apply process_chunk(index, chunk) to every chunk, yielding (index, result) as each chunk completes.
+    Args:
+        process_chunk: Function called with the chunk index and the chunk.
+        chunks: Chunks to process.
+        max_workers: Number of chunks in flight at once; 1 processes them sequentially.
+        stats: Optional StageStats that records the processing time of each chunk.
+    """
+    run = _timed(process_chunk, stats)
+    if max_workers <= 1 or len(chunks) <= 1:
+        for i, chunk in enumerate(chunks):
+            yield i, run(i, chunk)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        # Each chunk runs in a copy of the caller's context so its span keeps the caller's span as parent
+        futures = {executor.submit(contextvars.copy_context().run, run, i, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def map_chunks(
+    process_chunk: Callable[[int, Sequence[T]], R],
+    chunks: List[Sequence[T]],
+    max_workers: int = 1,
+    stats: Optional[StageStats] = None
+) -> List[R]:
+    """
+    Apply process_chunk(index, chunk) to every chunk and return the results in chunk order.
+    Args:
+        process_chunk: Function called with the chunk index and the chunk.
+        chunks: Chunks to process.
+        max_workers: Number of chunks in flight at once; 1 processes them sequentially.
+        stats: Optional StageStats that records the processing time of each chunk.
+    Returns:
+        List with one result per chunk, in the same order as chunks.
+    """
+    results: List[Optional[R]] = [None] * len(chunks)
+    for i, result in iter_chunk_results(process_chunk, chunks, max_workers, stats):
+        results[i] = result
+    return results
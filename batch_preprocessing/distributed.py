@@ -0,0 +1,283 @@
+"""
+Coordinator/worker mode for linking jobs spread over many machines.
+
+The coordinator (`submit_job`) partitions the input into work units by a stable
+hash of the mention, so a mention is linked by one unit only, and stores them in a
+durable WorkQueue together with the job's pipeline settings. Workers (`run_worker`)
+on any number of nodes lease units, run `full_batch_entity_linking` on them, write
+each unit's result to `<results_dir>/<unit_id>.parquet` (atomically, so a re-run
+unit replaces rather than duplicates its output) and mark it done. Leases are
+renewed while a unit runs; units of dead workers become available again when their
+lease expires, and failing units are retried up to the queue's max_attempts.
+`wait_for_job` reports progress and `collect_results` reassembles the output in
+input order.
+
+results_dir must be storage every worker and the collector can reach (a shared
+filesystem). Each worker limits Gemini calls with its own process-wide RateLimiter,
+so set GEMINI_RPM/GEMINI_TPM on each node to its share of the quota.
+"""
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from batch_preprocessing.full_batch_pipeline import full_batch_entity_linking, save_results
+from batch_preprocessing.sharded import partition_by_mention
+from batch_preprocessing.streaming_io import RESULT_COLUMNS
+from batch_preprocessing.work_queue import WorkQueue, WorkUnit
+from hybrid_linking.metrics import WORK_UNITS
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MODES = ("mention", "sequential")
+
+
+def submit_job(
+    queue: WorkQueue,
+    job_id: str,
+    entity_contexts: Iterable[Dict[str, str]],
+    results_dir: str,
+    unit_size: int = 5000,
+    partition: str = "mention",
+    pipeline_kwargs: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Split the input into work units and enqueue them as a job.
+
+    Submitting the same job again only adds units that are missing, so a coordinator
+    can be restarted without re-linking completed work.
+    Args:
+        queue: Work queue shared with the workers.
+        job_id: Identifier of the job.
+        entity_contexts: Records with 'mention' and 'context'.
+        results_dir: Directory (shared storage) receiving one result file per unit.
+        unit_size: Target number of records per unit.
+        partition: "mention" groups records by a stable hash of the mention (units vary in size
+            around unit_size); "sequential" cuts the input into consecutive slices of unit_size.
+        pipeline_kwargs: Settings passed to full_batch_entity_linking by every worker (chunk sizes,
+            fused, pipelined, ...); must be JSON-serializable.
+    Returns:
+        Number of units added.
+    """
+    if partition not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode: {partition} (use {', '.join(PARTITION_MODES)})")
+    records = list(entity_contexts)
+    num_units = max(1, math.ceil(len(records) / unit_size))
+    if partition == "mention":
+        groups = [rows for rows in partition_by_mention(records, num_units) if rows]
+    else:
+        groups = [list(range(start, min(start + unit_size, len(records)))) for start in range(0, len(records), unit_size)]
+    width = max(6, len(str(len(groups))))
+    os.makedirs(results_dir, exist_ok=True)
+    config = {"results_dir": results_dir, "rows": len(records), "units": len(groups),
+              "pipeline_kwargs": pipeline_kwargs or {}, "submitted_at": time.time()}
+    if not queue.put_job(job_id, config):
+        logger.info("Job %s already exists; adding missing units only", job_id)
+    added = queue.add_units(job_id, (
+        (f"{n:0{width}d}", {"row_ids": rows, "records": [records[i] for i in rows]})
+        for n, rows in enumerate(groups)
+    ))
+    logger.info("Job %s: %d records in %d units (%d added)", job_id, len(records), len(groups), added)
+    return added
+
+
+def result_path(results_dir: str, unit_id: str) -> str:
+    return os.path.join(results_dir, f"{unit_id}.parquet")
+
+
+class _LeaseKeeper:
+    """Renews a unit's lease from a background thread while the unit is processed."""
+
+    def __init__(self, queue: WorkQueue, unit: WorkUnit, lease_seconds: float):
+        self.queue = queue
+        self.unit = unit
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{unit.unit_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.renew(self.unit, self.lease_seconds):
+                    self.lost = True
+                    logger.warning("Lost the lease on unit %s", self.unit.unit_id)
+                    return
+            except Exception as e:  # a transient broker error: try again on the next tick
+                logger.warning("Could not renew the lease on unit %s: %s", self.unit.unit_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(
+    queue: WorkQueue,
+    job_id: str,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 600.0,
+    poll_interval: float = 5.0,
+    retry_delay: float = 30.0,
+    max_units: Optional[int] = None,
+    wait: bool = True,
+    log: bool = True,
+    **pipeline_kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Lease and process units of a job until none are left.
+    Args:
+        queue: Work queue holding the job.
+        job_id: Job to work on.
+        worker_id: Name recorded as lease owner (default: host-pid-random).
+        lease_seconds: Lease length; the lease is renewed every lease_seconds / 3 while a unit runs.
+        poll_interval: Seconds between lease attempts while other workers hold the remaining units.
+        retry_delay: Seconds before a failed unit may be leased again.
+        max_units: Stop after this many units (None = no limit).
+        wait: If True, keep polling while units are leased by others (they come back if their lease
+            expires); if False, return as soon as nothing can be leased.
+        log: If True, log progress after every unit.
+        **pipeline_kwargs: Override the job's pipeline settings on this worker (e.g. max_workers).
+    Returns:
+        Summary dict with 'worker_id', 'units', 'failed', 'lost_leases', 'rows' and 'seconds'.
+    """
+    job = queue.get_job(job_id)
+    if job is None:
+        raise KeyError(f"Unknown job: {job_id}")
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    kwargs = {**job["pipeline_kwargs"], **pipeline_kwargs, "log": False, "save_path": None}
+    start_time = time.time()
+    summary = {"worker_id": worker_id, "units": 0, "failed": 0, "lost_leases": 0, "rows": 0}
+    while max_units is None or summary["units"] + summary["failed"] < max_units:
+        unit = queue.lease(job_id, worker_id, lease_seconds)
+        if unit is None:
+            progress = queue.progress(job_id)
+            if not wait or progress["pending"] + progress["leased"] == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+        unit_start = time.time()
+        try:
+            with _LeaseKeeper(queue, unit, lease_seconds):
+                df = full_batch_entity_linking(unit.payload["records"], **kwargs)
+                path = result_path(job["results_dir"], unit.unit_id)
+                tmp_path = os.path.join(job["results_dir"], f".{unit.unit_id}.{unit.lease_token}.parquet")
+                save_results(df, tmp_path)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            state = queue.fail(unit, f"{type(e).__name__}: {e}", retry_delay)
+            summary["failed"] += 1
+            WORK_UNITS.inc(outcome="failed")
+            logger.warning("Unit %s failed on attempt %d (%s): %s", unit.unit_id, unit.attempts, state, e)
+            continue
+        if queue.complete(unit):
+            summary["units"] += 1
+            summary["rows"] += len(df)
+            WORK_UNITS.inc(outcome="done")
+        else:
+            # Another worker took the unit over after our lease expired; it rewrites the same file
+            summary["lost_leases"] += 1
+            WORK_UNITS.inc(outcome="lost")
+            logger.warning("Unit %s finished after its lease was lost", unit.unit_id)
+        if log:
+            progress = queue.progress(job_id)
+            logger.info("Unit %s: %d rows in %.2fs; job %s: %d/%d units done, %d failed",
+                        unit.unit_id, len(df), time.time() - unit_start, job_id,
+                        progress["done"], progress["total"], progress["failed"])
+    summary["seconds"] = time.time() - start_time
+    if log:
+        logger.info("Worker %s finished: %d units, %d failed, %d lost leases in %.2f seconds",
+                    worker_id, summary["units"], summary["failed"], summary["lost_leases"], summary["seconds"])
+    return summary
+
+
+def wait_for_job(
+    queue: WorkQueue,
+    job_id: str,
+    poll_interval: float = 10.0,
+    timeout: Optional[float] = None,
+    log: bool = True
+) -> Dict[str, int]:
+    """
+    Block until no unit of the job is pending or leased, logging progress.
+    Args:
+        queue: Work queue holding the job.
+        job_id: Job to watch.
+        poll_interval: Seconds between progress checks.
+        timeout: Give up after this many seconds (raises TimeoutError).
+        log: If True, log progress whenever it changes.
+    Returns:
+        Final unit counts per state (see WorkQueue.progress).
+    """
+    start_time = time.time()
+    last = None
+    while True:
+        progress = queue.progress(job_id)
+        if log and progress != last:
+            logger.info("Job %s: %d/%d units done, %d leased, %d pending, %d failed", job_id, progress["done"],
+                        progress["total"], progress["leased"], progress["pending"], progress["failed"])
+            last = progress
+        if progress["pending"] + progress["leased"] == 0:
+            return progress
+        if timeout is not None and time.time() - start_time > timeout:
+            raise TimeoutError(f"Job {job_id} not finished after {timeout} seconds: {progress}")
+        time.sleep(poll_interval)
+
+
+def _read_unit_result(path: str) -> pd.DataFrame:
+    df = pd.read_parquet(path)
+    # Parquet list columns come back as arrays; results use plain lists
+    df["keywords"] = [list(v) if v is not None else [] for v in df["keywords"]]
+    return df
+
+
+def collect_results(queue: WorkQueue, job_id: str, save_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reassemble a job's unit results into one DataFrame in input order.
+
+    Rows of units that are failed or not finished keep their mention and context with
+    null results; their ids are listed in df.attrs["incomplete_units"].
+    Args:
+        queue: Work queue holding the job.
+        job_id: Job to collect.
+        save_path: If set, save the merged results to this file (see save_results).
+    Returns:
+        DataFrame with one row per submitted record.
+    """
+    job = queue.get_job(job_id)
+    if job is None:
+        raise KeyError(f"Unknown job: {job_id}")
+    done = set(queue.unit_ids(job_id, "done"))
+    frames: List[pd.DataFrame] = []
+    order: List[np.ndarray] = []
+    incomplete: List[str] = []
+    for unit_id in queue.unit_ids(job_id):
+        payload = queue.payload(job_id, unit_id)
+        if unit_id in done:
+            frames.append(_read_unit_result(result_path(job["results_dir"], unit_id)))
+        else:
+            frames.append(pd.DataFrame(payload["records"], columns=["mention", "context"]).reindex(columns=RESULT_COLUMNS))
+            incomplete.append(unit_id)
+        order.append(np.asarray(payload["row_ids"], dtype=np.int64))
+    if frames:
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.take(np.argsort(np.concatenate(order), kind="stable")).reset_index(drop=True)
+    else:
+        merged = pd.DataFrame(columns=RESULT_COLUMNS)
+    merged.attrs = {"job_id": job_id, "incomplete_units": incomplete}
+    if incomplete:
+        logger.warning("Job %s: %d units incomplete, their rows have null results", job_id, len(incomplete))
+    if save_path:
+        save_results(merged, save_path)
+    return merged
@@ -1,19 +1,48 @@
-from batch_preprocessing.batch_canonical_name import batch_canonical_name_normalization
+from batch_preprocessing.batch_canonical_name import (
+    batch_canonical_name_normalization, _normalize_chunk, resolve_from_label_index
+)
 from batch_preprocessing.batch_context_analysis import batch_context_analysis
-from batch_preprocessing.batch_dbpedia_uri import batch_dbpedia_uri_lookup
+from batch_preprocessing.batch_fused_analysis import batch_fused_analysis, _fuse_chunk, apply_label_index
+from batch_preprocessing.batch_dbpedia_uri import batch_dbpedia_uri_lookup, _lookup_chunk
+from batch_preprocessing.chunking import split_into_chunks, iter_chunk_results, iter_windows, dedupe_first
+from batch_preprocessing.stats import StageStats
+from batch_preprocessing.assembly import assemble_results
+from batch_preprocessing.streaming_io import (
+    open_result_writer, iter_entity_contexts_from_file, expand_input_paths, split_extension, STREAMING_FORMATS
+)
+from batch_preprocessing.checkpoint import RunJournal, DEFAULT_CHECKPOINT_DIR
+from hybrid_linking.fuzzy_index import FuzzyLabelIndex
+from hybrid_linking.metrics import span, traced
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import Any, Iterable, List, Dict, Optional, Sequence, Tuple, Union
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import threading
 import time
 import os
 
+logger = logging.getLogger(__name__)
 
+
+@traced("pipeline.full_batch_entity_linking")
 def full_batch_entity_linking(
     entity_contexts: List[Dict[str, str]],
     canonical_chunk_size: int = 20,
     context_chunk_size: int = 10,
     dbpedia_chunk_size: int = 5,
     save_path: Optional[str] = None,
-    log: bool = True
+    log: bool = True,
+    max_workers: int = 1,
+    pipelined: bool = False,
+    queue_size: int = 4,
+    run_id: Optional[str] = None,
+    resume: Optional[str] = None,
+    checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9,
+    fused: bool = False
 ) -> pd.DataFrame:
     """
     Full batch entity linking pipeline: canonical name normalization, context analysis, DBpedia URI lookup.
@@ -25,82 +54,454 @@ def full_batch_entity_linking(
         dbpedia_chunk_size: Chunk size for DBpedia URI lookup.
         save_path: Optional path to save the final DataFrame.
         log: If True, print progress and summary.
+        max_workers: Number of chunks in flight at once within each stage (default: 1, sequential).
+        pipelined: If True, run context analysis concurrently with canonical normalization and stream
+            finished canonical chunks into the DBpedia lookup stage instead of running stages one after another.
+        queue_size: Maximum number of finished canonical chunks waiting for DBpedia lookup (pipelined mode).
+        run_id: If set, record every completed chunk of every stage in a checkpoint journal under this id.
+        resume: Id of an earlier run to continue; chunks it completed are restored instead of re-sent.
+        checkpoint_dir: Directory holding checkpoint journals.
+        label_index: Optional FuzzyLabelIndex used to resolve canonical names without Gemini
+            when the best match scores at least index_threshold.
+        index_threshold: Minimum label index similarity accepted as a canonical name.
+        fused: If True, replace the canonical normalization and context analysis stages with one fused
+            stage (one Gemini call per chunk of context_chunk_size pairs returns both), roughly halving LLM calls.
     Returns:
         DataFrame with columns: mention, context, canonical_name, entity_type, confidence, keywords, description, dbpedia_uri
+        and exactly one row per input record, in input order (see batch_preprocessing.assembly).
+        Per-stage timings are attached as merged.attrs["stage_stats"].
     """
     start_time = time.time()
+    stages = ("fused", "dbpedia") if fused else ("canonical", "context", "dbpedia")
+    stats = {stage: StageStats(stage) for stage in stages}
+    journal = None
+    if resume:
+        journal = RunJournal(resume, checkpoint_dir, must_exist=True)
+        if log:
+            logger.info("Resuming run %s (%d chunks already completed)", resume, journal.completed_chunks())
+    elif run_id:
+        journal = RunJournal(run_id, checkpoint_dir)
+        if log:
+            logger.info("Recording run %s in %s", run_id, journal.path)
+    try:
+        if fused:
+            canonical_rows = None
+            analysis_rows, dbpedia_rows = _run_fused(
+                entity_contexts, context_chunk_size, dbpedia_chunk_size,
+                max_workers, pipelined, queue_size, stats, journal, log, label_index, index_threshold
+            )
+        else:
+            canonical_rows, analysis_rows, dbpedia_rows = _run_stages(
+                entity_contexts, canonical_chunk_size, context_chunk_size, dbpedia_chunk_size,
+                max_workers, pipelined, queue_size, stats, journal, log, label_index, index_threshold
+            )
+    finally:
+        if journal is not None:
+            journal.close()
+    # Join stage results onto the input rows in one pass
+    merged = assemble_results(entity_contexts, analysis_rows, dbpedia_rows, canonical_rows)
+    del canonical_rows, analysis_rows, dbpedia_rows
+    if save_path:
+        save_results(merged, save_path)
+    wall_seconds = time.time() - start_time
+    merged.attrs["stage_stats"] = {
+        stage: {**stage_stats.to_dict(), "utilization": stage_stats.utilization(wall_seconds, max_workers)}
+        for stage, stage_stats in stats.items()
+    }
+    if journal is not None:
+        merged.attrs["run_id"] = journal.run_id
     if log:
-        print("[PIPELINE] Step 1: Batch canonical name normalization...")
-    canonical_df = batch_canonical_name_normalization(
-        [e['mention'] for e in entity_contexts],
-        chunk_size=canonical_chunk_size,
-        output_format="dataframe"
+        logger.info("Pipeline completed in %.2f seconds.", wall_seconds)
+        for stage, stage_stats in merged.attrs["stage_stats"].items():
+            logger.info("%s: %d chunks, busy %.2fs, utilization %.0f%%, %d calls saved, %d retries, %d splits, "
+                        "%d given up", stage, stage_stats['chunks'], stage_stats['busy_seconds'],
+                        stage_stats['utilization'] * 100, stage_stats['calls_saved'], stage_stats['retries'],
+                        stage_stats['splits'], stage_stats['gave_up'])
+        summarize_errors(merged)
+    return merged
+
+
+def _run_stages(
+    entity_contexts: List[Dict[str, str]],
+    canonical_chunk_size: int,
+    context_chunk_size: int,
+    dbpedia_chunk_size: int,
+    max_workers: int,
+    pipelined: bool,
+    queue_size: int,
+    stats: Dict[str, StageStats],
+    journal: Optional[RunJournal],
+    log: bool,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Run the three stages, sequentially or pipelined. Returns (canonical_rows, context_rows, dbpedia_rows).
+    """
+    if pipelined:
+        if log:
+            logger.info("Running canonical normalization, context analysis and DBpedia lookup pipelined...")
+        canonical_rows, context_rows, dbpedia_rows = _run_pipelined(
+            entity_contexts, canonical_chunk_size, context_chunk_size, dbpedia_chunk_size,
+            max_workers, queue_size, stats, journal, label_index, index_threshold
+        )
+    else:
+        if log:
+            logger.info("Step 1: Batch canonical name normalization...")
+        canonical_rows = batch_canonical_name_normalization(
+            [e['mention'] for e in entity_contexts],
+            chunk_size=canonical_chunk_size,
+            output_format="list",
+            max_workers=max_workers,
+            stats=stats["canonical"],
+            journal=journal,
+            label_index=label_index,
+            index_threshold=index_threshold
+        )
+        if log:
+            logger.info("Step 2: Batch context analysis...")
+        context_rows = batch_context_analysis(
+            entity_contexts,
+            chunk_size=context_chunk_size,
+            output_format="list",
+            max_workers=max_workers,
+            stats=stats["context"],
+            journal=journal
+        )
+        if log:
+            logger.info("Step 3: Batch DBpedia URI lookup...")
+        # The stage looks up each distinct name once and records the calls saved by deduplication
+        dbpedia_rows = batch_dbpedia_uri_lookup(
+            _canonical_names(canonical_rows),
+            output_format="list",
+            chunk_size=dbpedia_chunk_size,
+            max_workers=max_workers,
+            stats=stats["dbpedia"],
+            journal=journal
+        )
+    return canonical_rows, context_rows, dbpedia_rows
+
+
+def _canonical_names(rows: List[Dict]) -> List[str]:
+    """Non-null canonical names of stage rows, one per row (duplicates included)."""
+    return [r["canonical_name"] for r in rows if r.get("canonical_name") is not None]
+
+
+def _consume_names_for_dbpedia(
+    name_queue: "queue.Queue[Optional[List[str]]]",
+    dbpedia_chunk_size: int,
+    max_workers: int,
+    dbpedia_stats: StageStats,
+    journal: Optional[RunJournal],
+    dbpedia_rows: List[Dict],
+    errors: List[Exception]
+):
+    """
+    DBpedia stage of the pipelined modes: look up each new canonical name arriving on
+    name_queue (None ends the stream) and append the rows to dbpedia_rows. Chunks are
+    looked up by max_workers threads, like the LLM stages; at most twice that many are
+    in flight, so a slow endpoint still backs up the queue. Errors are appended to
+    errors; the queue keeps being drained so producers never block.
+    """
+    dbpedia_stats.start()
+    seen = set()
+    n_done = 0
+    n_names = 0
+    rows_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(2 * max(max_workers, 1))
+
+    def lookup(n: int, batch: List[str]):
+        chunk_start = time.time()
+        try:
+            with span("batch.chunk", stage=dbpedia_stats.stage, chunk=n, items=len(batch)):
+                rows = _lookup_chunk(batch, n, "?", journal=journal)
+            with rows_lock:
+                dbpedia_rows.extend(rows)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            dbpedia_stats.record_chunk(time.time() - chunk_start)
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="dbpedia-stage") as executor:
+        while True:
+            names = name_queue.get()
+            if names is None:
+                break
+            if errors:
+                continue  # keep draining so the producer never blocks
+            names = [n for n in names if n is not None]
+            new_names = [n for n in dict.fromkeys(names) if n not in seen]
+            seen.update(new_names)
+            n_names += len(names)
+            for batch in split_into_chunks(new_names, dbpedia_chunk_size):
+                in_flight.acquire()
+                executor.submit(contextvars.copy_context().run, lookup, n_done, batch)
+                n_done += 1
+    dbpedia_stats.record_dedup(n_names, len(seen), dbpedia_chunk_size)
+    dbpedia_stats.finish()
+
+
+def _run_pipelined(
+    entity_contexts: List[Dict[str, str]],
+    canonical_chunk_size: int,
+    context_chunk_size: int,
+    dbpedia_chunk_size: int,
+    max_workers: int,
+    queue_size: int,
+    stats: Dict[str, StageStats],
+    journal: Optional[RunJournal] = None,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Run the three stages with overlap: context analysis in a background thread, canonical
+    normalization in the calling thread, and DBpedia lookup consuming finished canonical
+    chunks from a bounded queue. Returns (canonical_rows, context_rows, dbpedia_rows).
+    """
+    name_queue: "queue.Queue[Optional[List[str]]]" = queue.Queue(maxsize=queue_size)
+    context_out: Dict[str, List[Dict]] = {}
+    dbpedia_rows: List[Dict] = []
+    errors: List[Exception] = []
+
+    def run_context():
+        try:
+            context_out["rows"] = batch_context_analysis(
+                entity_contexts,
+                chunk_size=context_chunk_size,
+                output_format="list",
+                max_workers=max_workers,
+                stats=stats["context"],
+                journal=journal
+            )
+        except Exception as e:
+            errors.append(e)
+
+    # Stage threads run in copies of the caller's context so their spans share the pipeline's trace
+    context_thread = threading.Thread(target=contextvars.copy_context().run, args=(run_context,), name="context-stage")
+    dbpedia_thread = threading.Thread(
+        target=contextvars.copy_context().run, name="dbpedia-stage",
+        args=(_consume_names_for_dbpedia, name_queue, dbpedia_chunk_size, max_workers, stats["dbpedia"], journal,
+              dbpedia_rows, errors)
     )
-    if log:
-        print("[PIPELINE] Step 2: Batch context analysis...")
-    context_df = batch_context_analysis(
-        entity_contexts,
-        chunk_size=context_chunk_size,
-        output_format="dataframe"
+    context_thread.start()
+    dbpedia_thread.start()
+
+    canonical_stats = stats["canonical"]
+    canonical_stats.start()
+    mentions = [e['mention'] for e in entity_contexts]
+    unique_mentions = list(dict.fromkeys(mentions))
+    canonical_stats.record_dedup(len(mentions), len(unique_mentions), canonical_chunk_size)
+    resolved, remaining = resolve_from_label_index(unique_mentions, label_index, index_threshold)
+    canonical_stats.record_index_hits(len(unique_mentions), len(remaining), canonical_chunk_size)
+    chunks = split_into_chunks(remaining, canonical_chunk_size)
+    n_chunks = len(chunks)
+    chunk_results: List[Optional[List[Dict]]] = [None] * n_chunks
+    try:
+        if resolved:
+            name_queue.put([r["canonical_name"] for r in resolved])
+        for i, batch_results in iter_chunk_results(
+            lambda i, batch: _normalize_chunk(batch, i, n_chunks, journal, canonical_stats), chunks, max_workers, canonical_stats
+        ):
+            chunk_results[i] = batch_results
+            name_queue.put([r.get("canonical_name") for r in batch_results])
+    finally:
+        name_queue.put(None)
+        canonical_stats.finish()
+        context_thread.join()
+        dbpedia_thread.join()
+    if errors:
+        raise errors[0]
+
+    canonical_rows = dedupe_first(
+        resolved + [r for batch_results in chunk_results for r in batch_results], key=lambda r: r["mention"]
     )
+    return canonical_rows, context_out["rows"], dbpedia_rows
+
+
+def _run_fused(
+    entity_contexts: List[Dict[str, str]],
+    chunk_size: int,
+    dbpedia_chunk_size: int,
+    max_workers: int,
+    pipelined: bool,
+    queue_size: int,
+    stats: Dict[str, StageStats],
+    journal: Optional[RunJournal],
+    log: bool,
+    label_index: Optional[FuzzyLabelIndex] = None,
+    index_threshold: float = 0.9
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Run the fused normalization+analysis stage and the DBpedia lookup, sequentially or with
+    finished fused chunks streamed into the DBpedia stage. Returns (fused_rows, dbpedia_rows).
+    """
+    if not pipelined:
+        if log:
+            logger.info("Step 1: Batch fused normalization and context analysis...")
+        fused_rows = batch_fused_analysis(
+            entity_contexts,
+            chunk_size=chunk_size,
+            output_format="list",
+            max_workers=max_workers,
+            stats=stats["fused"],
+            journal=journal,
+            label_index=label_index,
+            index_threshold=index_threshold
+        )
+        if log:
+            logger.info("Step 2: Batch DBpedia URI lookup...")
+        dbpedia_rows = batch_dbpedia_uri_lookup(
+            _canonical_names(fused_rows),
+            output_format="list",
+            chunk_size=dbpedia_chunk_size,
+            max_workers=max_workers,
+            stats=stats["dbpedia"],
+            journal=journal
+        )
+        return fused_rows, dbpedia_rows
+
     if log:
-        print("[PIPELINE] Step 3: Batch DBpedia URI lookup...")
-    dbpedia_df = batch_dbpedia_uri_lookup(
-        list(canonical_df['canonical_name']),
-        output_format="dataframe",
-        chunk_size=dbpedia_chunk_size
+        logger.info("Running fused analysis and DBpedia lookup pipelined...")
+    name_queue: "queue.Queue[Optional[List[str]]]" = queue.Queue(maxsize=queue_size)
+    dbpedia_rows: List[Dict] = []
+    errors: List[Exception] = []
+    dbpedia_thread = threading.Thread(
+        target=contextvars.copy_context().run, name="dbpedia-stage",
+        args=(_consume_names_for_dbpedia, name_queue, dbpedia_chunk_size, max_workers, stats["dbpedia"], journal,
+              dbpedia_rows, errors)
     )
-    # Merge all results
-    merged = context_df.copy()
-    merged = merged.merge(canonical_df, left_on='mention', right_on='mention', how='left')
-    merged = merged.merge(dbpedia_df, left_on='canonical_name', right_on='canonical_name', how='left')
-    # Reorder columns
-    cols = [
-        'mention', 'context', 'canonical_name', 'entity_type', 'confidence', 'keywords', 'description', 'dbpedia_uri'
-    ]
-    merged = merged[cols]
-    if save_path:
-        save_results(merged, save_path)
+    dbpedia_thread.start()
+
+    fused_stats = stats["fused"]
+    fused_stats.start()
+    unique_pairs = dedupe_first(entity_contexts, key=lambda e: (e['mention'], e['context']))
+    fused_stats.record_dedup(len(entity_contexts), len(unique_pairs), chunk_size)
+    chunks = split_into_chunks(unique_pairs, chunk_size)
+    n_chunks = len(chunks)
+    chunk_results: List[Optional[List[Dict]]] = [None] * n_chunks
+    try:
+        for i, batch_results in iter_chunk_results(
+            lambda i, batch: _fuse_chunk(batch, i, n_chunks, journal, fused_stats), chunks, max_workers, fused_stats
+        ):
+            chunk_results[i] = apply_label_index(batch_results, label_index, index_threshold)
+            name_queue.put([r.get("canonical_name") for r in batch_results])
+    finally:
+        name_queue.put(None)
+        fused_stats.finish()
+        dbpedia_thread.join()
+    if errors:
+        raise errors[0]
+
+    fused_rows = dedupe_first(
+        [r for batch_results in chunk_results for r in batch_results], key=lambda r: (r["mention"], r["context"])
+    )
+    return fused_rows, dbpedia_rows
+
+
+def stream_full_batch_entity_linking(
+    records: Iterable[Dict[str, str]],
+    save_path: str,
+    window_size: int = 1000,
+    log: bool = True,
+    **pipeline_kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Bounded-memory variant of full_batch_entity_linking for inputs too large to hold in memory.
+
+    Records are consumed lazily in windows of window_size; each window runs through the full
+    pipeline and is appended to save_path (.csv or .jsonl, optionally .gz/.bz2/.xz, .parquet with
+    one row group per window, or .arrow/.feather with one record batch per window) before the next
+    window is read, so memory use does not grow with input size.
+    Repeated mentions across windows are served by the response and SPARQL caches.
+
+    Args:
+        records: Iterable of dicts with 'mention' and 'context' (e.g. iter_entity_contexts_from_file()).
+        save_path: Output file, written incrementally.
+        window_size: Number of records processed per window.
+        log: If True, print progress per window and a final summary.
+        **pipeline_kwargs: Passed to full_batch_entity_linking (chunk sizes, max_workers, pipelined, ...).
+    Returns:
+        Summary dict with 'windows', 'rows_written', 'error_rows' and 'seconds'.
+    """
+    start_time = time.time()
+    windows = 0
+    error_rows = 0
+    with open_result_writer(save_path) as writer:
+        for window in iter_windows(records, window_size):
+            df = full_batch_entity_linking(window, save_path=None, log=False, **pipeline_kwargs)
+            writer.write(df)
+            windows += 1
+            error_rows += int((df["canonical_name"].isnull() | df["dbpedia_uri"].isnull()).sum())
+            if log:
+                logger.info("Window %d: %d rows written (%d total)", windows, len(df), writer.rows_written)
+        rows_written = writer.rows_written
+    summary = {
+        "windows": windows,
+        "rows_written": rows_written,
+        "error_rows": error_rows,
+        "seconds": time.time() - start_time,
+    }
     if log:
-        print(f"[PIPELINE] Pipeline completed in {time.time() - start_time:.2f} seconds.")
-        summarize_errors(merged)
-    return merged
+        logger.info("Completed %d windows, %d rows in %.2f seconds.", windows, rows_written, summary['seconds'])
+        logger.info("%d entities had missing or ambiguous results.", error_rows)
+    return summary
 
 
 def load_entity_contexts_from_file(
-    filepath: str,
+    filepath: Union[str, Sequence[str]],
     mention_col: str = "mention",
     context_col: str = "context"
 ) -> List[Dict[str, str]]:
     """
-    Load entity-context pairs from a CSV, Excel, or JSON file.
+    Load entity-context pairs from CSV, Excel, JSON, JSONL, Parquet or Arrow files.
+    Args:
+        filepath: A file, a glob pattern, a directory of shards or a list of them (see
+            streaming_io.expand_input_paths). Only the mention and context columns are read
+            from CSV, JSONL, Parquet and Arrow inputs.
+        mention_col: Name of the mention column.
+        context_col: Name of the context column.
+    Returns:
+        List of dicts with 'mention' and 'context', shard by shard in path order.
     """
-    ext = os.path.splitext(filepath)[1].lower()
-    if ext == ".csv":
-        df = pd.read_csv(filepath)
-    elif ext in [".xlsx", ".xls"]:
-        df = pd.read_excel(filepath)
-    elif ext == ".json":
-        df = pd.read_json(filepath)
-    else:
-        raise ValueError(f"Unsupported file extension: {ext}")
-    return df[[mention_col, context_col]].rename(columns={mention_col: "mention", context_col: "context"}).to_dict(orient="records")
+    records: List[Dict[str, str]] = []
+    for path in expand_input_paths(filepath):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in [".xlsx", ".xls", ".json"]:
+            df = pd.read_excel(path) if ext != ".json" else pd.read_json(path)
+            records.extend(
+                df[[mention_col, context_col]].rename(columns={mention_col: "mention", context_col: "context"})
+                .to_dict(orient="records")
+            )
+        else:
+            records.extend(iter_entity_contexts_from_file(path, mention_col, context_col))
+    return records
 
 
-def save_results(df: pd.DataFrame, outpath: str):
+def save_results(df: pd.DataFrame, outpath: str, compression: Optional[str] = None, chunksize: int = 100000):
     """
-    Save the DataFrame to CSV, Excel, or JSON based on file extension.
+    Save the DataFrame based on file extension: CSV, Excel or JSON in one go, or JSONL
+    (optionally .gz/.bz2/.xz), Parquet and Arrow/Feather written in chunks of chunksize rows.
+    Args:
+        df: Result DataFrame.
+        outpath: Output file.
+        compression: Codec for chunked formats (see streaming_io.open_result_writer).
+        chunksize: Rows per Parquet row group / Arrow record batch / JSONL write.
     """
-    ext = os.path.splitext(outpath)[1].lower()
+    ext, _ = split_extension(outpath)
     if ext == ".csv":
-        df.to_csv(outpath, index=False)
+        df.to_csv(outpath, index=False, compression=compression or "infer")
     elif ext in [".xlsx", ".xls"]:
         df.to_excel(outpath, index=False)
     elif ext == ".json":
         df.to_json(outpath, orient="records", indent=2)
+    elif ext in STREAMING_FORMATS:
+        with open_result_writer(outpath, compression) as writer:
+            for start in range(0, len(df), chunksize):
+                writer.write(df.iloc[start:start + chunksize])
     else:
         raise ValueError(f"Unsupported output file extension: {ext}")
-    print(f"[EXPORT] Results saved to {outpath}")
+    logger.info("Results saved to %s", outpath)
 
 
 def summarize_errors(df: pd.DataFrame) -> pd.DataFrame:
@@ -108,5 +509,5 @@ def summarize_errors(df: pd.DataFrame) -> pd.DataFrame:
     Return a DataFrame of rows with missing or ambiguous results.
     """
     error_rows = df[df["canonical_name"].isnull() | df["dbpedia_uri"].isnull()]
-    print(f"[SUMMARY] {len(error_rows)} entities had missing or ambiguous results.")
+    logger.info("%d entities had missing or ambiguous results.", len(error_rows))
     return error_rows 
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Multi-process sharded execution of the batch pipeline.
+
+One pipeline process spends much of its time holding the GIL (JSON parsing,
+response extraction, DataFrame assembly) once network concurrency is high.
+`sharded_full_batch_entity_linking` partitions the input by a stable hash of the
+mention, runs `full_batch_entity_linking` on each shard in a process pool and
+reassembles the shard outputs in input order. Every occurrence of a mention lands
+in the same shard, so per-stage deduplication and each worker's in-memory caches
+and single-flight groups lose nothing to the split.
+
+The Gemini quota is either divided evenly between the worker processes ("split")
+or shared exactly through the file-backed limiter ("shared").
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from batch_preprocessing.full_batch_pipeline import full_batch_entity_linking, save_results
+from hybrid_linking.rate_limit import RateLimiter, set_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MODES = ("split", "shared")
+
+
+def shard_for(mention: Any, num_shards: int) -> int:
+    """Stable shard number of a mention (CRC32, identical across processes and runs, unlike hash())."""
+    return zlib.crc32(str(mention).encode("utf-8")) % num_shards
+
+
+def partition_by_mention(entity_contexts: Sequence[Dict[str, str]], num_shards: int) -> List[List[int]]:
+    """
+    Partition input positions by the shard of their mention.
+    Args:
+        entity_contexts: Records with 'mention'.
+        num_shards: Number of shards.
+    Returns:
+        One list of input positions per shard, each in input order.
+    """
+    positions: List[List[int]] = [[] for _ in range(num_shards)]
+    shard_of: Dict[Any, int] = {}
+    for i, record in enumerate(entity_contexts):
+        mention = record['mention']
+        shard = shard_of.get(mention)
+        if shard is None:
+            shard = shard_of[mention] = shard_for(mention, num_shards)
+        positions[shard].append(i)
+    return positions
+
+
+def _init_worker(
+    rpm: Optional[float],
+    tpm: Optional[float],
+    state_path: Optional[str],
+    initializer: Optional[Callable[..., Any]],
+    initargs: Tuple
+):
+    """Install this worker's share of the Gemini quota, then run the caller's initializer."""
+    set_rate_limiter(RateLimiter(rpm=rpm, tpm=tpm, state_path=state_path))
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_shard(shard: int, records: List[Dict[str, str]], pipeline_kwargs: Dict[str, Any]) -> Tuple[int, pd.DataFrame, float]:
+    start = time.time()
+    df = full_batch_entity_linking(records, save_path=None, **pipeline_kwargs)
+    return shard, df, time.time() - start
+
+
+def _shard_run_id(run_id: Optional[str], shard: int, num_shards: int) -> Optional[str]:
+    # One journal per shard: shards are disjoint, and SQLite journals are not shared between writers
+    return f"{run_id}-shard{shard}of{num_shards}" if run_id else None
+
+
+def sharded_full_batch_entity_linking(
+    entity_contexts: List[Dict[str, str]],
+    processes: Optional[int] = None,
+    shards: Optional[int] = None,
+    rate_limit: Optional[str] = None,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    save_path: Optional[str] = None,
+    log: bool = True,
+    mp_context: Optional[str] = "spawn",
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: Tuple = (),
+    **pipeline_kwargs: Any
+) -> pd.DataFrame:
+    """
+    Run full_batch_entity_linking on mention-hash shards in a process pool.
+
+    Worker processes are started with `spawn` by default, so scripts calling this must
+    guard their entry point with `if __name__ == "__main__":`. Each worker runs its own
+    thread pools, so the total number of concurrent requests is processes * max_workers.
+    Args:
+        entity_contexts: List of dicts with 'mention' and 'context'.
+        processes: Worker processes (default: os.cpu_count()).
+        shards: Number of shards (default: processes). More shards than processes evens out
+            skewed mention distributions at the cost of less cache sharing within a worker.
+        rate_limit: "split" gives each worker rpm/processes and tpm/processes; "shared" makes all
+            workers draw from one file-backed quota (GEMINI_RATE_LIMIT_FILE or a temporary file).
+            Default: "shared" if GEMINI_RATE_LIMIT_FILE is set, else "split".
+        rpm: Total Gemini requests per minute across all workers (default: GEMINI_RPM, 0 = unlimited).
+        tpm: Total Gemini tokens per minute across all workers (default: GEMINI_TPM, 0 = unlimited).
+        save_path: If set, save the merged results to this file (see save_results).
+        log: If True, log progress per completed shard.
+        mp_context: multiprocessing start method ("spawn", "forkserver" or "fork").
+        initializer: Optional callable run in every worker after the rate limiter is installed
+            (e.g. to point clients at other endpoints); must be picklable.
+        initargs: Arguments for initializer.
+        **pipeline_kwargs: Passed to full_batch_entity_linking in every shard (chunk sizes, max_workers,
+            pipelined, fused, run_id, resume, ...). run_id and resume get a per-shard suffix, so resuming
+            requires the same number of shards.
+    Returns:
+        DataFrame with one row per input record in input order, as from full_batch_entity_linking.
+        Per-shard rows, seconds and stage statistics are attached as df.attrs["shard_stats"].
+    """
+    start_time = time.time()
+    processes = processes or os.cpu_count() or 1
+    shards = shards or processes
+    if rate_limit is None:
+        rate_limit = "shared" if os.getenv("GEMINI_RATE_LIMIT_FILE") else "split"
+    if rate_limit not in RATE_LIMIT_MODES:
+        raise ValueError(f"Unknown rate_limit mode: {rate_limit} (use {', '.join(RATE_LIMIT_MODES)})")
+    rpm = float(os.getenv("GEMINI_RPM", "0")) if rpm is None else rpm
+    tpm = float(os.getenv("GEMINI_TPM", "0")) if tpm is None else tpm
+
+    positions = partition_by_mention(entity_contexts, shards)
+    work = [shard for shard in range(shards) if positions[shard]]
+    workers = max(1, min(processes, len(work)))
+    state_path = None
+    temp_state = None
+    if rate_limit == "shared":
+        state_path = os.getenv("GEMINI_RATE_LIMIT_FILE")
+        if not state_path:
+            fd, temp_state = tempfile.mkstemp(prefix="gemini-quota-", suffix=".json")
+            os.close(fd)
+            state_path = temp_state
+        worker_rpm, worker_tpm = rpm, tpm
+    else:
+        worker_rpm, worker_tpm = rpm / workers, tpm / workers
+    if log:
+        logger.info("Running %d records in %d shards on %d processes (rate limit: %s)",
+                    len(entity_contexts), len(work), workers, rate_limit)
+
+    run_id, resume = pipeline_kwargs.pop("run_id", None), pipeline_kwargs.pop("resume", None)
+    frames: Dict[int, pd.DataFrame] = {}
+    shard_stats: Dict[int, Dict[str, Any]] = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(mp_context) if mp_context else None,
+            initializer=_init_worker,
+            initargs=(worker_rpm, worker_tpm, state_path, initializer, initargs)
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_shard, shard, [entity_contexts[i] for i in positions[shard]],
+                    {"log": False, **pipeline_kwargs,
+                     "run_id": _shard_run_id(run_id, shard, shards), "resume": _shard_run_id(resume, shard, shards)}
+                )
+                for shard in work
+            ]
+            for future in as_completed(futures):
+                shard, df, seconds = future.result()
+                frames[shard] = df
+                shard_stats[shard] = {"shard": shard, "rows": len(df), "seconds": seconds,
+                                      "stage_stats": df.attrs.get("stage_stats", {})}
+                if log:
+                    logger.info("Shard %d done: %d rows in %.2fs (%d/%d shards)",
+                                shard, len(df), seconds, len(frames), len(work))
+    finally:
+        if temp_state is not None:
+            os.remove(temp_state)
+
+    # Shard outputs are in shard-input order; scatter them back to input positions
+    if frames:
+        merged = pd.concat([frames[shard] for shard in work], ignore_index=True)
+        order = np.concatenate([np.asarray(positions[shard], dtype=np.int64) for shard in work])
+        merged = merged.take(np.argsort(order, kind="stable")).reset_index(drop=True)
+    else:
+        merged = full_batch_entity_linking([], save_path=None, log=False, **pipeline_kwargs)
+    merged.attrs = {"shard_stats": [shard_stats[shard] for shard in work]}
+    if save_path:
+        save_results(merged, save_path)
+    if log:
+        logger.info("Sharded pipeline completed in %.2f seconds.", time.time() - start_time)
+    return merged
@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+import math
+import threading
+import time
+from hybrid_linking.metrics import get_metrics
+
+_metrics = get_metrics()
+BATCH_CHUNKS = _metrics.histogram("batch_chunk_duration_seconds", "Processing time of batch stage chunks", ["stage"])
+BATCH_ITEMS = _metrics.counter("batch_items_total", "Items entering a batch stage, before de-duplication", ["stage"])
+BATCH_UNIQUE_ITEMS = _metrics.counter("batch_unique_items_total", "Distinct items a batch stage had to resolve", ["stage"])
+BATCH_CALLS_SAVED = _metrics.counter("batch_calls_saved_total", "Calls saved by de-duplication and the label index", ["stage"])
+BATCH_INDEX_HITS = _metrics.counter("batch_index_hits_total", "Items resolved from the label index", ["stage"])
+BATCH_RETRIES = _metrics.counter("batch_retries_total", "Retries of transient failures in a batch stage", ["stage"])
+BATCH_SPLITS = _metrics.counter("batch_splits_total", "Failing chunks split in half", ["stage"])
+BATCH_GAVE_UP = _metrics.counter("batch_gave_up_total", "Items left unresolved after bisection", ["stage"])
+
+
+def percentile(sorted_samples: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile (0-100) of an already sorted, non-empty sequence."""
+    rank = max(1, math.ceil(p / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+@dataclass
+class StageStats:
+    """
+    Timing and call counters for one batch stage, safe to update from worker threads.
+    Every update is also added to the process-wide batch_* metrics, labelled by stage.
+    """
+    stage: str
+    chunks: int = 0
+    busy_seconds: float = 0.0
+    input_items: int = 0
+    unique_items: int = 0
+    calls_saved: int = 0
+    index_hits: int = 0
+    retries: int = 0
+    splits: int = 0
+    gave_up: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunk_seconds: List[float] = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = time.time()
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    def record_dedup(self, input_items: int, unique_items: int, chunk_size: int):
+        """Record how many items were de-duplicated before dispatch and the calls that saved."""
+        with self._lock:
+            self.input_items += input_items
+            self.unique_items += unique_items
+            saved = math.ceil(input_items / chunk_size) - math.ceil(unique_items / chunk_size)
+            self.calls_saved += saved
+        BATCH_ITEMS.inc(input_items, stage=self.stage)
+        BATCH_UNIQUE_ITEMS.inc(unique_items, stage=self.stage)
+        BATCH_CALLS_SAVED.inc(saved, stage=self.stage)
+
+    def record_index_hits(self, unique_items: int, remaining_items: int, chunk_size: int):
+        """Record items resolved from a label index instead of being dispatched, and the calls that saved."""
+        with self._lock:
+            saved = math.ceil(unique_items / chunk_size) - math.ceil(remaining_items / chunk_size)
+            self.index_hits += unique_items - remaining_items
+            self.calls_saved += saved
+        BATCH_INDEX_HITS.inc(unique_items - remaining_items, stage=self.stage)
+        BATCH_CALLS_SAVED.inc(saved, stage=self.stage)
+
+    def record_retry(self, error: Optional[BaseException] = None):
+        """Record one retry of a transient failure (usable as an on_retry callback)."""
+        with self._lock:
+            self.retries += 1
+        BATCH_RETRIES.inc(stage=self.stage)
+
+    def record_split(self):
+        with self._lock:
+            self.splits += 1
+        BATCH_SPLITS.inc(stage=self.stage)
+
+    def record_gave_up(self, items: int):
+        with self._lock:
+            self.gave_up += items
+        BATCH_GAVE_UP.inc(items, stage=self.stage)
+
+    def summary(self) -> str:
+        summary = (f"{self.stage}: {self.input_items} items, {self.unique_items} unique, "
+                   f"{self.chunks} calls ({self.calls_saved} saved by de-duplication")
+        if self.index_hits:
+            summary += f" and {self.index_hits} label index hits"
+        summary += ")"
+        if self.retries or self.splits or self.gave_up:
+            summary += f", {self.retries} retries, {self.splits} splits, {self.gave_up} items given up"
+        return summary
+
+    def record_chunk(self, seconds: float):
+        with self._lock:
+            self.chunks += 1
+            self.busy_seconds += seconds
+            self.chunk_seconds.append(seconds)
+        BATCH_CHUNKS.observe(seconds, stage=self.stage)
+
+    def latency_percentiles(self, percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, float]:
+        """Per-chunk latency percentiles in seconds, keyed "p50", "p95", ... (empty if no chunks ran)."""
+        with self._lock:
+            samples = sorted(self.chunk_seconds)
+        return {f"p{p:g}": percentile(samples, p) for p in percentiles} if samples else {}
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def utilization(self, wall_seconds: Optional[float] = None, workers: int = 1) -> float:
+        """
+        Fraction of the available worker time this stage spent processing chunks.
+        Args:
+            wall_seconds: Reference wall time (defaults to the stage's own wall time).
+            workers: Number of workers the stage could use concurrently.
+        """
+        wall_seconds = self.wall_seconds if wall_seconds is None else wall_seconds
+        if wall_seconds <= 0:
+            return 0.0
+        return self.busy_seconds / (wall_seconds * max(workers, 1))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "chunks": self.chunks,
+            "busy_seconds": self.busy_seconds,
+            "wall_seconds": self.wall_seconds,
+            "input_items": self.input_items,
+            "unique_items": self.unique_items,
+            "calls_saved": self.calls_saved,
+            "index_hits": self.index_hits,
+            "retries": self.retries,
+            "splits": self.splits,
+            "gave_up": self.gave_up,
+            "chunk_latency": self.latency_percentiles(),
+        }
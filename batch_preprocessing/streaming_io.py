@@ -0,0 +1,321 @@
+from abc import ABC, abstractmethod
+import bz2
+import glob
+import gzip
+import json
+import lzma
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import pandas as pd
+
+RESULT_COLUMNS = [
+    'mention', 'context', 'canonical_name', 'entity_type', 'confidence', 'keywords', 'description', 'dbpedia_uri'
+]
+# Formats readable in chunks; CSV and JSONL may carry a compression suffix (e.g. part-0.jsonl.gz)
+STREAMING_FORMATS = (".csv", ".jsonl", ".parquet", ".arrow", ".feather")
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+_TEXT_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def split_extension(path: str) -> Tuple[str, Optional[str]]:
+    """
+    Return (format extension, compression) for a path, e.g. "part-0.jsonl.gz" -> (".jsonl", "gzip").
+    """
+    root, ext = os.path.splitext(path)
+    ext = ext.lower()
+    compression = COMPRESSION_SUFFIXES.get(ext)
+    if compression is not None:
+        ext = os.path.splitext(root)[1].lower()
+    return ext, compression
+
+
+def _open_text(path: str, mode: str, compression: Optional[str]):
+    """Open a text file for "r" or "w", transparently (de)compressing gzip, bz2 or xz."""
+    if compression is None:
+        return open(path, mode, encoding="utf-8", newline="")
+    if compression not in _TEXT_OPENERS:
+        raise ValueError(f"Unsupported text compression: {compression} (use {', '.join(_TEXT_OPENERS)})")
+    return _TEXT_OPENERS[compression](path, mode + "t", encoding="utf-8", newline="")
+
+
+def expand_input_paths(inputs: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Expand input shards into a sorted list of files.
+    Args:
+        inputs: A file path, a glob pattern ("exports/part-*.parquet", "**" is recursive), a directory
+            (every supported file below it, skipping hidden and "_"-prefixed files such as _SUCCESS),
+            or a list of any of these.
+    Returns:
+        File paths; each directory or pattern contributes its matches in sorted order.
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    paths: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = []
+            for root, dirs, files in os.walk(item):
+                dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
+                found.extend(
+                    os.path.join(root, name) for name in files
+                    if not name.startswith((".", "_")) and split_extension(name)[0] in STREAMING_FORMATS
+                )
+            paths.extend(sorted(found))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"No input files match {item}")
+            paths.extend(matches)
+        else:
+            paths.append(item)
+    return paths
+
+
+def iter_entity_context_chunks(
+    filepath: Union[str, Sequence[str]],
+    mention_col: str = "mention",
+    context_col: str = "context",
+    chunksize: int = 10000
+) -> Iterator[List[Dict[str, str]]]:
+    """
+    Lazily yield lists of up to chunksize entity-context pairs from one or more input shards.
+
+    Only the mention and context columns are read: CSV through usecols, Parquet through column
+    projection, Arrow IPC/Feather through a memory map (other columns are never touched), and
+    JSONL by keeping just the two fields of each parsed line.
+    Args:
+        filepath: File, glob pattern, directory or list of them (see expand_input_paths); files may
+            be .csv, .jsonl (optionally .gz/.bz2/.xz), .parquet, .arrow or .feather.
+        mention_col: Name of the mention column in the input.
+        context_col: Name of the context column in the input.
+        chunksize: Maximum number of records per yielded list.
+    Returns:
+        Iterator of lists of dicts with 'mention' and 'context', shard by shard in path order.
+    """
+    for path in expand_input_paths(filepath):
+        ext, compression = split_extension(path)
+        if ext == ".csv":
+            chunks = _iter_csv_chunks(path, mention_col, context_col, chunksize)
+        elif ext == ".jsonl":
+            chunks = _iter_jsonl_chunks(path, compression, mention_col, context_col, chunksize)
+        elif ext == ".parquet":
+            chunks = _iter_parquet_chunks(path, mention_col, context_col, chunksize)
+        elif ext in (".arrow", ".feather"):
+            chunks = _iter_arrow_chunks(path, mention_col, context_col, chunksize)
+        else:
+            raise ValueError(
+                f"Unsupported streaming input extension: {ext} (use {', '.join(STREAMING_FORMATS)})"
+            )
+        yield from chunks
+
+
+def iter_entity_contexts_from_file(
+    filepath: Union[str, Sequence[str]],
+    mention_col: str = "mention",
+    context_col: str = "context",
+    chunksize: int = 10000
+) -> Iterator[Dict[str, str]]:
+    """
+    Lazily yield entity-context pairs from CSV, JSONL, Parquet or Arrow shards, reading chunksize rows at a time.
+    See iter_entity_context_chunks for the accepted inputs.
+    """
+    for chunk in iter_entity_context_chunks(filepath, mention_col, context_col, chunksize):
+        yield from chunk
+
+
+def _iter_csv_chunks(path: str, mention_col: str, context_col: str, chunksize: int) -> Iterator[List[Dict[str, str]]]:
+    columns = [mention_col, context_col]
+    for df in pd.read_csv(path, usecols=columns, chunksize=chunksize, compression="infer"):
+        df = df[columns].rename(columns={mention_col: "mention", context_col: "context"})
+        yield df.to_dict(orient="records")
+
+
+def _iter_jsonl_chunks(
+    path: str, compression: Optional[str], mention_col: str, context_col: str, chunksize: int
+) -> Iterator[List[Dict[str, str]]]:
+    chunk: List[Dict[str, str]] = []
+    with _open_text(path, "r", compression) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            chunk.append({"mention": obj.get(mention_col), "context": obj.get(context_col)})
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _batch_records(batch, mention_col: str, context_col: str) -> List[Dict[str, str]]:
+    mentions = batch.column(mention_col).to_pylist()
+    contexts = batch.column(context_col).to_pylist()
+    return [{"mention": m, "context": c} for m, c in zip(mentions, contexts)]
+
+
+def _iter_parquet_chunks(path: str, mention_col: str, context_col: str, chunksize: int) -> Iterator[List[Dict[str, str]]]:
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=[mention_col, context_col]):
+        yield _batch_records(batch, mention_col, context_col)
+
+
+def _iter_arrow_chunks(path: str, mention_col: str, context_col: str, chunksize: int) -> Iterator[List[Dict[str, str]]]:
+    import pyarrow as pa
+    with pa.memory_map(path, "r") as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            # Not the random-access file format: read it as an IPC stream
+            source.seek(0)
+            batches = iter(pa.ipc.open_stream(source))
+        for batch in batches:
+            for offset in range(0, batch.num_rows, chunksize):
+                yield _batch_records(batch.slice(offset, chunksize), mention_col, context_col)
+
+
+def result_schema():
+    """Arrow schema of the result columns (requires pyarrow)."""
+    import pyarrow as pa
+    return pa.schema([
+        ("mention", pa.string()),
+        ("context", pa.string()),
+        ("canonical_name", pa.string()),
+        ("entity_type", pa.string()),
+        ("confidence", pa.float64()),
+        ("keywords", pa.list_(pa.string())),
+        ("description", pa.string()),
+        ("dbpedia_uri", pa.string()),
+    ])
+
+
+class ResultWriter(ABC):
+    """
+    Append result DataFrames to an output file one window at a time.
+    Use open_result_writer() to get the writer for a file extension.
+    """
+
+    def __init__(self, outpath: str):
+        self.outpath = outpath
+        self.rows_written = 0
+
+    def write(self, df: pd.DataFrame):
+        self._write(df[RESULT_COLUMNS])
+        self.rows_written += len(df)
+
+    @abstractmethod
+    def _write(self, df: pd.DataFrame):
+        """Write one window of result columns."""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CSVResultWriter(ResultWriter):
+    """Writes CSV, compressed when compression is "gzip", "bz2" or "xz"."""
+
+    def __init__(self, outpath: str, compression: Optional[str] = None):
+        super().__init__(outpath)
+        self._file = _open_text(outpath, "w", compression)
+
+    def _write(self, df: pd.DataFrame):
+        df.to_csv(self._file, header=self.rows_written == 0, index=False)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLResultWriter(ResultWriter):
+    """Writes one JSON object per line (missing values as null), optionally compressed like CSVResultWriter."""
+
+    def __init__(self, outpath: str, compression: Optional[str] = None):
+        super().__init__(outpath)
+        self._file = _open_text(outpath, "w", compression)
+
+    def _write(self, df: pd.DataFrame):
+        if len(df):
+            self._file.write(df.to_json(orient="records", lines=True, force_ascii=False, default_handler=str))
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowResultWriter(ResultWriter):
+    """Converts each window to an Arrow table with result_schema() (requires pyarrow)."""
+
+    def __init__(self, outpath: str):
+        super().__init__(outpath)
+        import pyarrow as pa
+        self._pa = pa
+        self.schema = result_schema()
+
+    def _to_table(self, df: pd.DataFrame):
+        df = df.copy()
+        df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce")
+        df["keywords"] = [[str(k) for k in v] if isinstance(v, list) else [] for v in df["keywords"]]
+        for col in ("mention", "context", "canonical_name", "entity_type", "description", "dbpedia_uri"):
+            df[col] = [None if v is None or (isinstance(v, float) and v != v) else str(v) for v in df[col]]
+        return self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+
+class ParquetResultWriter(_ArrowResultWriter):
+    """Writes each window as one Parquet row group, compressed with compression (snappy, zstd, gzip, ... or none)."""
+
+    def __init__(self, outpath: str, compression: Optional[str] = "snappy"):
+        super().__init__(outpath)
+        import pyarrow.parquet as pq
+        self._writer = pq.ParquetWriter(outpath, self.schema, compression=compression or "none")
+
+    def _write(self, df: pd.DataFrame):
+        self._writer.write_table(self._to_table(df))
+
+    def close(self):
+        self._writer.close()
+
+
+class ArrowResultWriter(_ArrowResultWriter):
+    """
+    Writes an Arrow IPC file (Feather v2), one record batch per window, with buffers compressed
+    with compression ("lz4", "zstd" or none). The output can be memory-mapped by readers.
+    """
+
+    def __init__(self, outpath: str, compression: Optional[str] = "lz4"):
+        super().__init__(outpath)
+        options = self._pa.ipc.IpcWriteOptions(compression=compression)
+        self._writer = self._pa.ipc.new_file(outpath, self.schema, options=options)
+
+    def _write(self, df: pd.DataFrame):
+        self._writer.write_table(self._to_table(df))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_result_writer(outpath: str, compression: Optional[str] = None) -> ResultWriter:
+    """
+    Return an incremental writer for a .csv, .jsonl, .parquet, .arrow or .feather output path.
+    Args:
+        outpath: Output file. For CSV and JSONL a .gz, .bz2 or .xz suffix selects the compression.
+        compression: Overrides the compression: "gzip", "bz2" or "xz" for CSV/JSONL, a Parquet codec
+            (default "snappy") or an Arrow IPC codec ("lz4" by default, or "zstd").
+    """
+    ext, suffix_compression = split_extension(outpath)
+    if ext == ".csv":
+        return CSVResultWriter(outpath, compression or suffix_compression)
+    elif ext == ".jsonl":
+        return JSONLResultWriter(outpath, compression or suffix_compression)
+    elif ext == ".parquet":
+        return ParquetResultWriter(outpath, compression or "snappy")
+    elif ext in (".arrow", ".feather"):
+        return ArrowResultWriter(outpath, compression or "lz4")
+    raise ValueError(f"Unsupported streaming output extension: {ext} (use {', '.join(STREAMING_FORMATS)})")
@@ -0,0 +1,549 @@
+"""
+Durable work queues for distributed linking jobs.
+
+A job is a set of work units (JSON payloads) that workers lease for a limited
+time. A worker that dies simply stops renewing its lease; once the lease expires
+the unit becomes available again, and a unit that keeps failing (or keeps losing
+its workers) is marked failed after max_attempts leases. Completing or failing a
+unit requires the lease token, so a worker whose lease was taken over cannot
+overwrite the new holder's outcome.
+
+`SQLiteWorkQueue` is the reference backend for workers sharing one host or a
+filesystem with working locks. `RedisWorkQueue` implements the same interface on
+a Redis-style key-value server for workers on many nodes; `LocalRedis` is an
+in-process stand-in for it.
+"""
+
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+UNIT_STATES = ("pending", "leased", "done", "failed")
+
+
+@dataclass
+class WorkUnit:
+    """A leased unit of work; lease_token identifies this lease to renew, complete and fail."""
+    job_id: str
+    unit_id: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_token: str
+    lease_expires: float
+
+
+class WorkQueue(ABC):
+    """
+    Interface of a work queue backend.
+
+    Args:
+        max_attempts: Number of leases after which a unit that has not completed is marked failed.
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def put_job(self, job_id: str, config: Dict[str, Any]) -> bool:
+        """Store a job's configuration; returns False (and keeps the old one) if the job exists."""
+        pass
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's configuration, or None if it was never submitted."""
+        pass
+
+    @abstractmethod
+    def add_units(self, job_id: str, units: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Add (unit_id, payload) pairs as pending; ids already present are ignored. Returns the number added."""
+        pass
+
+    @abstractmethod
+    def lease(self, job_id: str, worker_id: str, lease_seconds: float) -> Optional[WorkUnit]:
+        """Lease the next available unit (pending, or leased with an expired lease), or return None."""
+        pass
+
+    @abstractmethod
+    def renew(self, unit: WorkUnit, lease_seconds: float) -> bool:
+        """Extend a lease; returns False if the lease was lost."""
+        pass
+
+    @abstractmethod
+    def complete(self, unit: WorkUnit) -> bool:
+        """Mark a leased unit done; returns False if the lease was lost."""
+        pass
+
+    @abstractmethod
+    def fail(self, unit: WorkUnit, error: str, retry_delay: float = 0.0) -> str:
+        """
+        Release a leased unit after an error: it becomes pending again after retry_delay, or
+        failed once it has been leased max_attempts times. Returns the unit's new state.
+        """
+        pass
+
+    @abstractmethod
+    def progress(self, job_id: str) -> Dict[str, int]:
+        """Number of units per state (UNIT_STATES) and in total."""
+        pass
+
+    @abstractmethod
+    def unit_ids(self, job_id: str, state: Optional[str] = None) -> List[str]:
+        """Ids of the job's units (optionally only those in state), sorted."""
+        pass
+
+    @abstractmethod
+    def payload(self, job_id: str, unit_id: str) -> Dict[str, Any]:
+        """Payload of a unit."""
+        pass
+
+    @abstractmethod
+    def errors(self, job_id: str) -> Dict[str, str]:
+        """Last recorded error per unit."""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _progress(states: Iterable[str]) -> Dict[str, int]:
+    counts = {state: 0 for state in UNIT_STATES}
+    for state in states:
+        counts[state] += 1
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in one SQLite file (WAL mode); leases are taken in IMMEDIATE
+    transactions, so concurrent workers never lease the same unit.
+
+    Args:
+        path: Database file, shared by the coordinator and all workers.
+        max_attempts: See WorkQueue.
+        busy_timeout: Seconds to wait for another process's write lock.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, busy_timeout: float = 30.0):
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, config TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS units ("
+                "job_id TEXT NOT NULL, unit_id TEXT NOT NULL, payload TEXT NOT NULL, state TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL DEFAULT 0, "
+                "lease_owner TEXT, lease_token TEXT, lease_expires REAL, error TEXT, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (job_id, unit_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS units_by_state ON units (job_id, state, unit_id)")
+
+    def _transaction(self, fn, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def put_job(self, job_id: str, config: Dict[str, Any]) -> bool:
+        def insert():
+            return self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, config, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(config), time.time())
+            ).rowcount == 1
+        return self._transaction(insert)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def add_units(self, job_id: str, units: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        now = time.time()
+        rows = [(job_id, unit_id, json.dumps(payload, default=str), "pending", now) for unit_id, payload in units]
+
+        def insert():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO units (job_id, unit_id, payload, state, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+        return self._transaction(insert)
+
+    def lease(self, job_id: str, worker_id: str, lease_seconds: float) -> Optional[WorkUnit]:
+        def take():
+            now = time.time()
+            while True:
+                row = self._conn.execute(
+                    "SELECT unit_id, payload, attempts FROM units WHERE job_id = ? AND "
+                    "((state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires <= ?)) "
+                    "ORDER BY unit_id LIMIT 1", (job_id, now, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                unit_id, payload, attempts = row
+                if attempts >= self.max_attempts:
+                    # Every lease so far expired or failed: stop handing the unit out
+                    self._conn.execute(
+                        "UPDATE units SET state = 'failed', error = COALESCE(error, 'lease expired'), "
+                        "lease_token = NULL, updated_at = ? WHERE job_id = ? AND unit_id = ?", (now, job_id, unit_id)
+                    )
+                    continue
+                token = uuid.uuid4().hex
+                expires = now + lease_seconds
+                self._conn.execute(
+                    "UPDATE units SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_token = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE job_id = ? AND unit_id = ?",
+                    (worker_id, token, expires, now, job_id, unit_id)
+                )
+                return WorkUnit(job_id, unit_id, json.loads(payload), attempts + 1, token, expires)
+        return self._transaction(take)
+
+    def renew(self, unit: WorkUnit, lease_seconds: float) -> bool:
+        expires = time.time() + lease_seconds
+
+        def extend():
+            return self._conn.execute(
+                "UPDATE units SET lease_expires = ?, updated_at = ? WHERE job_id = ? AND unit_id = ? "
+                "AND state = 'leased' AND lease_token = ?",
+                (expires, time.time(), unit.job_id, unit.unit_id, unit.lease_token)
+            ).rowcount == 1
+        renewed = self._transaction(extend)
+        if renewed:
+            unit.lease_expires = expires
+        return renewed
+
+    def complete(self, unit: WorkUnit) -> bool:
+        def finish():
+            return self._conn.execute(
+                "UPDATE units SET state = 'done', lease_token = NULL, error = NULL, updated_at = ? "
+                "WHERE job_id = ? AND unit_id = ? AND state = 'leased' AND lease_token = ?",
+                (time.time(), unit.job_id, unit.unit_id, unit.lease_token)
+            ).rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, unit: WorkUnit, error: str, retry_delay: float = 0.0) -> str:
+        def release():
+            now = time.time()
+            state = "failed" if unit.attempts >= self.max_attempts else "pending"
+            updated = self._conn.execute(
+                "UPDATE units SET state = ?, available_at = ?, lease_token = NULL, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND unit_id = ? AND state = 'leased' AND lease_token = ?",
+                (state, now + retry_delay, error, now, unit.job_id, unit.unit_id, unit.lease_token)
+            ).rowcount == 1
+            if updated:
+                return state
+            return self._conn.execute(
+                "SELECT state FROM units WHERE job_id = ? AND unit_id = ?", (unit.job_id, unit.unit_id)
+            ).fetchone()[0]
+        return self._transaction(release)
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM units WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall()
+        counts = {state: 0 for state in UNIT_STATES}
+        counts.update(dict(rows))
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def unit_ids(self, job_id: str, state: Optional[str] = None) -> List[str]:
+        with self._lock:
+            if state is None:
+                rows = self._conn.execute("SELECT unit_id FROM units WHERE job_id = ? ORDER BY unit_id", (job_id,))
+            else:
+                rows = self._conn.execute(
+                    "SELECT unit_id FROM units WHERE job_id = ? AND state = ? ORDER BY unit_id", (job_id, state)
+                )
+            return [row[0] for row in rows.fetchall()]
+
+    def payload(self, job_id: str, unit_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM units WHERE job_id = ? AND unit_id = ?", (job_id, unit_id)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No unit {unit_id} in job {job_id}")
+        return json.loads(row[0])
+
+    def errors(self, job_id: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT unit_id, error FROM units WHERE job_id = ? AND error IS NOT NULL ORDER BY unit_id", (job_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Work queue on a Redis-style server, for workers spread over many nodes.
+
+    Per job: a sorted set of unfinished unit ids scored by the time they become
+    available (0 when added, lease expiry while leased, retry time after a failure),
+    hashes of payloads, states, attempts and errors, and one lease key per leased unit
+    set with NX and a TTL. Claiming the lease key is the atomic step, so two workers
+    never lease the same unit; after claiming it, the unit's queue score and state are
+    checked again so a unit completed since the range query is not leased again. The token checks in renew/complete/fail are separate
+    commands; a worker that loses a lease in between at worst rewrites the unit's
+    (identical) result file.
+
+    Args:
+        client: redis.Redis(..., decode_responses=True) or any client with the same
+            commands (see LocalRedis).
+        prefix: Key prefix for all jobs.
+        max_attempts: See WorkQueue.
+    """
+
+    def __init__(self, client, prefix: str = "linking", max_attempts: int = 3):
+        super().__init__(max_attempts)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, job_id: str, name: str) -> str:
+        return f"{self.prefix}:{job_id}:{name}"
+
+    def _lease_key(self, job_id: str, unit_id: str) -> str:
+        return self._key(job_id, f"lease:{unit_id}")
+
+    def _holds_lease(self, unit: WorkUnit) -> bool:
+        return self.client.get(self._lease_key(unit.job_id, unit.unit_id)) == unit.lease_token
+
+    def put_job(self, job_id: str, config: Dict[str, Any]) -> bool:
+        return bool(self.client.set(self._key(job_id, "config"), json.dumps(config), nx=True))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._key(job_id, "config"))
+        return json.loads(raw) if raw is not None else None
+
+    def add_units(self, job_id: str, units: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        added = 0
+        for unit_id, payload in units:
+            if not self.client.hsetnx(self._key(job_id, "state"), unit_id, "pending"):
+                continue
+            self.client.hset(self._key(job_id, "payload"), unit_id, json.dumps(payload, default=str))
+            self.client.zadd(self._key(job_id, "queue"), {unit_id: 0})
+            added += 1
+        return added
+
+    def lease(self, job_id: str, worker_id: str, lease_seconds: float) -> Optional[WorkUnit]:
+        queue_key = self._key(job_id, "queue")
+        now = time.time()
+        candidates = self.client.zrangebyscore(queue_key, "-inf", now, start=0, num=16)
+        for unit_id in candidates:
+            token = uuid.uuid4().hex
+            lease_key = self._lease_key(job_id, unit_id)
+            if not self.client.set(lease_key, token, nx=True, px=max(1, int(lease_seconds * 1000))):
+                continue  # leased by another worker since the range query
+            score = self.client.zscore(queue_key, unit_id)
+            if score is None or score > now or self.client.hget(self._key(job_id, "state"), unit_id) in ("done", "failed"):
+                # Completed, failed or re-leased between the range query and the claim
+                self.client.delete(lease_key)
+                continue
+            attempts = int(self.client.hincrby(self._key(job_id, "attempts"), unit_id, 1))
+            if attempts > self.max_attempts:
+                # Every lease so far expired or failed: stop handing the unit out
+                self.client.zrem(queue_key, unit_id)
+                self.client.hset(self._key(job_id, "state"), unit_id, "failed")
+                if self.client.hget(self._key(job_id, "error"), unit_id) is None:
+                    self.client.hset(self._key(job_id, "error"), unit_id, "lease expired")
+                self.client.delete(lease_key)
+                continue
+            expires = now + lease_seconds
+            self.client.zadd(queue_key, {unit_id: expires})
+            self.client.hset(self._key(job_id, "state"), unit_id, "leased")
+            payload = json.loads(self.client.hget(self._key(job_id, "payload"), unit_id))
+            return WorkUnit(job_id, unit_id, payload, attempts, token, expires)
+        return None
+
+    def renew(self, unit: WorkUnit, lease_seconds: float) -> bool:
+        if not self._holds_lease(unit):
+            return False
+        expires = time.time() + lease_seconds
+        self.client.pexpire(self._lease_key(unit.job_id, unit.unit_id), max(1, int(lease_seconds * 1000)))
+        self.client.zadd(self._key(unit.job_id, "queue"), {unit.unit_id: expires})
+        unit.lease_expires = expires
+        return True
+
+    def complete(self, unit: WorkUnit) -> bool:
+        if not self._holds_lease(unit):
+            return False
+        if not self.client.zrem(self._key(unit.job_id, "queue"), unit.unit_id):
+            return False
+        self.client.hset(self._key(unit.job_id, "state"), unit.unit_id, "done")
+        self.client.delete(self._lease_key(unit.job_id, unit.unit_id))
+        return True
+
+    def fail(self, unit: WorkUnit, error: str, retry_delay: float = 0.0) -> str:
+        state_key = self._key(unit.job_id, "state")
+        if not self._holds_lease(unit):
+            return self.client.hget(state_key, unit.unit_id)
+        self.client.hset(self._key(unit.job_id, "error"), unit.unit_id, error)
+        if unit.attempts >= self.max_attempts:
+            self.client.zrem(self._key(unit.job_id, "queue"), unit.unit_id)
+            state = "failed"
+        else:
+            self.client.zadd(self._key(unit.job_id, "queue"), {unit.unit_id: time.time() + retry_delay})
+            state = "pending"
+        self.client.hset(state_key, unit.unit_id, state)
+        self.client.delete(self._lease_key(unit.job_id, unit.unit_id))
+        return state
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        return _progress(self.client.hvals(self._key(job_id, "state")))
+
+    def unit_ids(self, job_id: str, state: Optional[str] = None) -> List[str]:
+        states = self.client.hgetall(self._key(job_id, "state"))
+        return sorted(unit_id for unit_id, unit_state in states.items() if state is None or unit_state == state)
+
+    def payload(self, job_id: str, unit_id: str) -> Dict[str, Any]:
+        raw = self.client.hget(self._key(job_id, "payload"), unit_id)
+        if raw is None:
+            raise KeyError(f"No unit {unit_id} in job {job_id}")
+        return json.loads(raw)
+
+    def errors(self, job_id: str) -> Dict[str, str]:
+        return dict(sorted(self.client.hgetall(self._key(job_id, "error")).items()))
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of redis.Redis(decode_responses=True) used by
+    RedisWorkQueue: strings with NX/TTL, hashes and sorted sets. Thread-safe; data
+    lives only as long as the object.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _live(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            del self._expires[key]
+        return key in self._data
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._data[key] if self._live(key) else None
+
+    def set(self, key: str, value: str, nx: bool = False, px: Optional[int] = None) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key):
+                return None
+            self._data[key] = str(value)
+            self._expires.pop(key, None)
+            if px is not None:
+                self._expires[key] = time.time() + px / 1000.0
+            return True
+
+    def pexpire(self, key: str, px: int) -> bool:
+        with self._lock:
+            if not self._live(key):
+                return False
+            self._expires[key] = time.time() + px / 1000.0
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._live(key):
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+            return removed
+
+    def _hash(self, key: str) -> Dict[str, str]:
+        if not self._live(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def hset(self, key: str, field: str, value: Any) -> int:
+        with self._lock:
+            fields = self._hash(key)
+            new = field not in fields
+            fields[field] = str(value)
+            return int(new)
+
+    def hsetnx(self, key: str, field: str, value: Any) -> bool:
+        with self._lock:
+            fields = self._hash(key)
+            if field in fields:
+                return False
+            fields[field] = str(value)
+            return True
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        with self._lock:
+            return self._data[key].get(field) if self._live(key) else None
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._hash(key)
+            value = int(fields.get(field, 0)) + amount
+            fields[field] = str(value)
+            return value
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._data[key]) if self._live(key) else {}
+
+    def hvals(self, key: str) -> List[str]:
+        with self._lock:
+            return list(self._data[key].values()) if self._live(key) else []
+
+    def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            members = self._hash(key)
+            new = sum(1 for member in mapping if member not in members)
+            members.update({member: float(score) for member, score in mapping.items()})
+            return new
+
+    def zrem(self, key: str, *members: str) -> int:
+        with self._lock:
+            if not self._live(key):
+                return 0
+            return sum(1 for member in members if self._data[key].pop(member, None) is not None)
+
+    def zscore(self, key: str, member: str) -> Optional[float]:
+        with self._lock:
+            return self._data[key].get(member) if self._live(key) else None
+
+    def zrangebyscore(self, key: str, min: Any, max: Any, start: Optional[int] = None,
+                      num: Optional[int] = None) -> List[str]:
+        with self._lock:
+            if not self._live(key):
+                return []
+            low, high = float(min), float(max)
+            members = sorted((score, member) for member, score in self._data[key].items() if low <= score <= high)
+            members = [member for _, member in members]
+            if start is not None:
+                members = members[start:start + num if num is not None else None]
+            return members
@@ -0,0 +1,4 @@
+"""
+Benchmark harness: mock Gemini/SPARQL servers, synthetic datasets and a report runner.
+Run `python -m benchmarks.run_benchmarks --help` for usage.
+"""
@@ -0,0 +1,269 @@
+"""
+Local stand-ins for the Gemini `generateContent` API and a DBpedia SPARQL endpoint.
+
+Both servers answer the prompt and query shapes this repository sends (batched and
+single-entity Gemini prompts, VALUES and FILTER label queries) with deterministic,
+well-formed results, so pipelines can be benchmarked without spending quota.
+Latency, error rate and a requests-per-minute limit are configurable per server:
+
+    with MockServer("gemini", MockServerConfig(latency="lognormal:0.4:0.3", rpm=600)) as gemini:
+        ...  # point GEMINI_API_URL at gemini.url
+        print(gemini.stats())
+
+Latency specs: "0" (none), "constant:S", "uniform:LOW:HIGH", "exponential:MEAN" and
+"lognormal:MEDIAN:SIGMA", all in seconds.
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from batch_preprocessing.stats import percentile
+from hybrid_linking.rate_limit import TokenBucket, estimate_tokens
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Build a latency sampler (seconds) from a spec such as "constant:0.05" or "lognormal:0.3:0.5".
+    Args:
+        spec: Distribution name and parameters separated by colons (see module docstring).
+        rng: Random source the sampler draws from.
+    Returns:
+        Function returning one latency sample per call.
+    """
+    name, *args = str(spec).split(":")
+    params = [float(a) for a in args]
+    if name in ("", "0", "none"):
+        return lambda: 0.0
+    if name == "constant":
+        return lambda: params[0]
+    if name == "uniform":
+        return lambda: rng.uniform(params[0], params[1])
+    if name == "exponential":
+        return lambda: rng.expovariate(1.0 / params[0])
+    if name == "lognormal":
+        mu = math.log(params[0])
+        return lambda: rng.lognormvariate(mu, params[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@dataclass
+class MockServerConfig:
+    """
+    Behaviour of a mock server.
+
+    Args:
+        latency: Latency spec applied to every request (see parse_latency).
+        error_rate: Fraction of requests answered with 503 (retried by the client as transient).
+        garbage_rate: Fraction of Gemini requests answered with unparseable text (HTTP 200).
+        miss_rate: Fraction of labels the SPARQL server does not resolve (stable per label).
+        rpm: Requests per minute before the server answers 429 with Retry-After (0 = unlimited).
+        seed: Seed for latency and error sampling.
+    """
+    latency: str = "0"
+    error_rate: float = 0.0
+    garbage_rate: float = 0.0
+    miss_rate: float = 0.0
+    rpm: float = 0.0
+    seed: int = 0
+
+
+def canonicalize(mention: str) -> str:
+    """Canonical name the mock Gemini server returns for a mention ("acme corp" -> "Acme_Corp")."""
+    return "_".join(word.capitalize() for word in mention.split())
+
+
+ANALYSIS = {"entity_type": "company", "confidence": 0.9, "keywords": ["benchmark"], "description": "Synthetic entity"}
+
+
+def gemini_reply(prompt: str) -> str:
+    """Answer one Gemini prompt in the format the calling code expects."""
+    fused = "'canonical_name'" in prompt and "'entity_type'" in prompt
+    if "- id: " in prompt:
+        items = re.findall(r"^- id: (\d+)\n  mention: (.*)$", prompt, re.M)
+        if "'entity_type'" in prompt:
+            rows = [dict({"id": int(i)}, **ANALYSIS, **({"canonical_name": canonicalize(m)} if fused else {}))
+                    for i, m in items]
+        else:
+            rows = [{"id": int(i), "canonical_name": canonicalize(m)} for i, m in items]
+        return json.dumps(rows)
+    if "Pairs:" in prompt:
+        pairs = re.findall(r"^- mention: (.*)\n  context: (.*)$", prompt, re.M)
+        return json.dumps([dict({"mention": m, "context": c}, **ANALYSIS,
+                                **({"canonical_name": canonicalize(m)} if fused else {}))
+                           for m, c in pairs])
+    if "Entities:" in prompt:
+        mentions = re.findall(r"^- (.*)$", prompt, re.M)
+        return json.dumps([{"mention": m, "canonical_name": canonicalize(m)} for m in mentions])
+    entity = re.search(r"^Entity: (.*)$", prompt, re.M)
+    mention = entity.group(1) if entity else ""
+    if "canonical_name:" in prompt:
+        return json.dumps(dict({"canonical_name": canonicalize(mention)}, **ANALYSIS))
+    if "entity_type:" in prompt:
+        return json.dumps(ANALYSIS)
+    return canonicalize(mention)
+
+
+def sparql_reply(query: str, miss_rate: float) -> Dict[str, Any]:
+    """Answer a label lookup query with one resource per resolved label, in SPARQL JSON result format."""
+    bindings = []
+    for label in re.findall(r'"((?:[^"\\]|\\.)*)"@en', query):
+        label = re.sub(r"\\(.)", r"\1", label)
+        if zlib.crc32(label.encode("utf-8")) % 10000 < miss_rate * 10000:
+            continue
+        uri = "http://dbpedia.org/resource/" + label.replace(" ", "_")
+        bindings.append({
+            "uri": {"type": "uri", "value": uri},
+            "label": {"type": "literal", "value": label},
+            "type": {"type": "uri", "value": "http://dbpedia.org/ontology/Company"},
+            "abstract": {"type": "literal", "value": f"{label} is a synthetic company."},
+        })
+    return {"head": {"vars": ["uri", "label"]}, "results": {"bindings": bindings}}
+
+
+class MockServer:
+    """
+    Threaded HTTP server speaking either the Gemini ("gemini") or the SPARQL ("sparql") protocol.
+
+    Args:
+        kind: "gemini" or "sparql".
+        config: Latency, error and rate limit behaviour.
+        host: Interface to bind (port is chosen by the OS).
+    """
+
+    def __init__(self, kind: str, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1"):
+        if kind not in ("gemini", "sparql"):
+            raise ValueError(f"Unknown mock server kind: {kind}")
+        self.kind = kind
+        self.config = config or MockServerConfig()
+        self.host = host
+        self._rng = random.Random(self.config.seed)
+        self._sample_latency = parse_latency(self.config.latency, self._rng)
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(self.config.rpm) if self.config.rpm else None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.reset()
+
+    @property
+    def url(self) -> str:
+        path = "/v1beta/models/mock:generateContent" if self.kind == "gemini" else "/sparql"
+        return f"http://{self.host}:{self._server.server_port}{path}"
+
+    def start(self) -> "MockServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+                server._handle(self, body=body)
+
+            def do_GET(self):
+                server._handle(self, query=parse_qs(urlparse(self.path).query).get("query", [""])[0])
+
+        self._server = ThreadingHTTPServer((self.host, 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        """Clear the request counters and latency samples (e.g. between benchmark cases)."""
+        with self._lock:
+            self.requests = 0
+            self.items = 0
+            self.tokens = 0
+            self.status_counts: Dict[int, int] = {}
+            self.latencies: List[float] = []
+            if self._bucket is not None:
+                self._bucket = TokenBucket(self.config.rpm)
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests received, per-status counts, prompt tokens / labels received and server latency percentiles."""
+        with self._lock:
+            samples = sorted(self.latencies)
+            stats = {
+                "requests": self.requests,
+                "status_counts": {str(code): n for code, n in sorted(self.status_counts.items())},
+            }
+            if self.kind == "gemini":
+                stats["prompt_tokens"] = self.tokens
+            else:
+                stats["labels"] = self.items
+        stats["latency"] = {f"p{p}": percentile(samples, p) for p in (50, 95, 99)} if samples else {}
+        return stats
+
+    def _admit(self) -> Optional[float]:
+        """Return None if the request is within the rate limit, else the seconds until it would be."""
+        if self._bucket is None:
+            return None
+        self._bucket.reserve(0)  # refill
+        if self._bucket.level >= 1:
+            self._bucket.level -= 1
+            return None
+        return (1 - self._bucket.level) / self._bucket.rate
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: bytes = b"", query: str = ""):
+        with self._lock:
+            self.requests += 1
+            retry_after = self._admit()
+            failed = self._rng.random() < self.config.error_rate
+            garbage = self._rng.random() < self.config.garbage_rate
+            delay = self._sample_latency()
+        if retry_after is not None:
+            self._send(handler, 429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                       {"Retry-After": str(max(1, math.ceil(retry_after)))})
+            return
+        time.sleep(delay)
+        if failed:
+            self._send(handler, 503, {"error": {"code": 503, "status": "UNAVAILABLE"}}, latency=delay)
+            return
+        if self.kind == "gemini":
+            prompt = json.loads(body or b"{}").get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+            text = "Sorry, I cannot help with that." if garbage else gemini_reply(prompt)
+            with self._lock:
+                self.tokens += estimate_tokens(prompt)
+            payload = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        else:
+            payload = sparql_reply(query, self.config.miss_rate)
+            with self._lock:
+                self.items += query.count('"@en')
+        self._send(handler, 200, payload, latency=delay)
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, payload: Dict[str, Any],
+              headers: Optional[Dict[str, str]] = None, latency: float = 0.0):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status != 429:
+                self.latencies.append(latency)
@@ -0,0 +1,275 @@
+"""
+Benchmark the linking entry points against local mock Gemini and SPARQL servers.
+
+Every (target, size) case runs in a fresh process, so caches start cold and peak RSS
+is measured per case. The report is a JSON document with one entry per case:
+rows/sec, per-stage latency percentiles, peak RSS and the calls each server received.
+
+    python -m benchmarks.run_benchmarks --targets pipeline,batch_link --sizes 1k,100k \\
+        --gemini-latency lognormal:0.3:0.4 --gemini-rpm 2000 --max-workers 8 --output bench.json
+
+Targets:
+    pipeline    full_batch_entity_linking (stages: canonical/context/dbpedia, or fused/dbpedia)
+    batch_link  GeneralizedEntityLinker.batch_link, timed per window of --window-size entities
+    linker      link_entity_to_dbpedia, one call per row over --max-workers threads
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from batch_preprocessing.stats import percentile
+from benchmarks.datasets import parse_size, zipf_entity_contexts
+from benchmarks.mock_servers import MockServer, MockServerConfig
+
+TARGETS = ("pipeline", "batch_link", "linker")
+REPORT_VERSION = 1
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, Any]:
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+    return {"count": len(samples), **{f"p{p}": percentile(samples, p) for p in (50, 95, 99)}}
+
+
+def point_clients_at(gemini_url: str, sparql_url: str):
+    """Redirect the module-level Gemini and DBpedia endpoints of this process to the mock servers."""
+    import hybrid_linking.gemini_api as gemini_api
+    import hybrid_linking.dbpedia_sparql as dbpedia_sparql
+    import hybrid_linking.linker as linker
+    import batch_preprocessing.batch_dbpedia_uri as batch_dbpedia_uri
+
+    gemini_api.GEMINI_API_URL = gemini_url
+    dbpedia_sparql.DBPEDIA_SPARQL_ENDPOINT = sparql_url
+    linker.DBPEDIA_SPARQL_ENDPOINT = sparql_url
+    batch_dbpedia_uri.DBPEDIA_SPARQL_ENDPOINT = sparql_url
+
+
+def _bench_pipeline(rows: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+    from batch_preprocessing.full_batch_pipeline import full_batch_entity_linking
+
+    df = full_batch_entity_linking(
+        rows,
+        canonical_chunk_size=options["chunk_size"],
+        context_chunk_size=options["chunk_size"],
+        dbpedia_chunk_size=options["dbpedia_chunk_size"],
+        log=False,
+        max_workers=options["max_workers"],
+        pipelined=options["pipelined"],
+        fused=options["fused"],
+    )
+    stages = {
+        stage: {"count": stats["chunks"], **stats["chunk_latency"],
+                "retries": stats["retries"], "gave_up": stats["gave_up"]}
+        for stage, stats in df.attrs["stage_stats"].items()
+    }
+    return {"stages": stages, "rows_out": len(df), "unresolved_rows": int(df["dbpedia_uri"].isnull().sum())}
+
+
+def _bench_batch_link(rows: List[Dict[str, str]], options: Dict[str, Any], gemini_url: str,
+                      sparql_url: str) -> Dict[str, Any]:
+    from hybrid_linking import DBpediaKnowledgeBase, GeminiProvider, GeneralizedEntityLinker
+
+    provider = GeminiProvider(api_key="benchmark")
+    provider.api_url = gemini_url
+    linker = GeneralizedEntityLinker(llm_provider=provider, knowledge_bases=[DBpediaKnowledgeBase(sparql_url)],
+                                     fused=options["fused"])
+    windows = [rows[i:i + options["window_size"]] for i in range(0, len(rows), options["window_size"])]
+    latencies = []
+    unresolved = 0
+
+    def link_window(window):
+        start = time.time()
+        results = linker.batch_link(window, chunk_size=options["chunk_size"])
+        latencies.append(time.time() - start)
+        return sum(1 for result in results if not result.candidates)
+
+    with ThreadPoolExecutor(max_workers=options["max_workers"]) as executor:
+        unresolved = sum(executor.map(link_window, windows))
+    return {"stages": {"batch_link_window": latency_summary(latencies)}, "rows_out": len(rows),
+            "unresolved_rows": unresolved}
+
+
+def _bench_linker(rows: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+    from hybrid_linking.linker import link_entity_to_dbpedia
+
+    latencies = []
+
+    def link_one(row):
+        start = time.time()
+        result = link_entity_to_dbpedia(row["mention"], row["context"], fused=options["fused"])
+        latencies.append(time.time() - start)
+        return 0 if result["candidates"] else 1
+
+    with ThreadPoolExecutor(max_workers=options["max_workers"]) as executor:
+        unresolved = sum(executor.map(link_one, rows))
+    return {"stages": {"link_entity": latency_summary(latencies)}, "rows_out": len(rows),
+            "unresolved_rows": unresolved}
+
+
+def run_case(target: str, n_rows: int, options: Dict[str, Any], gemini_url: str, sparql_url: str) -> Dict[str, Any]:
+    """
+    Run one benchmark case in the current process (meant to be a fresh worker process).
+    Args:
+        target: One of TARGETS.
+        n_rows: Number of synthetic rows.
+        options: Parsed command line options (chunk sizes, workers, dataset shape, ...).
+        gemini_url: Mock Gemini endpoint.
+        sparql_url: Mock SPARQL endpoint.
+    Returns:
+        Result dict for the report (timings, stage latencies, peak RSS).
+    """
+    point_clients_at(gemini_url, sparql_url)
+    rows = zipf_entity_contexts(n_rows, options["entities"], options["skew"], options["seed"])
+    dataset_rss = peak_rss_mb()
+    output = contextlib.nullcontext() if options["verbose"] else contextlib.redirect_stdout(io.StringIO())
+    start = time.time()
+    with output:
+        if target == "pipeline":
+            result = _bench_pipeline(rows, options)
+        elif target == "batch_link":
+            result = _bench_batch_link(rows, options, gemini_url, sparql_url)
+        elif target == "linker":
+            result = _bench_linker(rows, options)
+        else:
+            raise ValueError(f"Unknown benchmark target: {target}")
+    seconds = time.time() - start
+    return {
+        "target": target,
+        "rows": n_rows,
+        "unique_mentions": len({row["mention"] for row in rows}),
+        "seconds": seconds,
+        "rows_per_sec": n_rows / seconds if seconds > 0 else None,
+        **result,
+        "dataset_rss_mb": dataset_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(targets: Sequence[str], sizes: Sequence[int], options: Dict[str, Any],
+                   gemini_config: MockServerConfig, sparql_config: MockServerConfig) -> Dict[str, Any]:
+    """
+    Start the mock servers, run every (target, size) case in its own process and build the report.
+    Args:
+        targets: Targets to run (see TARGETS).
+        sizes: Row counts to run each target with.
+        options: Options passed to run_case.
+        gemini_config: Mock Gemini server behaviour.
+        sparql_config: Mock SPARQL server behaviour.
+    Returns:
+        Report dict with 'version', 'environment', 'config' and 'results'.
+    """
+    # Read by the worker processes when their caches and limiters are first created
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ["SPARQL_CACHE_PATH"] = ""
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    if options["client_rpm"]:
+        os.environ["GEMINI_RPM"] = str(options["client_rpm"])
+    results = []
+    with MockServer("gemini", gemini_config) as gemini, MockServer("sparql", sparql_config) as sparql:
+        for target in targets:
+            for n_rows in sizes:
+                print(f"[BENCH] {target} with {n_rows} rows...")
+                gemini.reset()
+                sparql.reset()
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    result = executor.submit(run_case, target, n_rows, options, gemini.url, sparql.url).result()
+                result["calls"] = {"gemini": gemini.stats(), "sparql": sparql.stats()}
+                results.append(result)
+                print(f"[BENCH] {target} {n_rows} rows: {result['rows_per_sec']:.1f} rows/s, "
+                      f"{result['calls']['gemini']['requests']} Gemini / {result['calls']['sparql']['requests']} SPARQL "
+                      f"calls, peak RSS {result['peak_rss_mb']:.0f} MiB")
+    return {
+        "version": REPORT_VERSION,
+        "environment": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "git_commit": _git_commit(),
+        },
+        "config": {
+            "options": options,
+            "gemini_server": vars(gemini_config),
+            "sparql_server": vars(sparql_config),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="pipeline", help=f"Comma-separated targets from {', '.join(TARGETS)}")
+    parser.add_argument("--sizes", default="1k", help="Comma-separated row counts, e.g. 1k,100k,1M")
+    parser.add_argument("--entities", type=int, default=None, help="Distinct entities (default: rows / 10)")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the entity distribution")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency", default="lognormal:0.2:0.4")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-garbage-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-rpm", type=float, default=0.0, help="Server-side limit (429 above it)")
+    parser.add_argument("--sparql-latency", default="lognormal:0.05:0.3")
+    parser.add_argument("--sparql-error-rate", type=float, default=0.0)
+    parser.add_argument("--sparql-miss-rate", type=float, default=0.05)
+    parser.add_argument("--sparql-rpm", type=float, default=0.0)
+    parser.add_argument("--client-rpm", type=float, default=0.0, help="Client-side GEMINI_RPM for the workers")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=10, help="LLM chunk size (pipeline and batch_link)")
+    parser.add_argument("--dbpedia-chunk-size", type=int, default=50)
+    parser.add_argument("--window-size", type=int, default=1000, help="Entities per batch_link call")
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipelines' own progress output")
+    parser.add_argument("--output", default="benchmark_report.json")
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    options = {
+        "entities": args.entities, "skew": args.skew, "seed": args.seed,
+        "max_workers": args.max_workers, "chunk_size": args.chunk_size,
+        "dbpedia_chunk_size": args.dbpedia_chunk_size, "window_size": args.window_size,
+        "pipelined": args.pipelined, "fused": args.fused, "client_rpm": args.client_rpm,
+        "verbose": args.verbose,
+    }
+    gemini_config = MockServerConfig(latency=args.gemini_latency, error_rate=args.gemini_error_rate,
+                                     garbage_rate=args.gemini_garbage_rate, rpm=args.gemini_rpm, seed=args.seed)
+    sparql_config = MockServerConfig(latency=args.sparql_latency, error_rate=args.sparql_error_rate,
+                                     miss_rate=args.sparql_miss_rate, rpm=args.sparql_rpm, seed=args.seed + 1)
+    report = run_benchmarks(targets, sizes, options, gemini_config, sparql_config)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
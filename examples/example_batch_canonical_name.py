@@ -1,5 +1,9 @@
+import logging
 from batch_preprocessing.batch_canonical_name import batch_canonical_name_normalization
 
+# Show progress (use logging.DEBUG for per-batch detail)
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+
 entities = [
     "Apple",
     "Microsoft",
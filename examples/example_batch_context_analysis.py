@@ -1,5 +1,9 @@
+import logging
 from batch_preprocessing.batch_context_analysis import batch_context_analysis
 
+# Show progress (use logging.DEBUG for per-batch detail)
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+
 entity_contexts = [
     {"mention": "Apple", "context": "I work at Apple"},
     {"mention": "Apple", "context": "I eat an apple every day"},
@@ -1,5 +1,9 @@
+import logging
 from batch_preprocessing.batch_dbpedia_uri import batch_dbpedia_uri_lookup
 
+# Show progress (use logging.DEBUG for per-batch detail)
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+
 canonical_names = [
     "Apple_Inc.",
     "Microsoft",
@@ -1,5 +1,9 @@
+import logging
 from batch_preprocessing.full_batch_pipeline import full_batch_entity_linking
 
+# Show progress (use logging.DEBUG for per-batch detail)
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+
 entity_contexts = [
     {"mention": "Apple", "context": "I work at Apple"},
     {"mention": "Apple", "context": "I eat an apple every day"},
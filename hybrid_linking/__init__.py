@@ -5,10 +5,25 @@ A flexible and extensible entity linking system that combines LLM-based
 entity normalization and context analysis with knowledge base queries.
 """
 
-from .generalized_linker import GeneralizedEntityLinker, LinkingResult
-from .knowledge_base import KnowledgeBase, KnowledgeBaseRegistry, EntityCandidate, DBpediaKnowledgeBase
-from .llm_provider import LLMProvider, LLMRegistry, GeminiProvider
+from .generalized_linker import GeneralizedEntityLinker, LinkingResult, CompactLinkingResult, LinkingBatch
+from .knowledge_base import (
+    KnowledgeBase, KnowledgeBaseRegistry, EntityCandidate, CompactEntityCandidate, DBpediaKnowledgeBase
+)
+from .columnar import ColumnBatch, CategoryColumn
+from .llm_provider import LLMProvider, LLMRegistry, GeminiProvider, HedgedProvider
 from .linker import link_entity_to_dbpedia
+from .cache import LRUCache, SQLiteCache, TieredCache, get_response_cache, set_response_cache
+from .sparql_cache import SPARQLResultCache, get_sparql_cache, set_sparql_cache
+from .http_pool import HTTPPool, get_http_pool, set_http_pool
+from .local_dbpedia import LocalDBpediaKnowledgeBase, build_label_index
+from .fuzzy_index import FuzzyLabelIndex, FuzzyKnowledgeBase
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter, get_rate_limiter, set_rate_limiter
+from .singleflight import SingleFlight, get_single_flight
+from .metrics import (
+    MetricsRegistry, SpanRecorder, get_metrics, render_prometheus, start_metrics_server,
+    span, add_span_exporter, remove_span_exporter, use_opentelemetry
+)
 
 # Convenience function for quick usage
 def create_default_linker():
@@ -25,14 +40,50 @@ def create_default_linker():
 __version__ = "1.0.0"
 __all__ = [
     "GeneralizedEntityLinker",
-    "LinkingResult", 
+    "LinkingResult",
+    "CompactLinkingResult",
+    "LinkingBatch", 
     "KnowledgeBase",
     "KnowledgeBaseRegistry",
+    "CompactEntityCandidate",
+    "ColumnBatch",
+    "CategoryColumn",
     "EntityCandidate",
     "DBpediaKnowledgeBase",
     "LLMProvider",
     "LLMRegistry",
+    "HedgedProvider",
     "GeminiProvider",
     "link_entity_to_dbpedia",
-    "create_default_linker"
+    "create_default_linker",
+    "LRUCache",
+    "SQLiteCache",
+    "TieredCache",
+    "get_response_cache",
+    "set_response_cache",
+    "SPARQLResultCache",
+    "get_sparql_cache",
+    "set_sparql_cache",
+    "HTTPPool",
+    "get_http_pool",
+    "set_http_pool",
+    "LocalDBpediaKnowledgeBase",
+    "build_label_index",
+    "FuzzyLabelIndex",
+    "FuzzyKnowledgeBase",
+    "RetryPolicy",
+    "RateLimiter",
+    "get_rate_limiter",
+    "set_rate_limiter",
+    "MetricsRegistry",
+    "SpanRecorder",
+    "get_metrics",
+    "render_prometheus",
+    "start_metrics_server",
+    "span",
+    "add_span_exporter",
+    "remove_span_exporter",
+    "use_opentelemetry",
+    "SingleFlight",
+    "get_single_flight"
 ] 
\ No newline at end of file
@@ -0,0 +1,385 @@
+"""
+Response caching for LLM and SPARQL calls.
+
+A two-tier cache: an in-process LRU (bounded by entry count and approximate
+size in bytes) in front of an optional SQLite store on disk, so identical
+prompts are answered locally across runs. Keys are derived from the model name
+and a hash of the whitespace-normalized prompt.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import get_metrics
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so cosmetic prompt differences share a cache entry."""
+    return " ".join(prompt.split())
+
+
+def make_cache_key(model: str, prompt: str) -> str:
+    """Build a cache key from the model name and the normalized prompt hash."""
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate the size of a cached value in bytes."""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    sets: int = 0
+    evictions: int = 0
+    bypassed: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with TTL and size-based eviction.
+
+    Args:
+        max_entries: Maximum number of entries kept in memory.
+        max_bytes: Maximum approximate total size of cached values (None = unbounded).
+        ttl: Default time-to-live in seconds (None = never expires).
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """Store a value. An explicit expires_at takes precedence over ttl."""
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = time.time() + ttl if ttl is not None else None
+        size = _sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def items(self) -> Iterator[Tuple[str, Any, Optional[float]]]:
+        """Yield (key, value, expires_at) for all live entries."""
+        now = time.time()
+        with self._lock:
+            snapshot = list(self._data.items())
+        for key, (value, expires_at, _) in snapshot:
+            if expires_at is None or expires_at > now:
+                yield key, value, expires_at
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache stored in a SQLite database.
+
+    Values are stored as JSON together with their creation and expiry timestamps.
+    The connection is shared across threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL)"
+            )
+            self._conn.commit()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float, Optional[float]]]:
+        """Return (value, created_at, expires_at) for a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, created_at, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value), created_at, expires_at
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None,
+            created_at: Optional[float] = None):
+        now = time.time()
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), created_at if created_at is not None else now, expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def items(self) -> Iterator[Tuple[str, Any, Optional[float]]]:
+        """Yield (key, value, expires_at) for all live entries."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM cache WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),),
+            ).fetchall()
+        for key, value, expires_at in rows:
+            yield key, json.loads(value), expires_at
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class TieredCache:
+    """
+    LRU memory tier in front of an optional SQLite disk tier.
+
+    Reads check memory first, then disk (promoting disk hits into memory).
+    Writes go to both tiers. Setting `enabled` to False bypasses the cache entirely.
+
+    Args:
+        memory: In-process LRU tier (a default one is created if omitted).
+        disk: Optional persistent tier.
+        ttl: Default time-to-live in seconds for new entries (None = never expires).
+        enabled: Bypass switch; when False, get() always misses and set() is a no-op.
+        name: Label under which the process-wide caches report their stats as metrics.
+    """
+
+    def __init__(self, memory: Optional[LRUCache] = None, disk: Optional[SQLiteCache] = None,
+                 ttl: Optional[float] = None, enabled: bool = True, name: str = "cache"):
+        self.name = name
+        self.memory = memory if memory is not None else LRUCache(ttl=ttl)
+        self.disk = disk
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, amount in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + amount)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        if not self.enabled:
+            self._count(bypassed=1)
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(hits=1, memory_hits=1)
+            return value
+        if self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, _, expires_at = entry
+                self.memory.set(key, value, expires_at=expires_at)
+                self._count(hits=1, disk_hits=1)
+                return value
+        self._count(misses=1)
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """Store a value in all tiers. An explicit expires_at takes precedence over ttl."""
+        if not self.enabled:
+            return
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = time.time() + ttl if ttl is not None else None
+        before = self.memory.evictions
+        self.memory.set(key, value, expires_at=expires_at)
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at=expires_at)
+        self._count(sets=1, evictions=self.memory.evictions - before)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def items(self) -> Iterator[Tuple[str, Any, Optional[float]]]:
+        """Yield (key, value, expires_at) for all live entries, from disk when available."""
+        tier = self.disk if self.disk is not None else self.memory
+        return tier.items()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = CacheStats()
+
+
+def cache_metric_families(caches: List[TieredCache]):
+    """Metric families (see MetricsRegistry.add_collector) for the hit/miss counters of caches."""
+    families = []
+    for metric, kind, help, attr in (
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache", "hits"),
+        ("cache_misses_total", "counter", "Cache lookups that missed", "misses"),
+        ("cache_evictions_total", "counter", "Entries evicted from the memory tier", "evictions"),
+        ("cache_hit_ratio", "gauge", "Fraction of lookups answered from the cache", "hit_rate"),
+    ):
+        samples = [(metric, {"cache": cache.name}, getattr(cache.stats, attr)) for cache in caches]
+        families.append((metric, kind, help, samples))
+    return families
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+_response_cache: Optional[TieredCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def create_cache_from_env(prefix: str = "LLM_CACHE", name: str = "cache") -> TieredCache:
+    """
+    Build a TieredCache configured from environment variables:
+        {prefix}_PATH: SQLite file for the disk tier (memory-only if unset).
+        {prefix}_TTL: Default TTL in seconds.
+        {prefix}_MAX_ENTRIES: Maximum entries in the memory tier.
+        {prefix}_DISABLED: Set to 1/true to bypass the cache.
+    name is the cache's label in the cache_* metrics.
+    """
+    ttl = _env_float(f"{prefix}_TTL")
+    max_entries = int(os.getenv(f"{prefix}_MAX_ENTRIES", "10000"))
+    path = os.getenv(f"{prefix}_PATH")
+    disabled = os.getenv(f"{prefix}_DISABLED", "").lower() in ("1", "true", "yes")
+    return TieredCache(
+        memory=LRUCache(max_entries=max_entries, ttl=ttl),
+        disk=SQLiteCache(path, ttl=ttl) if path else None,
+        ttl=ttl,
+        enabled=not disabled,
+        name=name,
+    )
+
+
+def get_response_cache() -> TieredCache:
+    """Return the process-wide LLM response cache, creating it from the environment on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = create_cache_from_env("LLM_CACHE", name="llm")
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[TieredCache]):
+    """Replace the process-wide LLM response cache (None resets it to the environment default)."""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = cache
+
+
+get_metrics().add_collector(lambda: cache_metric_families([_response_cache] if _response_cache is not None else []))
@@ -0,0 +1,250 @@
+"""
+Column-oriented containers for large batches of linking results.
+
+A list of a million result dicts (or dataclass instances) costs a dict or
+`__dict__`, a float object and a string reference per field per row. `ColumnBatch`
+stores each field as one column instead: numbers in typed `array` buffers,
+low-cardinality strings (entity types, sources, providers) dictionary-encoded as
+interned categories plus int32 codes, and free text in plain lists. Conversion to
+NumPy and pandas reuses the numeric buffers without copying; Arrow conversion is
+available when pyarrow is installed.
+
+Numeric buffers cannot grow while a NumPy/pandas view of them is alive, so fill a
+batch completely before converting it; an append that fails for this reason leaves
+the batch unchanged.
+"""
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import pandas as pd
+
+# Column kinds: "str" (list of str/None), "category" (dictionary-encoded str),
+# "float" (array of doubles, NaN for missing), "int" (array of int64) and "object" (list).
+COLUMN_KINDS = ("str", "category", "float", "int", "object")
+
+
+class CategoryColumn:
+    """
+    Dictionary-encoded string column: each distinct value is stored (interned) once and
+    rows hold int32 codes into `categories`, with -1 for None.
+    """
+
+    def __init__(self, values: Iterable[Optional[str]] = ()):
+        self.categories: List[str] = []
+        self.codes = array("i")
+        self._index: Dict[str, int] = {}
+        self.extend(values)
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.codes.append(-1)
+            return
+        value = str(value)
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.categories)
+            self.categories.append(sys.intern(value))
+        self.codes.append(code)
+
+    def extend(self, values: Iterable[Optional[str]]):
+        for value in values:
+            self.append(value)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def truncate(self, length: int):
+        """Drop rows from length on (values interned meanwhile stay in categories)."""
+        if len(self.codes) > length:
+            del self.codes[length:]
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        code = self.codes[i]
+        return self.categories[code] if code >= 0 else None
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        categories = self.categories
+        return (categories[code] if code >= 0 else None for code in self.codes)
+
+    def to_numpy(self):
+        """Codes as a NumPy int array sharing this column's buffer."""
+        import numpy as np
+        return np.frombuffer(self.codes, dtype=np.dtype(f"i{self.codes.itemsize}"))
+
+    def to_pandas(self) -> pd.Categorical:
+        return pd.Categorical.from_codes(self.to_numpy(), categories=self.categories)
+
+    def to_arrow(self):
+        import pyarrow as pa
+        codes = self.to_numpy()
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0, type=pa.int32()),
+                                              pa.array(self.categories, type=pa.string()))
+
+
+def _new_column(kind: str):
+    if kind == "category":
+        return CategoryColumn()
+    if kind == "float":
+        return array("d")
+    if kind == "int":
+        return array("q")
+    if kind in ("str", "object"):
+        return []
+    raise ValueError(f"Unknown column kind: {kind} (expected one of {', '.join(COLUMN_KINDS)})")
+
+
+def _to_float(value: Any) -> float:
+    """Coerce an LLM-provided number to float; missing or unparseable values become NaN."""
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ColumnBatch:
+    """
+    Table of equally long, typed columns built row by row or from existing sequences.
+
+    Args:
+        schema: Column name -> kind ("str", "category", "float", "int" or "object"), in output order.
+    """
+
+    def __init__(self, schema: Mapping[str, str]):
+        self.schema: Dict[str, str] = dict(schema)
+        self.columns: Dict[str, Any] = {name: _new_column(kind) for name, kind in self.schema.items()}
+        self._length = 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]], schema: Mapping[str, str]) -> "ColumnBatch":
+        """Build a batch from dicts; keys outside the schema are ignored and missing ones are None/NaN."""
+        batch = cls(schema)
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence[Any]], schema: Mapping[str, str]) -> "ColumnBatch":
+        """Build a batch from one sequence per column (all of the same length)."""
+        batch = cls(schema)
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        length = lengths.pop() if lengths else 0
+        for name, kind in batch.schema.items():
+            values = columns.get(name)
+            batch._extend_column(name, kind, values if values is not None else [None] * length)
+        batch._length = length
+        return batch
+
+    def _extend_column(self, name: str, kind: str, values: Iterable[Any]):
+        column = self.columns[name]
+        if kind == "float":
+            column.extend(_to_float(value) for value in values)
+        elif kind == "int":
+            column.extend(int(value) if value is not None else 0 for value in values)
+        else:
+            column.extend(values)
+
+    def append(self, record: Mapping[str, Any]):
+        """
+        Append one row given as a mapping of column name to value. The row is added to all
+        columns or none: if a column cannot grow (a NumPy/pandas view of it exists), the
+        columns already extended are truncated again and BufferError is raised.
+        """
+        values = []
+        for name, kind in self.schema.items():
+            value = record.get(name)
+            if kind == "float":
+                value = _to_float(value)
+            elif kind == "int":
+                value = int(value) if value is not None else 0
+            values.append(value)
+        try:
+            for column, value in zip(self.columns.values(), values):
+                column.append(value)
+        except BufferError as e:
+            self.truncate(self._length)
+            raise BufferError("Cannot append to a ColumnBatch while NumPy/pandas views of its buffers exist") from e
+        self._length += 1
+
+    def truncate(self, length: int):
+        """Drop rows from length on in every column (columns already at most that long are untouched)."""
+        for column in self.columns.values():
+            if isinstance(column, CategoryColumn):
+                column.truncate(length)
+            elif len(column) > length:
+                del column[length:]
+        self._length = min(self._length, length)
+
+    def extend(self, records: Iterable[Mapping[str, Any]]):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Row i as a dict (NaN floats are returned as None)."""
+        row = {}
+        for name, kind in self.schema.items():
+            value = self.columns[name][i]
+            if kind == "float" and math.isnan(value):
+                value = None
+            row[name] = value
+        return row
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(i) for i in range(self._length))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def to_numpy(self, name: str):
+        """
+        Column as a NumPy array: numeric columns and category codes share the batch's
+        buffer, other columns become object arrays.
+        """
+        import numpy as np
+        kind = self.schema[name]
+        column = self.columns[name]
+        if kind == "float":
+            return np.frombuffer(column, dtype=np.float64)
+        if kind == "int":
+            return np.frombuffer(column, dtype=np.int64)
+        if kind == "category":
+            return column.to_numpy()
+        values = np.empty(len(column), dtype=object)
+        for i, value in enumerate(column):  # element-wise so list values (keywords) stay lists
+            values[i] = value
+        return values
+
+    def to_pandas(self) -> pd.DataFrame:
+        """DataFrame whose float and int columns are views of this batch's buffers (no copy)."""
+        data = {}
+        for name, kind in self.schema.items():
+            data[name] = self.columns[name].to_pandas() if kind == "category" else self.to_numpy(name)
+        return pd.DataFrame(data, columns=list(self.schema), copy=False)
+
+    def to_arrow(self):
+        """pyarrow.Table of the batch (requires pyarrow); categories become dictionary arrays."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("ColumnBatch.to_arrow requires pyarrow (pip install pyarrow)") from e
+        arrays = []
+        for name, kind in self.schema.items():
+            column = self.columns[name]
+            if kind == "category":
+                arrays.append(column.to_arrow())
+            elif kind in ("float", "int"):
+                values = self.to_numpy(name)
+                arrays.append(pa.array(values, mask=values != values if kind == "float" else None))
+            else:
+                arrays.append(pa.array(column))
+        return pa.Table.from_arrays(arrays, names=list(self.schema))
+
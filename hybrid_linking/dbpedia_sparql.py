@@ -1,31 +1,180 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
+import logging
+import os
+from hybrid_linking.http_pool import get_http_pool
+from hybrid_linking.sparql_cache import get_sparql_cache
+from hybrid_linking.retry import RetryPolicy
+from hybrid_linking.metrics import SPARQL_DURATION, SPARQL_QUERIES, span
+from hybrid_linking.singleflight import get_single_flight
+
+logger = logging.getLogger(__name__)
 
 DBPEDIA_SPARQL_ENDPOINT = "https://dbpedia.org/sparql"
+SPARQL_JSON = "application/sparql-results+json"
+# Per-request timeout of SPARQL queries, independent of the HTTP pool's default
+SPARQL_TIMEOUT = float(os.getenv("SPARQL_TIMEOUT", "30"))
 
 
-def search_dbpedia_entity(label: str, limit: int = 5) -> List[Tuple[str, str]]:
-    """
-    Search DBpedia for entities with the given label. Returns a list of (URI, label) tuples.
-    """
-    sparql = SPARQLWrapper(DBPEDIA_SPARQL_ENDPOINT)
+def build_label_query(label: str, limit: int) -> str:
+    """Build the exact-label lookup query used by search_dbpedia_entity."""
     # Use exact string matching with proper language tags
-    query = f'''
+    return f'''
     SELECT ?uri ?label WHERE {{
       ?uri rdfs:label ?label .
       FILTER (?label = "{label}"@en)
     }} LIMIT {limit}
     '''
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
+
+
+def _parse_label_results(results: Dict[str, Any]) -> List[Tuple[str, str]]:
+    return [(r["uri"]["value"], r["label"]["value"]) for r in results["results"]["bindings"]]
+
+
+def _flight_key(query: str, endpoint: str) -> Tuple[str, str]:
+    """Single-flight key of a query: the endpoint and the query with whitespace collapsed."""
+    return endpoint, " ".join(query.split())
+
+
+def run_sparql_query(query: str, endpoint: str = DBPEDIA_SPARQL_ENDPOINT, coalesce: bool = True) -> Dict[str, Any]:
+    """
+    Run a SELECT query over the shared HTTP pool and return the SPARQL JSON result.
+    Each request times out after SPARQL_TIMEOUT seconds (env SPARQL_TIMEOUT, default 30);
+    transient failures (429/5xx/timeouts) are retried with exponential backoff.
+    Each query is traced as a "sparql.query" span and counted in sparql_queries_total.
+    With coalesce=True, a query identical to one already in flight (up to whitespace)
+    waits for that request and shares its result instead of being sent again.
+    """
+    if coalesce:
+        return get_single_flight("sparql").do(_flight_key(query, endpoint), _run_sparql_query, query, endpoint)
+    return _run_sparql_query(query, endpoint)
+
+
+def _run_sparql_query(query: str, endpoint: str) -> Dict[str, Any]:
+    def get():
+        response = get_http_pool().get(endpoint, params={"query": query, "format": SPARQL_JSON},
+                                       headers={"Accept": SPARQL_JSON}, timeout=SPARQL_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    with span("sparql.query", endpoint=endpoint, query_chars=len(query)), SPARQL_DURATION.time():
+        try:
+            results = RetryPolicy().call(get)
+        except Exception:
+            SPARQL_QUERIES.inc(outcome="error")
+            raise
+    SPARQL_QUERIES.inc(outcome="ok")
+    return results
+
+
+async def arun_sparql_query(query: str, endpoint: str = DBPEDIA_SPARQL_ENDPOINT,
+                            coalesce: bool = True) -> Dict[str, Any]:
+    """
+    Run a SELECT query without blocking the event loop and return the SPARQL JSON result.
+    Identical in-flight queries are coalesced as in run_sparql_query.
+    """
+    if coalesce:
+        return await get_single_flight("sparql").ado(_flight_key(query, endpoint), _arun_sparql_query, query, endpoint)
+    return await _arun_sparql_query(query, endpoint)
+
+
+async def _arun_sparql_query(query: str, endpoint: str) -> Dict[str, Any]:
+    with span("sparql.query", endpoint=endpoint, query_chars=len(query)), SPARQL_DURATION.time():
+        try:
+            results = await RetryPolicy().acall(get_http_pool().arequest_json, "GET", endpoint,
+                                                params={"query": query, "format": SPARQL_JSON},
+                                                headers={"Accept": SPARQL_JSON}, timeout=SPARQL_TIMEOUT)
+        except Exception:
+            SPARQL_QUERIES.inc(outcome="error")
+            raise
+    SPARQL_QUERIES.inc(outcome="ok")
+    return results
+
+
+def search_dbpedia_entity(label: str, limit: int = 5, endpoint: str = DBPEDIA_SPARQL_ENDPOINT,
+                          use_cache: bool = True) -> List[Tuple[str, str]]:
+    """
+    Search DBpedia for entities with the given label. Returns a list of (URI, label) tuples.
+    Results (including empty ones) are cached per endpoint and label; pass
+    use_cache=False to force a fresh query.
+    """
+    cache = get_sparql_cache()
+    if use_cache:
+        cached = cache.get("label", endpoint, label, limit)
+        if cached is not None:
+            return [(uri, label_text) for uri, label_text in cached]
+    try:
+        candidates = _parse_label_results(run_sparql_query(build_label_query(label, limit), endpoint))
+        if use_cache:
+            cache.set("label", endpoint, label, candidates, limit=limit)
+        return candidates
+    except Exception as e:
+        logger.warning("Error querying DBpedia: %s", e)
+        return []
+
+
+async def asearch_dbpedia_entity(label: str, limit: int = 5, endpoint: str = DBPEDIA_SPARQL_ENDPOINT,
+                                 use_cache: bool = True) -> List[Tuple[str, str]]:
+    """
+    Async counterpart of search_dbpedia_entity, sharing the same cache.
+    """
+    cache = get_sparql_cache()
+    if use_cache:
+        cached = cache.get("label", endpoint, label, limit)
+        if cached is not None:
+            return [(uri, label_text) for uri, label_text in cached]
     try:
-        results = sparql.query().convert()
-        candidates = []
-        for result in results["results"]["bindings"]:
-            uri = result["uri"]["value"]
-            label = result["label"]["value"]
-            candidates.append((uri, label))
+        candidates = _parse_label_results(await arun_sparql_query(build_label_query(label, limit), endpoint))
+        if use_cache:
+            cache.set("label", endpoint, label, candidates, limit=limit)
         return candidates
     except Exception as e:
-        print(f"Error querying DBpedia: {e}")
-        return [] 
\ No newline at end of file
+        logger.warning("Error querying DBpedia: %s", e)
+        return []
+
+
+def build_labels_values_query(labels: List[str]) -> str:
+    """Build a single VALUES query resolving several exact labels at once."""
+    values = " ".join('"{}"@en'.format(label.replace("\\", "\\\\").replace('"', '\\"')) for label in labels)
+    return f'''
+    SELECT ?label ?uri WHERE {{
+      VALUES ?label {{ {values} }}
+      ?uri rdfs:label ?label .
+    }}
+    '''
+
+
+def search_dbpedia_entities(labels: List[str], limit: int = 5, endpoint: str = DBPEDIA_SPARQL_ENDPOINT,
+                            use_cache: bool = True, chunk_size: int = 50) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Batch counterpart of search_dbpedia_entity: resolve many labels with one VALUES query
+    per chunk_size labels instead of one query each. Labels already cached are not queried.
+    Returns a dict mapping every distinct label to its (URI, label) tuples (at most limit each).
+    Labels in a chunk whose query fails map to an empty list and are not cached.
+    """
+    cache = get_sparql_cache()
+    results: Dict[str, List[Tuple[str, str]]] = {}
+    to_query = []
+    for label in dict.fromkeys(labels):
+        cached = cache.get("label", endpoint, label, limit) if use_cache else None
+        if cached is not None:
+            results[label] = [(uri, label_text) for uri, label_text in cached]
+        else:
+            to_query.append(label)
+    for start in range(0, len(to_query), chunk_size):
+        chunk = to_query[start:start + chunk_size]
+        rows_by_label: Dict[str, List[Tuple[str, str]]] = {label: [] for label in chunk}
+        try:
+            bindings = run_sparql_query(build_labels_values_query(chunk), endpoint)["results"]["bindings"]
+        except Exception as e:
+            logger.warning("Error querying DBpedia: %s", e)
+            results.update(rows_by_label)
+            continue
+        for r in bindings:
+            label = r["label"]["value"]
+            if label in rows_by_label:
+                rows_by_label[label].append((r["uri"]["value"], label))
+        for label, rows in rows_by_label.items():
+            # VALUES results are not limited per label, so the cached entry is exhaustive
+            if use_cache:
+                cache.set("label", endpoint, label, rows)
+            results[label] = rows[:limit]
+    return results
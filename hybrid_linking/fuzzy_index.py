@@ -0,0 +1,192 @@
+"""
+Approximate label matching for candidate generation.
+
+`FuzzyLabelIndex` is an in-process character-trigram index over a set of
+(uri, label) pairs. It returns the top-k labels by trigram Dice similarity, so
+typos and spelling variants find candidates without an exact-match query or an
+LLM round-trip. `FuzzyKnowledgeBase` exposes the index as a KnowledgeBase.
+"""
+
+import math
+import re
+import sqlite3
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .knowledge_base import KnowledgeBase, EntityCandidate
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_label(label: str) -> str:
+    """Lowercase, turn underscores/punctuation into spaces and collapse whitespace."""
+    return " ".join(_NON_WORD_RE.sub(" ", label.lower()).split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyLabelIndex:
+    """
+    Character-trigram index over (uri, label) pairs.
+
+    Args:
+        min_score: Default minimum Dice similarity for search results.
+    """
+
+    def __init__(self, min_score: float = 0.5):
+        self.min_score = min_score
+        self._labels: List[str] = []
+        self._uris: List[List[str]] = []
+        self._label_ids_by_uri: Dict[str, List[int]] = {}
+        self._sizes = array("I")
+        self._by_normalized: Dict[str, int] = {}
+        self._postings: Dict[str, array] = defaultdict(lambda: array("I"))
+
+    def add(self, uri: str, label: str):
+        """Add a (uri, label) pair. Labels that normalize identically share one entry."""
+        normalized = normalize_label(label)
+        if not normalized:
+            return
+        label_id = self._by_normalized.get(normalized)
+        if label_id is not None:
+            if uri not in self._uris[label_id]:
+                self._uris[label_id].append(uri)
+                self._label_ids_by_uri.setdefault(uri, []).append(label_id)
+            return
+        label_id = len(self._labels)
+        grams = trigrams(normalized)
+        self._labels.append(label)
+        self._uris.append([uri])
+        self._label_ids_by_uri.setdefault(uri, []).append(label_id)
+        self._sizes.append(len(grams))
+        self._by_normalized[normalized] = label_id
+        for gram in grams:
+            self._postings[gram].append(label_id)
+
+    def add_all(self, pairs: Iterable[Tuple[str, str]]) -> "FuzzyLabelIndex":
+        for uri, label in pairs:
+            self.add(uri, label)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def labels_for(self, uri: str) -> List[str]:
+        """Labels indexed for a URI, in the order they were added (empty if the URI is unknown)."""
+        return [self._labels[label_id] for label_id in self._label_ids_by_uri.get(uri, ())]
+
+    def search(self, query: str, limit: int = 5, min_score: Optional[float] = None) -> List[EntityCandidate]:
+        """
+        Return up to limit candidates whose labels are most similar to query,
+        scored by trigram Dice similarity (1.0 = same normalized label).
+        """
+        min_score = self.min_score if min_score is None else min_score
+        normalized = normalize_label(query)
+        if not normalized:
+            return []
+        exact = self._by_normalized.get(normalized)
+        if exact is not None and limit == 1:
+            return [EntityCandidate(uri=self._uris[exact][0], label=self._labels[exact], score=1.0, confidence=1.0)]
+        query_grams = trigrams(normalized)
+        n_query = len(query_grams)
+        # A label can only reach min_score if its trigram count is within these bounds...
+        min_size = min_score * n_query / (2 - min_score)
+        max_size = (2 - min_score) * n_query / min_score if min_score > 0 else float("inf")
+        # ...and shares at least min_overlap trigrams with the query, so it must contain one of
+        # the query's rarest (n_query - min_overlap + 1) trigrams (prefix filtering).
+        min_overlap = max(1, math.ceil(min_score * (n_query + min_size) / 2 - 1e-9))
+        postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+        n_prefix = n_query - min_overlap + 1
+        prefix_hits = Counter(chain.from_iterable(postings[:n_prefix]))
+        if exact is not None:
+            prefix_hits[exact] += 0
+        scored = []
+        for label_id, hits in prefix_hits.items():
+            size = self._sizes[label_id]
+            if size < min_size or size > max_size:
+                continue
+            # Upper bound: every trigram outside the prefix is shared too
+            needed = min_score * (n_query + size) / 2
+            if hits + n_query - n_prefix < needed - 1e-9:
+                continue
+            if label_id == exact:
+                score = 1.0
+            else:
+                shared = len(query_grams & trigrams(normalize_label(self._labels[label_id])))
+                score = 2.0 * shared / (n_query + size)
+            if score >= min_score:
+                scored.append((score, label_id))
+        scored.sort(key=lambda x: (-x[0], self._labels[x[1]]))
+        candidates = []
+        for score, label_id in scored:
+            for uri in self._uris[label_id]:
+                candidates.append(EntityCandidate(uri=uri, label=self._labels[label_id], score=score, confidence=score))
+                if len(candidates) >= limit:
+                    return candidates
+        return candidates
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]], min_score: float = 0.5) -> "FuzzyLabelIndex":
+        return cls(min_score=min_score).add_all(pairs)
+
+    @classmethod
+    def from_file(cls, path: str, min_score: float = 0.5, language: str = "en") -> "FuzzyLabelIndex":
+        """
+        Load labels from a tab-separated file (uri<TAB>label per line), or from a
+        DBpedia labels dump (.nt/.ttl, optionally .gz/.bz2) filtered to `language`.
+        """
+        from .local_dbpedia import _iter_triples, RDFS_LABEL
+
+        base = path[:-4] if path.endswith(".bz2") else path[:-3] if path.endswith(".gz") else path
+        if base.endswith((".nt", ".ttl")):
+            pairs = ((uri, label) for uri, label, lang in _iter_triples([path], RDFS_LABEL) if lang == language)
+            return cls.from_pairs(pairs, min_score)
+
+        def read_tsv():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 2:
+                        yield parts[0], parts[1]
+        return cls.from_pairs(read_tsv(), min_score)
+
+    @classmethod
+    def from_local_index(cls, index_path: str, min_score: float = 0.5) -> "FuzzyLabelIndex":
+        """Load all labels from a LocalDBpediaKnowledgeBase index file."""
+        conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        try:
+            return cls.from_pairs(conn.execute("SELECT uri, label FROM labels"), min_score)
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_sparql_cache(cls, cache=None, min_score: float = 0.5) -> "FuzzyLabelIndex":
+        """Load the labels resolved so far from the SPARQL label cache (the shared one by default)."""
+        from .sparql_cache import get_sparql_cache
+
+        cache = cache if cache is not None else get_sparql_cache()
+        pairs = ((row[0], row[1]) for entry in cache.export() if entry["kind"] == "label" for row in entry["rows"])
+        return cls.from_pairs(pairs, min_score)
+
+
+class FuzzyKnowledgeBase(KnowledgeBase):
+    """KnowledgeBase over a FuzzyLabelIndex; candidate scores are label similarities."""
+
+    def __init__(self, index: FuzzyLabelIndex, name: str = "FuzzyLabels"):
+        self.index = index
+        self.name = name
+
+    def search_entities(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[EntityCandidate]:
+        return self.index.search(label, limit)
+
+    def get_entity_info(self, uri: str) -> Optional[Dict[str, Any]]:
+        labels = self.index.labels_for(uri)
+        return {"uri": uri, "labels": labels} if labels else None
+
+    def get_name(self) -> str:
+        return self.name
@@ -1,9 +1,19 @@
-import requests
 import os
 from dotenv import load_dotenv
 import json
+import logging
 import re
 import pathlib
+import time
+from hybrid_linking.cache import get_response_cache, make_cache_key
+from hybrid_linking.http_pool import get_http_pool
+from hybrid_linking.retry import RetryPolicy
+from hybrid_linking.rate_limit import get_rate_limiter, estimate_tokens
+from hybrid_linking.metrics import LLM_CALLS, LLM_DURATION, LLM_PROMPT_CHARS, span
+from hybrid_linking.singleflight import get_single_flight
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from config.env
 
@@ -14,38 +24,92 @@ load_dotenv(dotenv_path=env_path)
 
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'YOUR_GEMINI_API_KEY')
-GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent'
+GEMINI_MODEL = 'gemini-2.0-flash'
+GEMINI_API_URL = f'https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent'
+
+
+def _post_gemini(headers: dict, params: dict, data: dict, tokens: int):
+    get_rate_limiter().acquire(tokens)
+    response = get_http_pool().post(GEMINI_API_URL, headers=headers, params=params, json=data, timeout=30)
+    logger.debug("Gemini API status code: %s", response.status_code)
+    if response.status_code >= 400:
+        logger.debug("Gemini API response content: %s", response.content)
+        response.raise_for_status()
+    return response
 
 
-def call_gemini(prompt: str) -> str:
+def call_gemini(prompt: str, use_cache: bool = True, retry_policy: Optional[RetryPolicy] = None,
+                on_retry: Optional[Callable[[BaseException], None]] = None, coalesce: bool = True) -> str:
     """
     Call Gemini API with a prompt and return the generated text.
+    Responses are served from the shared response cache when available;
+    pass use_cache=False to bypass it for this call.
+    Transient failures (429/5xx/timeouts) are retried with exponential backoff
+    according to retry_policy (default: RetryPolicy() from the environment);
+    on_retry is called with the error before each retry.
+    Every request (including retries) first acquires from the shared rate limiter.
+    Each call is counted in llm_calls_total{provider="gemini"} and traced as an "llm.generate" span.
+    With coalesce=True, a cache miss for a prompt already being sent by another thread
+    with the same use_cache waits for that request instead of sending its own (see
+    hybrid_linking.singleflight); its on_retry is then called for the retries of the shared
+    request made after it joined.
     """
-    print("[DEBUG] Entering call_gemini")
+    cache = get_response_cache()
+    cache_key = make_cache_key(GEMINI_MODEL, prompt)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Gemini response served from cache")
+            LLM_CALLS.inc(provider="gemini", outcome="cache_hit")
+            return cached
+    if coalesce:
+        # Waiters share the leader's request and retry_policy; every retry is reported to each caller's on_retry
+        return get_single_flight("llm").do_notify((cache_key, use_cache), _call_gemini_uncached, on_retry,
+                                                  prompt, cache_key, use_cache, retry_policy)
+    return _call_gemini_uncached(on_retry, prompt, cache_key, use_cache, retry_policy)
+
+
+def _call_gemini_uncached(on_retry: Optional[Callable[[BaseException], None]], prompt: str, cache_key: str,
+                          use_cache: bool, retry_policy: Optional[RetryPolicy]) -> str:
+    cache = get_response_cache()
     headers = {"Content-Type": "application/json"}
     params = {"key": GEMINI_API_KEY}
     data = {
         "contents": [{"parts": [{"text": prompt}]}]
     }
+    retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+    LLM_PROMPT_CHARS.inc(len(prompt), provider="gemini")
+    start = time.perf_counter()
     try:
-        response = requests.post(GEMINI_API_URL, headers=headers, params=params, json=data, timeout=30)
-        print(f"[DEBUG] Gemini API status code: {response.status_code}")
-        if not response.ok:
-            print(f"[DEBUG] Gemini API response content: {response.content}")
-            response.raise_for_status()
-        result = response.json()
-        # Extract the generated text
-        try:
-            text = result["candidates"][0]["content"]["parts"][0]["text"]
-            print("[DEBUG] Exiting call_gemini successfully")
-            return text
-        except Exception as e:
-            print(f"[DEBUG] Error extracting text from Gemini response: {e}")
-            print(f"[DEBUG] Full Gemini response: {result}")
-            return str(result)
+        with span("llm.generate", provider="gemini", model=GEMINI_MODEL, prompt_chars=len(prompt)):
+            response = retry_policy.call(_post_gemini, headers, params, data, estimate_tokens(prompt),
+                                          on_retry=on_retry)
+            result = response.json()
     except Exception as e:
-        print(f"[DEBUG] Exception in call_gemini: {e}")
+        logger.debug("Exception in call_gemini: %s", e)
+        LLM_CALLS.inc(provider="gemini", outcome="error")
         raise
+    finally:
+        LLM_DURATION.observe(time.perf_counter() - start, provider="gemini")
+    LLM_CALLS.inc(provider="gemini", outcome="ok")
+    # Extract the generated text
+    try:
+        text = result["candidates"][0]["content"]["parts"][0]["text"]
+    except Exception as e:
+        logger.warning("Error extracting text from Gemini response: %s", e)
+        logger.debug("Full Gemini response: %s", result)
+        return str(result)
+    if use_cache:
+        cache.set(cache_key, text)
+    return text
+
+
+def invalidate_gemini_response(prompt: str):
+    """
+    Drop the cached response for a prompt, e.g. after it turned out to be unparseable,
+    so the next call_gemini for the same prompt asks Gemini again.
+    """
+    get_response_cache().delete(make_cache_key(GEMINI_MODEL, prompt))
 
 
 def batch_normalize_entities_gemini(entities: list[str]) -> list[dict]:
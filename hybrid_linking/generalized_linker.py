@@ -1,7 +1,17 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
+from array import array
+import asyncio
+import json
+import logging
+import re
 from .knowledge_base import KnowledgeBase, KnowledgeBaseRegistry, EntityCandidate
-from .llm_provider import LLMProvider, LLMRegistry
+from .llm_provider import HedgedProvider, LLMProvider, LLMRegistry
+from .fuzzy_index import FuzzyLabelIndex
+from .columnar import ColumnBatch
+from .metrics import traced
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class LinkingResult:
@@ -14,22 +24,178 @@ class LinkingResult:
     confidence: float = 0.0
     metadata: Dict[str, Any] = None
 
+class CompactLinkingResult:
+    """LinkingResult with __slots__ instead of a per-instance __dict__ (same fields and constructor)."""
+    __slots__ = ("entity_mention", "canonical_name", "context_analysis", "candidates", "knowledge_base",
+                 "confidence", "metadata")
+    
+    def __init__(self, entity_mention: str, canonical_name: str, context_analysis: Optional[Dict[str, Any]] = None,
+                 candidates: List[EntityCandidate] = None, knowledge_base: str = "unknown", confidence: float = 0.0,
+                 metadata: Dict[str, Any] = None):
+        self.entity_mention = entity_mention
+        self.canonical_name = canonical_name
+        self.context_analysis = context_analysis
+        self.candidates = candidates
+        self.knowledge_base = knowledge_base
+        self.confidence = confidence
+        self.metadata = metadata
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+ENTITY_COLUMNS = {
+    "mention": "str", "canonical_name": "str", "canonical_source": "category", "llm_provider": "category",
+    "entity_type": "category", "analysis_confidence": "float", "keywords": "object", "description": "str",
+    "confidence": "float", "top_uri": "str", "top_score": "float",
+}
+CANDIDATE_COLUMNS = {"entity": "int", "uri": "str", "label": "str", "score": "float", "entity_type": "category"}
+
+class LinkingBatch:
+    """
+    Columnar batch_link output: one row per input entity in `entities`, and its ranked
+    candidates as consecutive rows of `candidates` (rows offsets[i]:offsets[i + 1],
+    with an `entity` column pointing back at the entity row).
+    
+    Both tables are ColumnBatch instances, so `entities.to_pandas()` and
+    `candidates.to_pandas()` give DataFrames without building per-row objects;
+    to_results() materializes LinkingResult objects when needed.
+    """
+    
+    def __init__(self):
+        self.entities = ColumnBatch(ENTITY_COLUMNS)
+        self.candidates = ColumnBatch(CANDIDATE_COLUMNS)
+        self.offsets = array("q", [0])
+    
+    def add(self, entity_mention: str, canonical_name: str, canonical_source: str, llm_provider: str,
+            context_analysis: Optional[Dict[str, Any]], candidates: List[EntityCandidate], confidence: float):
+        """
+        Append one entity row and its (already ranked) candidates. Either everything is added
+        or, if a table cannot grow (see ColumnBatch.append), nothing is.
+        """
+        entity = len(self.entities)
+        n_candidates = len(self.candidates)
+        analysis = context_analysis or {}
+        top = candidates[0] if candidates else None
+        try:
+            self._add(entity, entity_mention, canonical_name, canonical_source, llm_provider, analysis, top,
+                      candidates, confidence)
+        except BufferError:
+            self.entities.truncate(entity)
+            self.candidates.truncate(n_candidates)
+            raise
+        self.offsets.append(len(self.candidates))
+    
+    def _add(self, entity: int, entity_mention: str, canonical_name: str, canonical_source: str, llm_provider: str,
+             analysis: Dict[str, Any], top: Optional[EntityCandidate], candidates: List[EntityCandidate],
+             confidence: float):
+        self.entities.append({
+            "mention": entity_mention,
+            "canonical_name": canonical_name,
+            "canonical_source": canonical_source,
+            "llm_provider": llm_provider,
+            "entity_type": analysis.get("entity_type"),
+            "analysis_confidence": analysis.get("confidence"),
+            "keywords": analysis.get("keywords"),
+            "description": analysis.get("description"),
+            "confidence": confidence,
+            "top_uri": top.uri if top else None,
+            "top_score": top.score if top else None,
+        })
+        for candidate in candidates:
+            self.candidates.append({"entity": entity, "uri": candidate.uri, "label": candidate.label,
+                                    "score": candidate.score, "entity_type": candidate.entity_type})
+    
+    def __len__(self) -> int:
+        return len(self.entities)
+    
+    def candidates_of(self, i: int) -> List[Dict[str, Any]]:
+        """Candidate rows of entity i, best first."""
+        return [self.candidates.row(j) for j in range(self.offsets[i], self.offsets[i + 1])]
+    
+    def to_pandas(self):
+        """Entity table as a DataFrame (see also candidates.to_pandas())."""
+        return self.entities.to_pandas()
+    
+    def to_results(self) -> List[LinkingResult]:
+        """One LinkingResult per entity; metadata holds only the provider and canonical source."""
+        results = []
+        for i, row in enumerate(self.entities):
+            analysis = None
+            if row["entity_type"] is not None or row["analysis_confidence"] is not None:
+                analysis = {"entity_type": row["entity_type"], "confidence": row["analysis_confidence"],
+                            "keywords": row["keywords"], "description": row["description"]}
+            candidates = [EntityCandidate(uri=c["uri"], label=c["label"], score=c["score"], entity_type=c["entity_type"])
+                          for c in self.candidates_of(i)]
+            results.append(LinkingResult(
+                entity_mention=row["mention"],
+                canonical_name=row["canonical_name"],
+                context_analysis=analysis,
+                candidates=candidates,
+                confidence=row["confidence"],
+                metadata={"llm_provider": row["llm_provider"], "canonical_source": row["canonical_source"]}
+            ))
+        return results
+
 class GeneralizedEntityLinker:
     """
     A generalized entity linker that can work with multiple knowledge bases and LLM providers.
+    
+    If a label_index is given, mentions whose best fuzzy match scores at least
+    index_threshold take that label as their canonical name without an LLM call.
+    With fused=True, mentions with a context are normalized and analyzed by one
+    combined prompt instead of two.
+    
+    Knowledge bases are searched concurrently. kb_timeout bounds each search,
+    kb_deadline bounds the whole fan-out, and early_stop_score returns as soon as
+    one knowledge base yields a candidate scoring at least that much (see
+    KnowledgeBaseRegistry); how each search ended is reported in
+    result.metadata["knowledge_base_status"].
+    
+    With hedge=True, LLM calls go through LLMRegistry.generate_first: a backup
+    request is sent to the next registered provider (or the same one, if it is the
+    only one) when the first has not answered within hedge_delay (default: its
+    recent p95 latency), and the first good answer wins.
+    
+    With compact_results=True, results are CompactLinkingResult instances (no
+    per-instance __dict__); batch_link(output_format="columnar") returns a
+    LinkingBatch instead of one object per entity.
     """
     
     def __init__(self, 
                  llm_provider: Optional[LLMProvider] = None,
-                 knowledge_bases: Optional[List[KnowledgeBase]] = None):
+                 knowledge_bases: Optional[List[KnowledgeBase]] = None,
+                 label_index: Optional[FuzzyLabelIndex] = None,
+                 index_threshold: float = 0.9,
+                 fused: bool = False,
+                 kb_timeout: Optional[float] = None,
+                 kb_deadline: Optional[float] = None,
+                 early_stop_score: Optional[float] = None,
+                 hedge: bool = False,
+                 hedge_delay: Optional[float] = None,
+                 compact_results: bool = False):
         
+        self.label_index = label_index
+        self.index_threshold = index_threshold
+        self.fused = fused
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self._hedged_providers: Dict[str, HedgedProvider] = {}
+        self.result_class = CompactLinkingResult if compact_results else LinkingResult
+
         # Initialize LLM registry
         self.llm_registry = LLMRegistry()
         if llm_provider:
             self.llm_registry.register(llm_provider.get_name(), llm_provider)
         
         # Initialize knowledge base registry
-        self.kb_registry = KnowledgeBaseRegistry()
+        self.kb_registry = KnowledgeBaseRegistry(timeout=kb_timeout, deadline=kb_deadline,
+                                                 early_stop_score=early_stop_score)
         if knowledge_bases:
             for kb in knowledge_bases:
                 self.kb_registry.register(kb.get_name(), kb)
@@ -38,10 +204,11 @@ class GeneralizedEntityLinker:
         """Add an LLM provider to the registry."""
         self.llm_registry.register(name, provider)
     
-    def add_knowledge_base(self, name: str, kb: KnowledgeBase):
-        """Add a knowledge base to the registry."""
-        self.kb_registry.register(name, kb)
+    def add_knowledge_base(self, name: str, kb: KnowledgeBase, timeout: Optional[float] = None):
+        """Add a knowledge base to the registry, optionally with its own search timeout in seconds."""
+        self.kb_registry.register(name, kb, timeout)
     
+    @traced("linker.link_entity")
     def link_entity(self, 
                    entity_mention: str, 
                    context: Optional[str] = None,
@@ -59,72 +226,139 @@ class GeneralizedEntityLinker:
             limit: Maximum number of candidates per knowledge base
         """
         
-        # Get LLM provider
-        if llm_provider:
-            provider = self.llm_registry.get(llm_provider)
+        provider = self._select_provider(llm_provider)
+        
+        # Step 1: Normalize entity name (from the label index when it is confident)
+        canonical_name = self._lookup_canonical_name(entity_mention)
+        canonical_source = "label_index" if canonical_name else "llm"
+        context_analysis = None
+        if self.fused and context:
+            # Steps 1 and 2 in one prompt
+            fused_name, context_analysis = self._normalize_and_analyze(entity_mention, context, provider)
+            canonical_name = canonical_name or fused_name or self._normalize_entity_name(entity_mention, context, provider)
         else:
-            available = self.llm_registry.list_available()
-            if not available:
-                raise ValueError("No LLM providers available")
-            provider = self.llm_registry.get(available[0])
+            if not canonical_name:
+                canonical_name = self._normalize_entity_name(entity_mention, context, provider)
+            
+            # Step 2: Analyze context if provided
+            if context:
+                context_analysis = self._analyze_entity_context(entity_mention, context, provider)
         
-        # Step 1: Normalize entity name
-        canonical_name = self._normalize_entity_name(entity_mention, context, provider)
+        # Step 3: Search the selected (default: all) knowledge bases concurrently
+        results, kb_status = self.kb_registry.search_all_with_status(canonical_name, context_analysis, limit,
+                                                                     names=knowledge_bases or None)
+        all_candidates = [candidate for candidates in results.values() for candidate in candidates]
         
-        # Step 2: Analyze context if provided
-        context_analysis = None
-        if context:
-            context_analysis = self._analyze_entity_context(entity_mention, context, provider)
+        return self._build_result(entity_mention, canonical_name, context_analysis, all_candidates,
+                                  provider, knowledge_bases, limit, canonical_source, kb_status)
+    
+    @traced("linker.alink_entity")
+    async def alink_entity(self, 
+                           entity_mention: str, 
+                           context: Optional[str] = None,
+                           knowledge_bases: Optional[List[str]] = None,
+                           llm_provider: Optional[str] = None,
+                           limit: int = 5) -> LinkingResult:
+        """
+        Async counterpart of link_entity.
         
-        # Step 3: Search knowledge bases
-        if knowledge_bases:
-            # Search specific knowledge bases
-            all_candidates = []
-            for kb_name in knowledge_bases:
-                kb = self.kb_registry.get(kb_name)
-                if kb:
-                    candidates = kb.search_entities(canonical_name, context_analysis, limit)
-                    all_candidates.extend(candidates)
-        else:
-            # Search all knowledge bases
-            results = self.kb_registry.search_all(canonical_name, context_analysis, limit)
-            all_candidates = []
-            for kb_name, candidates in results.items():
-                all_candidates.extend(candidates)
+        Normalization and context analysis run concurrently, and the selected
+        knowledge bases are searched concurrently.
+        """
+        provider = self._select_provider(llm_provider)
         
-        # Step 4: Rank and select best candidates
-        all_candidates.sort(key=lambda x: x.score, reverse=True)
-        top_candidates = all_candidates[:limit]
+        # Steps 1 and 2: Normalize entity name and analyze context concurrently
+        canonical_name = self._lookup_canonical_name(entity_mention)
+        canonical_source = "label_index" if canonical_name else "llm"
+        context_analysis = None
+        analysis_prompts = []
+        if self.fused and context:
+            # One prompt for both; normalization below only runs if it returned no name
+            try:
+                response = await provider.agenerate_text(self._build_fused_prompt(entity_mention, context))
+            except Exception as e:
+                response = e
+            fused_name, context_analysis = self._parse_fused_response(response)
+            canonical_name = canonical_name or fused_name
+        elif context:
+            analysis_prompts.append(self._build_context_prompt(entity_mention, context))
+        normalize_prompts = [] if canonical_name else [self._build_normalization_prompt(entity_mention, context)]
+        responses = await asyncio.gather(*(provider.agenerate_text(p) for p in normalize_prompts + analysis_prompts),
+                                         return_exceptions=True)
+        if analysis_prompts:
+            context_analysis = self._parse_context_analysis(responses[-1])
+        if not canonical_name:
+            canonical_response = responses[0]
+            if isinstance(canonical_response, Exception):
+                raise canonical_response
+            canonical_name = canonical_response.strip()
         
-        # Step 5: Calculate overall confidence
-        confidence = self._calculate_overall_confidence(top_candidates, context_analysis)
+        # Step 3: Search the selected (default: all) knowledge bases concurrently
+        results, kb_status = await self.kb_registry.asearch_all_with_status(canonical_name, context_analysis, limit,
+                                                                            names=knowledge_bases or None)
+        all_candidates = [candidate for candidates in results.values() for candidate in candidates]
         
-        return LinkingResult(
+        return self._build_result(entity_mention, canonical_name, context_analysis, all_candidates,
+                                  provider, knowledge_bases, limit, canonical_source, kb_status)
+    
+    def _select_provider(self, llm_provider: Optional[str]) -> LLMProvider:
+        """Get the named LLM provider, or the first registered one (wrapped in a HedgedProvider if hedging)."""
+        available = self.llm_registry.list_available()
+        if not llm_provider and not available:
+            raise ValueError("No LLM providers available")
+        name = llm_provider or available[0]
+        if not self.hedge:
+            return self.llm_registry.get(name)
+        if name not in self._hedged_providers:
+            names = [name] + [other for other in available if other != name]
+            self._hedged_providers[name] = HedgedProvider(self.llm_registry, names, self.hedge_delay)
+        return self._hedged_providers[name]
+    
+    def _build_result(self, entity_mention: str, canonical_name: str, context_analysis: Optional[Dict[str, Any]],
+                      all_candidates: List[EntityCandidate], provider: LLMProvider,
+                      knowledge_bases: Optional[List[str]], limit: int,
+                      canonical_source: str = "llm",
+                      kb_status: Optional[Dict[str, Dict[str, Any]]] = None) -> LinkingResult:
+        """Rank candidates and assemble the LinkingResult (steps 4 and 5)."""
+        top_candidates, confidence = self._rank_candidates(all_candidates, context_analysis, limit)
+        
+        metadata = {
+            "llm_provider": provider.get_name(),
+            "knowledge_bases_searched": knowledge_bases or self.kb_registry.list_available(),
+            "canonical_source": canonical_source
+        }
+        if kb_status is not None:
+            metadata["knowledge_base_status"] = kb_status
+        return self.result_class(
             entity_mention=entity_mention,
             canonical_name=canonical_name,
             context_analysis=context_analysis,
             candidates=top_candidates,
             confidence=confidence,
-            metadata={
-                "llm_provider": provider.get_name(),
-                "knowledge_bases_searched": knowledge_bases or self.kb_registry.list_available()
-            }
+            metadata=metadata
         )
     
-    def _normalize_entity_name(self, entity_mention: str, context: Optional[str], provider: LLMProvider) -> str:
-        """Normalize entity name using the specified LLM provider."""
+    def _rank_candidates(self, all_candidates: List[EntityCandidate], context_analysis: Optional[Dict[str, Any]],
+                         limit: int) -> Tuple[List[EntityCandidate], float]:
+        """Top candidates by score and the overall confidence (steps 4 and 5)."""
+        # Step 4: Rank and select best candidates
+        all_candidates.sort(key=lambda x: x.score, reverse=True)
+        top_candidates = all_candidates[:limit]
+        
+        # Step 5: Calculate overall confidence
+        return top_candidates, self._calculate_overall_confidence(top_candidates, context_analysis)
+    
+    def _build_normalization_prompt(self, entity_mention: str, context: Optional[str]) -> str:
         prompt = f"""
 Given the following entity mention, return the canonical name as used in knowledge bases (just the name, no explanation):
 Entity: {entity_mention}
 """
         if context:
             prompt += f"\nContext: {context}"
-        
-        return provider.generate_text(prompt).strip()
+        return prompt
     
-    def _analyze_entity_context(self, entity_mention: str, context: str, provider: LLMProvider) -> Dict[str, Any]:
-        """Analyze entity context using the specified LLM provider."""
-        prompt = f"""
+    def _build_context_prompt(self, entity_mention: str, context: str) -> str:
+        return f"""
 Analyze the following entity mention and context to determine the most likely entity type and characteristics.
 Return your analysis as a JSON object with the following fields:
 - entity_type: "person", "company", "place", "product", "concept", or "other"
@@ -137,14 +371,14 @@ Context: {context}
 
 Return only the JSON object, no additional text.
 """
-        
+    
+    def _parse_context_analysis(self, response: Union[str, Exception]) -> Dict[str, Any]:
+        """Parse the LLM response to a context analysis prompt, falling back to defaults."""
         try:
-            response = provider.generate_text(prompt).strip()
-            import json
-            import re
-            
+            if isinstance(response, Exception):
+                raise response
             # Find JSON in the response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            json_match = re.search(r'\{.*\}', response.strip(), re.DOTALL)
             if json_match:
                 return json.loads(json_match.group())
             else:
@@ -155,7 +389,7 @@ Return only the JSON object, no additional text.
                     "description": "Unknown entity type"
                 }
         except Exception as e:
-            print(f"Error analyzing context: {e}")
+            logger.warning("Error analyzing context: %s", e)
             return {
                 "entity_type": "other",
                 "confidence": 0.5,
@@ -163,6 +397,59 @@ Return only the JSON object, no additional text.
                 "description": "Error in analysis"
             }
     
+    def _build_fused_prompt(self, entity_mention: str, context: str) -> str:
+        return f"""
+Given the following entity mention and context, return the canonical name as used in knowledge bases
+and an analysis of the most likely entity type and characteristics.
+Return a JSON object with the following fields:
+- canonical_name: the canonical name as used in knowledge bases (just the name)
+- entity_type: "person", "company", "place", "product", "concept", or "other"
+- confidence: confidence score (0-1)
+- keywords: list of relevant keywords that might help in disambiguation
+- description: brief description of what this entity likely refers to
+
+Entity: {entity_mention}
+Context: {context}
+
+Return only the JSON object, no additional text.
+"""
+    
+    def _parse_fused_response(self, response: Union[str, Exception]) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Split a fused response into (canonical name or None, context analysis)."""
+        context_analysis = self._parse_context_analysis(response)
+        canonical_name = context_analysis.pop("canonical_name", None)
+        return (str(canonical_name).strip() if canonical_name else None), context_analysis
+    
+    def _normalize_and_analyze(self, entity_mention: str, context: str,
+                               provider: LLMProvider) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Normalize and analyze with one fused prompt; the name is None if the response lacks one."""
+        try:
+            response = provider.generate_text(self._build_fused_prompt(entity_mention, context))
+        except Exception as e:
+            response = e
+        return self._parse_fused_response(response)
+    
+    def _lookup_canonical_name(self, entity_mention: str) -> Optional[str]:
+        """Return the label index's best match if it scores at least index_threshold, else None."""
+        if self.label_index is None:
+            return None
+        matches = self.label_index.search(entity_mention, limit=1, min_score=self.index_threshold)
+        return matches[0].label if matches else None
+    
+    def _normalize_entity_name(self, entity_mention: str, context: Optional[str], provider: LLMProvider) -> str:
+        """Normalize entity name using the specified LLM provider."""
+        prompt = self._build_normalization_prompt(entity_mention, context)
+        return provider.generate_text(prompt).strip()
+    
+    def _analyze_entity_context(self, entity_mention: str, context: str, provider: LLMProvider) -> Dict[str, Any]:
+        """Analyze entity context using the specified LLM provider."""
+        prompt = self._build_context_prompt(entity_mention, context)
+        try:
+            response = provider.generate_text(prompt)
+        except Exception as e:
+            response = e
+        return self._parse_context_analysis(response)
+    
     def _calculate_overall_confidence(self, candidates: List[EntityCandidate], context_analysis: Optional[Dict[str, Any]]) -> float:
         """Calculate overall confidence for the linking result."""
         if not candidates:
@@ -178,16 +465,220 @@ Return only the JSON object, no additional text.
         
         return avg_score
     
-    def batch_link(self, entities: List[Dict[str, Any]]) -> List[LinkingResult]:
-        """Link multiple entities in batch."""
+    @traced("linker.batch_link")
+    def batch_link(self, entities: List[Dict[str, Any]], chunk_size: int = 20,
+                   output_format: str = "results") -> Union[List[LinkingResult], LinkingBatch]:
+        """
+        Link multiple entities in batch.
+        
+        Entities are grouped into multi-entity prompts of up to chunk_size items (one
+        normalization and one context analysis prompt per group and LLM provider), and
+        the knowledge bases are searched concurrently (KnowledgeBaseRegistry.search_batch_with_status,
+        with the linker's timeouts, deadline and early stop), each once per group of entities
+        sharing targets and limit, via search_entities_batch. Identical (mention, context) pairs are sent only once.
+        Entities a batched response does not answer fall back to single-entity calls.
+        With fused=True, entities with a context are normalized and analyzed by one
+        fused prompt per group instead of two.
+        
+        Args:
+            entities: List of dicts with 'mention' and optional 'context', 'knowledge_bases', 'llm_provider', 'limit'
+            chunk_size: Maximum number of entities per LLM prompt
+            output_format: 'results' for a list of LinkingResult, or 'columnar' for a LinkingBatch
+        Returns:
+            One LinkingResult (or LinkingBatch entity row) per input entity, in input order.
+        """
+        providers = [self._select_provider(entity_data.get("llm_provider")) for entity_data in entities]
+        pairs = [(entity_data["mention"], entity_data.get("context")) for entity_data in entities]
+        index_names = {mention: self._lookup_canonical_name(mention) for mention, _ in dict.fromkeys(pairs)}
+        
+        # Steps 1 and 2: Batched normalization and context analysis, per LLM provider
+        by_provider: Dict[int, Tuple[LLMProvider, List[Tuple[str, Optional[str]]]]] = {}
+        for provider, pair in zip(providers, pairs):
+            by_provider.setdefault(id(provider), (provider, []))[1].append(pair)
+        canonical_names: Dict[Tuple[int, str, Optional[str]], str] = {}
+        analyses: Dict[Tuple[int, str, Optional[str]], Dict[str, Any]] = {}
+        for provider_id, (provider, provider_pairs) in by_provider.items():
+            unique_pairs = list(dict.fromkeys(provider_pairs))
+            with_context = [pair for pair in unique_pairs if pair[1]]
+            if self.fused:
+                for pair, (name, analysis) in self._batch_fused(with_context, provider, chunk_size).items():
+                    canonical_names[(provider_id, *pair)] = name
+                    analyses[(provider_id, *pair)] = analysis
+            else:
+                for pair, analysis in self._batch_analyze(with_context, provider, chunk_size).items():
+                    analyses[(provider_id, *pair)] = analysis
+            to_normalize = [pair for pair in unique_pairs
+                            if not index_names[pair[0]] and (provider_id, *pair) not in canonical_names]
+            for pair, name in self._batch_normalize(to_normalize, provider, chunk_size).items():
+                canonical_names[(provider_id, *pair)] = name
+        
+        resolved = []
+        for provider, pair in zip(providers, pairs):
+            key = (id(provider), *pair)
+            index_name = index_names[pair[0]]
+            resolved.append((index_name or canonical_names[key], "label_index" if index_name else "llm", analyses.get(key)))
+        
+        # Step 3: Search the knowledge bases concurrently, once per group of entities sharing targets and limit
+        all_candidates: List[List[EntityCandidate]] = [[] for _ in entities]
+        kb_status: List[Dict[str, Dict[str, Any]]] = [{} for _ in entities]
+        searches: Dict[Tuple[Tuple[str, ...], int], List[int]] = {}
+        for i, entity_data in enumerate(entities):
+            kb_names = entity_data.get("knowledge_bases") or self.kb_registry.list_available()
+            kb_names = tuple(kb_name for kb_name in kb_names if self.kb_registry.get(kb_name))
+            if kb_names:
+                searches.setdefault((kb_names, entity_data.get("limit", 5)), []).append(i)
+        for (kb_names, limit), indices in searches.items():
+            found, status = self.kb_registry.search_batch_with_status(
+                [resolved[i][0] for i in indices], [resolved[i][2] for i in indices], limit, list(kb_names))
+            for kb_name in kb_names:
+                for i, candidates in zip(indices, found[kb_name]):
+                    all_candidates[i].extend(candidates)
+                    kb_status[i][kb_name] = dict(status[kb_name], candidates=len(candidates))
+        
+        if output_format == "columnar":
+            batch = LinkingBatch()
+            for i, entity_data in enumerate(entities):
+                canonical_name, canonical_source, context_analysis = resolved[i]
+                top_candidates, confidence = self._rank_candidates(all_candidates[i], context_analysis,
+                                                                   entity_data.get("limit", 5))
+                batch.add(entity_data["mention"], canonical_name, canonical_source, providers[i].get_name(),
+                          context_analysis, top_candidates, confidence)
+            return batch
+        
         results = []
-        for entity_data in entities:
-            result = self.link_entity(
-                entity_mention=entity_data["mention"],
-                context=entity_data.get("context"),
-                knowledge_bases=entity_data.get("knowledge_bases"),
-                llm_provider=entity_data.get("llm_provider"),
-                limit=entity_data.get("limit", 5)
-            )
-            results.append(result)
-        return results 
\ No newline at end of file
+        for i, entity_data in enumerate(entities):
+            canonical_name, canonical_source, context_analysis = resolved[i]
+            results.append(self._build_result(entity_data["mention"], canonical_name, context_analysis,
+                                              all_candidates[i], providers[i], entity_data.get("knowledge_bases"),
+                                              entity_data.get("limit", 5), canonical_source, kb_status[i]))
+        return results
+    
+    def _batch_normalize(self, pairs: List[Tuple[str, Optional[str]]], provider: LLMProvider,
+                         chunk_size: int) -> Dict[Tuple[str, Optional[str]], str]:
+        """Canonical name for each (mention, context) pair, chunk_size pairs per prompt."""
+        names = {}
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            try:
+                rows = self._parse_batch_response(provider.generate_text(self._build_batch_normalization_prompt(chunk)))
+            except Exception as e:
+                logger.warning("Error in batch normalization: %s", e)
+                rows = {}
+            for i, pair in enumerate(chunk):
+                name = rows.get(i, {}).get("canonical_name")
+                if name:
+                    names[pair] = str(name).strip()
+                else:
+                    names[pair] = self._normalize_entity_name(pair[0], pair[1], provider)
+        return names
+    
+    def _batch_analyze(self, pairs: List[Tuple[str, Optional[str]]], provider: LLMProvider,
+                       chunk_size: int) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        """Context analysis for each (mention, context) pair, chunk_size pairs per prompt."""
+        analyses = {}
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            try:
+                rows = self._parse_batch_response(provider.generate_text(self._build_batch_context_prompt(chunk)))
+            except Exception as e:
+                logger.warning("Error in batch context analysis: %s", e)
+                rows = {}
+            for i, pair in enumerate(chunk):
+                row = rows.get(i)
+                if row is not None and "entity_type" in row:
+                    analyses[pair] = {k: v for k, v in row.items() if k != "id"}
+                else:
+                    analyses[pair] = self._analyze_entity_context(pair[0], pair[1], provider)
+        return analyses
+    
+    def _batch_fused(self, pairs: List[Tuple[str, Optional[str]]], provider: LLMProvider,
+                     chunk_size: int) -> Dict[Tuple[str, Optional[str]], Tuple[str, Dict[str, Any]]]:
+        """Canonical name and context analysis for each (mention, context) pair from fused prompts."""
+        fused = {}
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            try:
+                rows = self._parse_batch_response(provider.generate_text(self._build_batch_fused_prompt(chunk)))
+            except Exception as e:
+                logger.warning("Error in batch fused analysis: %s", e)
+                rows = {}
+            for i, (mention, context) in enumerate(chunk):
+                row = rows.get(i)
+                if row is not None and row.get("canonical_name") and "entity_type" in row:
+                    analysis = {k: v for k, v in row.items() if k not in ("id", "canonical_name")}
+                    fused[(mention, context)] = (str(row["canonical_name"]).strip(), analysis)
+                else:
+                    name, analysis = self._normalize_and_analyze(mention, context, provider)
+                    fused[(mention, context)] = (name or self._normalize_entity_name(mention, context, provider),
+                                                 analysis)
+        return fused
+    
+    def _build_batch_normalization_prompt(self, pairs: List[Tuple[str, Optional[str]]]) -> str:
+        return (
+            "Given the following entity mentions, return the canonical name of each as used in knowledge bases. "
+            "Respond as a JSON list of objects with fields 'id' and 'canonical_name', one per entity, "
+            "and no explanation.\n\nEntities:\n" +
+            "\n".join(f"- id: {i}\n  mention: {mention}" + (f"\n  context: {context}" if context else "")
+                      for i, (mention, context) in enumerate(pairs))
+        )
+    
+    def _build_batch_context_prompt(self, pairs: List[Tuple[str, Optional[str]]]) -> str:
+        return (
+            "Analyze each of the following entity mentions and contexts to determine the most likely entity type "
+            "and characteristics. Respond as a JSON list with one object per entity and the fields: "
+            "'id', 'entity_type' (\"person\", \"company\", \"place\", \"product\", \"concept\", or \"other\"), "
+            "'confidence' (0-1), 'keywords' (list of relevant keywords that might help in disambiguation) and "
+            "'description' (brief description of what this entity likely refers to). "
+            "Return only the JSON list, no additional text.\n\nEntities:\n" +
+            "\n".join(f"- id: {i}\n  mention: {mention}\n  context: {context}"
+                      for i, (mention, context) in enumerate(pairs))
+        )
+    
+    def _build_batch_fused_prompt(self, pairs: List[Tuple[str, Optional[str]]]) -> str:
+        return (
+            "For each of the following entity mentions and contexts, return the canonical name as used in "
+            "knowledge bases and an analysis of the most likely entity type and characteristics. "
+            "Respond as a JSON list with one object per entity and the fields: 'id', 'canonical_name', "
+            "'entity_type' (\"person\", \"company\", \"place\", \"product\", \"concept\", or \"other\"), "
+            "'confidence' (0-1), 'keywords' (list of relevant keywords that might help in disambiguation) and "
+            "'description' (brief description of what this entity likely refers to). "
+            "Return only the JSON list, no additional text.\n\nEntities:\n" +
+            "\n".join(f"- id: {i}\n  mention: {mention}\n  context: {context}"
+                      for i, (mention, context) in enumerate(pairs))
+        )
+    
+    def _parse_batch_response(self, response: str) -> Dict[int, Dict[str, Any]]:
+        """Parse a JSON list response to a batched prompt into {id: object}."""
+        json_match = re.search(r'\[.*\]', response.strip(), re.DOTALL)
+        rows = json.loads(json_match.group() if json_match else response)
+        parsed = {}
+        for row in rows if isinstance(rows, list) else []:
+            try:
+                parsed.setdefault(int(row["id"]), row)
+            except (TypeError, KeyError, ValueError):
+                continue
+        return parsed
+    
+    async def abatch_link(self, entities: List[Dict[str, Any]], concurrency: int = 100) -> List[LinkingResult]:
+        """
+        Link multiple entities concurrently.
+        
+        Args:
+            entities: List of dicts with 'mention' and optional 'context', 'knowledge_bases', 'llm_provider', 'limit'
+            concurrency: Maximum number of entities being linked at once
+        Returns:
+            One LinkingResult per input entity, in input order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def link_one(entity_data: Dict[str, Any]) -> LinkingResult:
+            async with semaphore:
+                return await self.alink_entity(
+                    entity_mention=entity_data["mention"],
+                    context=entity_data.get("context"),
+                    knowledge_bases=entity_data.get("knowledge_bases"),
+                    llm_provider=entity_data.get("llm_provider"),
+                    limit=entity_data.get("limit", 5)
+                )
+        
+        return list(await asyncio.gather(*(link_one(entity_data) for entity_data in entities))) 
\ No newline at end of file
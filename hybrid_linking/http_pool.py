@@ -0,0 +1,210 @@
+"""
+Shared HTTP connection pool for Gemini and SPARQL calls.
+
+All outgoing requests go through one pooled client per process so TCP/TLS
+connections are kept alive and reused instead of being re-established per call.
+The sync client is a requests.Session (or an httpx.Client when HTTP/2 is
+enabled); async calls use one aiohttp.ClientSession (or httpx.AsyncClient) per
+event loop. Both are safe to share across worker threads.
+Every request updates the http_* metrics (latency, status, bytes in/out, in flight).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+from .metrics import HTTP_BYTES_RECEIVED, HTTP_BYTES_SENT, HTTP_DURATION, HTTP_IN_FLIGHT, HTTP_REQUESTS
+
+
+class HTTPError(Exception):
+    """Raised by the async helpers for responses with a 4xx/5xx status."""
+
+    def __init__(self, status: int, url: str, body: str = ""):
+        super().__init__(f"HTTP {status} for {url}: {body[:200]}")
+        self.status = status
+        self.url = url
+        self.body = body
+
+
+class HTTPPool:
+    """
+    Pooled, keep-alive HTTP client.
+
+    Args:
+        pool_connections: Number of distinct hosts to keep connection pools for.
+        pool_maxsize: Maximum connections kept open per host (also the async connection limit).
+        keep_alive: If False, ask servers to close connections after each request.
+        http2: Use httpx with HTTP/2 instead of requests/aiohttp (requires `httpx[http2]`).
+        timeout: Default timeout in seconds for requests that do not pass their own.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32, keep_alive: bool = True,
+                 http2: bool = False, timeout: Optional[float] = None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.http2 = http2
+        self.timeout = timeout
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._async_lock = threading.Lock()
+
+    def _default_headers(self) -> Dict[str, str]:
+        return {} if self.keep_alive else {"Connection": "close"}
+
+    @property
+    def client(self):
+        """The shared sync client (requests.Session or httpx.Client)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        if self.http2:
+            import httpx
+            limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+            return httpx.Client(http2=True, limits=limits, headers=self._default_headers())
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self._default_headers())
+        return session
+
+    def request(self, method: str, url: str, **kwargs):
+        """Send a request through the pooled sync client and return its response."""
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        status = "error"
+        with HTTP_IN_FLIGHT.track(host=host):
+            try:
+                response = self.client.request(method, url, **kwargs)
+                status = response.status_code
+            finally:
+                HTTP_DURATION.observe(time.perf_counter() - start, host=host, method=method)
+                HTTP_REQUESTS.inc(host=host, method=method, status=status)
+        request = response.request
+        body = getattr(request, "body", None) if not self.http2 else request.content
+        HTTP_BYTES_SENT.inc(len(str(request.url)) + (len(body) if body else 0), host=host)
+        HTTP_BYTES_RECEIVED.inc(len(response.content), host=host)
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            for other in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[other]
+            client = self._async_clients.get(loop)
+            if client is None:
+                if self.http2:
+                    import httpx
+                    limits = httpx.Limits(max_connections=self.pool_maxsize,
+                                          max_keepalive_connections=self.pool_maxsize)
+                    client = httpx.AsyncClient(http2=True, limits=limits, headers=self._default_headers())
+                else:
+                    import aiohttp
+                    connector = aiohttp.TCPConnector(limit=self.pool_maxsize, force_close=not self.keep_alive)
+                    client = aiohttp.ClientSession(connector=connector, headers=self._default_headers())
+                self._async_clients[loop] = client
+            return client
+
+    async def arequest_json(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Send a request through the pooled async client of the running event loop
+        and return the decoded JSON body. Raises HTTPError for 4xx/5xx responses.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        client = self._async_client()
+        host = urlsplit(url).netloc
+        if "json" in kwargs:
+            kwargs["data"] = json.dumps(kwargs.pop("json")).encode("utf-8")
+            kwargs["headers"] = {"Content-Type": "application/json", **(kwargs.get("headers") or {})}
+        sent = len(url) + len(urlencode(kwargs.get("params") or {})) + len(kwargs.get("data") or b"")
+        start = time.perf_counter()
+        status = "error"
+        HTTP_IN_FLIGHT.inc(host=host)
+        try:
+            if self.http2:
+                response = await client.request(method, url, timeout=timeout, **kwargs)
+                status = response.status_code
+                body = response.content
+            else:
+                import aiohttp
+                async with client.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                          **kwargs) as response:
+                    status = response.status
+                    body = await response.read()
+        finally:
+            HTTP_IN_FLIGHT.dec(host=host)
+            HTTP_DURATION.observe(time.perf_counter() - start, host=host, method=method)
+            HTTP_REQUESTS.inc(host=host, method=method, status=status)
+        HTTP_BYTES_SENT.inc(sent, host=host)
+        HTTP_BYTES_RECEIVED.inc(len(body), host=host)
+        if status >= 400:
+            raise HTTPError(status, url, body.decode("utf-8", "replace"))
+        return json.loads(body) if body else None
+
+    async def aclose(self):
+        """Close the async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            if self.http2:
+                await client.aclose()
+            else:
+                await client.close()
+
+    def close(self):
+        """Close the sync client."""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_http_pool: Optional[HTTPPool] = None
+_http_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPPool:
+    """
+    Return the process-wide HTTP pool, created on first use from the environment:
+        HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_KEEP_ALIVE (default 1), HTTP_HTTP2 (default 0),
+        HTTP_TIMEOUT (default timeout in seconds, default 30; 0 = no timeout).
+    """
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                _http_pool = HTTPPool(
+                    pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "32")),
+                    keep_alive=os.getenv("HTTP_KEEP_ALIVE", "1").lower() not in ("0", "false", "no"),
+                    http2=os.getenv("HTTP_HTTP2", "0").lower() in ("1", "true", "yes"),
+                    timeout=float(os.getenv("HTTP_TIMEOUT", "30")) or None,
+                )
+    return _http_pool
+
+
+def set_http_pool(pool: Optional[HTTPPool]):
+    """Replace the process-wide HTTP pool (None resets it to the environment default)."""
+    global _http_pool
+    with _http_pool_lock:
+        _http_pool = pool
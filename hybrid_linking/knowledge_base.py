@@ -1,6 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Callable
 from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from .metrics import KB_DURATION, KB_SEARCHES, span
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class EntityCandidate:
@@ -12,6 +22,41 @@ class EntityCandidate:
     description: Optional[str] = None
     confidence: float = 0.0
 
+class CompactEntityCandidate:
+    """
+    EntityCandidate with __slots__ instead of a per-instance __dict__.
+    
+    Same fields, constructor and equality as EntityCandidate at a fraction of the
+    memory, for workloads holding millions of candidates.
+    """
+    __slots__ = ("uri", "label", "score", "entity_type", "description", "confidence")
+    
+    def __init__(self, uri: str, label: str, score: float, entity_type: Optional[str] = None,
+                 description: Optional[str] = None, confidence: float = 0.0):
+        self.uri = uri
+        self.label = label
+        self.score = score
+        self.entity_type = entity_type
+        self.description = description
+        self.confidence = confidence
+    
+    @classmethod
+    def from_candidate(cls, candidate: EntityCandidate) -> "CompactEntityCandidate":
+        return cls(candidate.uri, candidate.label, candidate.score, candidate.entity_type,
+                   candidate.description, candidate.confidence)
+    
+    def to_candidate(self) -> EntityCandidate:
+        return EntityCandidate(self.uri, self.label, self.score, self.entity_type, self.description, self.confidence)
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
 class KnowledgeBase(ABC):
     """Abstract interface for knowledge bases."""
     
@@ -20,6 +65,27 @@ class KnowledgeBase(ABC):
         """Search for entities by label with optional context."""
         pass
     
+    async def asearch_entities(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[EntityCandidate]:
+        """
+        Async counterpart of search_entities.
+        
+        The default implementation runs search_entities in the event loop's
+        executor; knowledge bases with a native async client should override it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.search_entities, label, context, limit))
+    
+    def search_entities_batch(self, labels: List[str], contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+                              limit: int = 10) -> List[List[EntityCandidate]]:
+        """
+        Search for several labels at once; returns one candidate list per label, in order.
+        
+        The default implementation calls search_entities for each label; knowledge
+        bases that can answer many labels in one query should override it.
+        """
+        contexts = contexts if contexts is not None else [None] * len(labels)
+        return [self.search_entities(label, context, limit) for label, context in zip(labels, contexts)]
+    
     @abstractmethod
     def get_entity_info(self, uri: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about an entity."""
@@ -31,17 +97,40 @@ class KnowledgeBase(ABC):
         pass
 
 class DBpediaKnowledgeBase(KnowledgeBase):
-    """DBpedia implementation of the knowledge base interface."""
+    """DBpedia implementation of the knowledge base interface.
     
-    def __init__(self, endpoint: str = "https://dbpedia.org/sparql"):
+    Label lookups go through the shared SPARQL cache; pass use_cache=False to disable it.
+    With compact=True, candidates are returned as CompactEntityCandidate.
+    """
+    
+    def __init__(self, endpoint: str = "https://dbpedia.org/sparql", use_cache: bool = True, compact: bool = False):
         self.endpoint = endpoint
+        self.use_cache = use_cache
+        self.candidate_class = CompactEntityCandidate if compact else EntityCandidate
     
     def search_entities(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[EntityCandidate]:
         from .dbpedia_sparql import search_dbpedia_entity
         
         # Use existing DBpedia search logic
-        candidates = search_dbpedia_entity(label, limit)
+        candidates = search_dbpedia_entity(label, limit, endpoint=self.endpoint, use_cache=self.use_cache)
+        return self._to_candidates(candidates, context)
+    
+    async def asearch_entities(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[EntityCandidate]:
+        from .dbpedia_sparql import asearch_dbpedia_entity
+        
+        candidates = await asearch_dbpedia_entity(label, limit, endpoint=self.endpoint, use_cache=self.use_cache)
+        return self._to_candidates(candidates, context)
+    
+    def search_entities_batch(self, labels: List[str], contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+                              limit: int = 10) -> List[List[EntityCandidate]]:
+        """Resolve all labels with VALUES queries (see search_dbpedia_entities) instead of one query each."""
+        from .dbpedia_sparql import search_dbpedia_entities
         
+        contexts = contexts if contexts is not None else [None] * len(labels)
+        rows = search_dbpedia_entities(labels, limit, endpoint=self.endpoint, use_cache=self.use_cache)
+        return [self._to_candidates(rows[label], context) for label, context in zip(labels, contexts)]
+    
+    def _to_candidates(self, candidates: List[Tuple[str, str]], context: Optional[Dict[str, Any]]) -> List[EntityCandidate]:
         # Convert to EntityCandidate objects
         entity_candidates = []
         for uri, label_text in candidates:
@@ -50,7 +139,7 @@ class DBpediaKnowledgeBase(KnowledgeBase):
                 # Apply context-aware scoring
                 score = self._calculate_context_score(uri, context)
             
-            entity_candidates.append(EntityCandidate(
+            entity_candidates.append(self.candidate_class(
                 uri=uri,
                 label=label_text,
                 score=score
@@ -92,15 +181,51 @@ class WikidataKnowledgeBase(KnowledgeBase):
     def get_name(self) -> str:
         return "Wikidata"
 
+class _Bulkhead:
+    """Thread pool of one knowledge base and the number of its threads held by abandoned searches."""
+    __slots__ = ("executor", "abandoned")
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        self.abandoned = 0
+
+
 class KnowledgeBaseRegistry:
-    """Registry for managing multiple knowledge bases."""
+    """
+    Registry for managing multiple knowledge bases.
+    
+    search_all queries the registered knowledge bases concurrently, each on its own
+    thread pool. A knowledge base that has not answered within its timeout (per-KB at
+    registration, else the registry default; measured from when its search starts) is
+    reported as timed out, and no search waits past the overall
+    deadline. With early_stop_score, the search returns as soon as any knowledge base
+    yields a candidate scoring at least that much; the slower ones are abandoned.
     
-    def __init__(self):
+    Args:
+        timeout: Default per-knowledge-base timeout in seconds (None = no limit).
+        deadline: Overall time limit for one search_all call in seconds (None = no limit).
+        early_stop_score: Return once a candidate scores at least this much (None = wait for all).
+        max_workers: Threads per knowledge base. Each knowledge base has its own pool (a bulkhead),
+            so a hung knowledge base cannot delay the others. A search that times out keeps its
+            thread until it returns; while all threads of a knowledge base are held by such
+            searches, new searches of it are reported as skipped at once.
+    """
+    
+    def __init__(self, timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 early_stop_score: Optional[float] = None, max_workers: int = 8):
         self._knowledge_bases: Dict[str, KnowledgeBase] = {}
+        self._timeouts: Dict[str, Optional[float]] = {}
+        self.timeout = timeout
+        self.deadline = deadline
+        self.early_stop_score = early_stop_score
+        self.max_workers = max_workers
+        self._bulkheads: Dict[str, _Bulkhead] = {}
+        self._lock = threading.Lock()
     
-    def register(self, name: str, kb: KnowledgeBase):
-        """Register a knowledge base."""
+    def register(self, name: str, kb: KnowledgeBase, timeout: Optional[float] = None):
+        """Register a knowledge base, optionally with its own search timeout in seconds."""
         self._knowledge_bases[name] = kb
+        self._timeouts[name] = timeout
     
     def get(self, name: str) -> Optional[KnowledgeBase]:
         """Get a knowledge base by name."""
@@ -110,13 +235,275 @@ class KnowledgeBaseRegistry:
         """List all available knowledge bases."""
         return list(self._knowledge_bases.keys())
     
-    def search_all(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> Dict[str, List[EntityCandidate]]:
-        """Search across all registered knowledge bases."""
-        results = {}
-        for name, kb in self._knowledge_bases.items():
-            try:
-                results[name] = kb.search_entities(label, context, limit)
-            except Exception as e:
-                print(f"Error searching {name}: {e}")
-                results[name] = []
-        return results 
\ No newline at end of file
+    def search_all(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10,
+                   names: Optional[List[str]] = None, **options) -> Dict[str, List[EntityCandidate]]:
+        """
+        Search across all (or the named) registered knowledge bases concurrently.
+        
+        Knowledge bases that fail, time out or are abandoned contribute an empty list;
+        use search_all_with_status to see which. Accepts the same options.
+        """
+        return self.search_all_with_status(label, context, limit, names, **options)[0]
+    
+    def search_all_with_status(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10,
+                               names: Optional[List[str]] = None, timeout: Optional[float] = None,
+                               deadline: Optional[float] = None, early_stop_score: Optional[float] = None
+                               ) -> Tuple[Dict[str, List[EntityCandidate]], Dict[str, Dict[str, Any]]]:
+        """
+        Search knowledge bases concurrently and report how each search ended.
+        
+        Each search is traced as a "kb.search" span.
+        
+        Args:
+            label: Label to search for.
+            context: Optional context analysis passed to each knowledge base.
+            limit: Maximum number of candidates per knowledge base.
+            names: Knowledge bases to search (None = all; unknown names are ignored).
+            timeout: Per-knowledge-base timeout, overriding the registered and default ones.
+            deadline: Overall time limit, overriding the registry default.
+            early_stop_score: Early return threshold, overriding the registry default.
+        Returns:
+            (results, status): candidates per knowledge base, and per knowledge base a dict
+            with 'status' ("ok", "error", "timeout" or "skipped"), 'seconds', 'candidates',
+            'error' for errors and 'reason' ("busy" or "early_stop") for skipped searches.
+        """
+        early_stop_score = early_stop_score if early_stop_score is not None else self.early_stop_score
+        stop = None
+        if early_stop_score is not None:
+            def stop(results: Dict[str, List[EntityCandidate]]) -> bool:
+                return any(candidate.score >= early_stop_score
+                           for candidates in results.values() for candidate in candidates)
+        return self._fan_out(self._known(names), lambda kb: kb.search_entities(label, context, limit), list, len,
+                             timeout, deadline, stop, "kb.search")
+    
+    def search_batch_with_status(self, labels: List[str], contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                 limit: int = 10, names: Optional[List[str]] = None, timeout: Optional[float] = None,
+                                 deadline: Optional[float] = None, early_stop_score: Optional[float] = None
+                                 ) -> Tuple[Dict[str, List[List[EntityCandidate]]], Dict[str, Dict[str, Any]]]:
+        """
+        Batch counterpart of search_all_with_status: search knowledge bases concurrently for
+        several labels, each with one search_entities_batch call, under the same timeouts,
+        deadline and bulkheads. With early_stop_score, the search returns once every label
+        has a candidate scoring at least that much.
+        
+        Each batch search is traced as a "kb.search_batch" span.
+        
+        Args:
+            labels: Labels to search for.
+            contexts: Optional context analysis per label.
+            limit: Maximum number of candidates per label and knowledge base.
+            names: Knowledge bases to search (None = all; unknown names are ignored).
+            timeout: Per-knowledge-base timeout, overriding the registered and default ones.
+            deadline: Overall time limit, overriding the registry default.
+            early_stop_score: Early return threshold, overriding the registry default.
+        Returns:
+            (results, status): per knowledge base one candidate list per label (empty lists if
+            it failed), and per knowledge base a status dict as from search_all_with_status,
+            whose 'candidates' is the total over all labels.
+        """
+        early_stop_score = early_stop_score if early_stop_score is not None else self.early_stop_score
+        stop = None
+        if early_stop_score is not None:
+            def stop(results: Dict[str, List[List[EntityCandidate]]]) -> bool:
+                return all(any(candidate.score >= early_stop_score
+                               for found in results.values() for candidate in found[i]) for i in range(len(labels)))
+        return self._fan_out(self._known(names), lambda kb: kb.search_entities_batch(labels, contexts, limit),
+                             lambda: [[] for _ in labels], lambda found: sum(map(len, found)),
+                             timeout, deadline, stop, "kb.search_batch", labels=len(labels))
+    
+    def _known(self, names: Optional[List[str]]) -> List[str]:
+        """The named (default: all) registered knowledge bases, ignoring unknown names."""
+        return [name for name in (names if names is not None else self._knowledge_bases) if name in self._knowledge_bases]
+    
+    def _fan_out(self, names: List[str], search: Callable[[KnowledgeBase], Any], empty: Callable[[], Any],
+                 count: Callable[[Any], int], timeout: Optional[float], deadline: Optional[float],
+                 stop: Optional[Callable[[Dict[str, Any]], bool]], span_name: str, **span_attrs: Any
+                 ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Run search(kb) for each named knowledge base on its bulkhead, applying timeouts and the
+        deadline; failed or abandoned searches get empty(). Once stop(results) is true, the
+        searches still running are abandoned.
+        """
+        deadline = deadline if deadline is not None else self.deadline
+        results: Dict[str, Any] = {name: empty() for name in names}
+        status: Dict[str, Dict[str, Any]] = {}
+        cutoffs = {name: self._cutoff(name, timeout, deadline) for name in names}
+        
+        if len(names) == 1 and cutoffs[names[0]] is None:
+            # Nothing to overlap or bound: search inline
+            name = names[0]
+            results[name], status[name] = self._search_one(name, search, empty, count, span_name, span_attrs)
+            return results, status
+        
+        start = time.perf_counter()
+        deadline_at = start + deadline if deadline is not None else None
+        timeouts = {name: self._timeout(name, timeout) for name in names}
+        calls: Dict[str, Dict[str, Any]] = {}
+        futures = {}
+        for name in names:
+            bulkhead = self._get_bulkhead(name)
+            if bulkhead.abandoned >= self.max_workers:
+                # Every thread of this knowledge base is held by a search given up on: report it at once
+                self._skip_busy(name, status, 0.0)
+                continue
+            calls[name] = {"started": None, "finished": False, "abandoned": False}
+            futures[bulkhead.executor.submit(contextvars.copy_context().run, self._search_in_bulkhead, bulkhead,
+                                             calls[name], name, search, empty, count, span_name, span_attrs)] = name
+        
+        def next_check(name: str) -> Optional[float]:
+            # Per-KB timeouts run from when the search started (a queued search waits at most its
+            # timeout for a thread); the deadline runs from the start of the call
+            limits = [deadline_at] if deadline_at is not None else []
+            if timeouts[name] is not None:
+                limits.append((calls[name]["started"] or start) + timeouts[name])
+            return min(limits) if limits else None
+        
+        pending = set(futures)
+        while pending:
+            now = time.perf_counter()
+            for future in [f for f in pending if next_check(futures[f]) is not None and next_check(futures[f]) <= now]:
+                pending.discard(future)
+                name = futures[future]
+                if future.cancel():
+                    self._skip_busy(name, status, now - start)
+                    continue
+                elapsed = now - (calls[name]["started"] or now)
+                with self._lock:
+                    if calls[name]["finished"]:
+                        pending.add(future)  # finished just now: collect its result below
+                        continue
+                    calls[name]["abandoned"] = True
+                    self._get_bulkhead(name, locked=True).abandoned += 1
+                logger.warning("Search of %s timed out after %.2fs", name, elapsed)
+                KB_SEARCHES.inc(kb=name, outcome="timeout")
+                status[name] = {"status": "timeout", "seconds": round(elapsed, 4), "candidates": 0}
+            if not pending:
+                break
+            remaining = [t for t in (next_check(futures[f]) for f in pending) if t is not None]
+            done, pending = wait(pending, timeout=max(0.0, min(remaining) - now) if remaining else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                results[name], status[name] = future.result()
+            if stop is not None and pending and done and stop(results):
+                for future in pending:
+                    future.cancel()
+                    status[futures[future]] = {"status": "skipped", "reason": "early_stop",
+                                               "seconds": round(time.perf_counter() - start, 4), "candidates": 0}
+                break
+        return results, {name: status[name] for name in names}
+    
+    def _timeout(self, name: str, timeout: Optional[float]) -> Optional[float]:
+        """Search timeout of the named knowledge base: the call's, else the registered one, else the default."""
+        if timeout is None:
+            timeout = self._timeouts.get(name)
+        return timeout if timeout is not None else self.timeout
+    
+    def _cutoff(self, name: str, timeout: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        """Seconds after the start of a search at which the named knowledge base is given up on."""
+        limits = [t for t in (self._timeout(name, timeout), deadline) if t is not None]
+        return min(limits) if limits else None
+    
+    def _search_one(self, name: str, search: Callable[[KnowledgeBase], Any], empty: Callable[[], Any],
+                    count: Callable[[Any], int], span_name: str, span_attrs: Dict[str, Any]
+                    ) -> Tuple[Any, Dict[str, Any]]:
+        """Run search on one knowledge base, recording metrics; errors become an empty result."""
+        start = time.perf_counter()
+        try:
+            with span(span_name, kb=name, **span_attrs):
+                found = search(self._knowledge_bases[name])
+            KB_SEARCHES.inc(kb=name, outcome="ok")
+            state = {"status": "ok"}
+        except Exception as e:
+            logger.warning("Error searching %s: %s", name, e)
+            KB_SEARCHES.inc(kb=name, outcome="error")
+            found = empty()
+            state = {"status": "error", "error": str(e)}
+        elapsed = time.perf_counter() - start
+        KB_DURATION.observe(elapsed, kb=name)
+        state.update(seconds=round(elapsed, 4), candidates=count(found))
+        return found, state
+    
+    def _search_in_bulkhead(self, bulkhead: "_Bulkhead", call: Dict[str, Any], name: str, *args: Any
+                            ) -> Tuple[Any, Dict[str, Any]]:
+        """Run _search_one on the knowledge base's pool, recording when it starts and ends."""
+        call["started"] = time.perf_counter()
+        try:
+            return self._search_one(name, *args)
+        finally:
+            with self._lock:
+                call["finished"] = True
+                if call["abandoned"]:
+                    bulkhead.abandoned -= 1
+    
+    def _skip_busy(self, name: str, status: Dict[str, Dict[str, Any]], elapsed: float):
+        logger.warning("Search of %s skipped: no free worker", name)
+        KB_SEARCHES.inc(kb=name, outcome="skipped")
+        status[name] = {"status": "skipped", "reason": "busy", "seconds": round(elapsed, 4), "candidates": 0}
+    
+    def _get_bulkhead(self, name: str, locked: bool = False) -> "_Bulkhead":
+        """Thread pool of one knowledge base (created on first use); locked=True if self._lock is held."""
+        if not locked:
+            with self._lock:
+                return self._get_bulkhead(name, locked=True)
+        if name not in self._bulkheads:
+            self._bulkheads[name] = _Bulkhead(
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"kb-search-{name}"))
+        return self._bulkheads[name]
+    
+    async def asearch_all(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10,
+                          names: Optional[List[str]] = None, **options) -> Dict[str, List[EntityCandidate]]:
+        """Async counterpart of search_all."""
+        return (await self.asearch_all_with_status(label, context, limit, names, **options))[0]
+    
+    async def asearch_all_with_status(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10,
+                                      names: Optional[List[str]] = None, timeout: Optional[float] = None,
+                                      deadline: Optional[float] = None, early_stop_score: Optional[float] = None
+                                      ) -> Tuple[Dict[str, List[EntityCandidate]], Dict[str, Dict[str, Any]]]:
+        """Async counterpart of search_all_with_status; abandoned searches are cancelled."""
+        names = self._known(names)
+        deadline = deadline if deadline is not None else self.deadline
+        early_stop_score = early_stop_score if early_stop_score is not None else self.early_stop_score
+        results: Dict[str, List[EntityCandidate]] = {name: [] for name in names}
+        status: Dict[str, Dict[str, Any]] = {}
+        
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._timed_asearch(name, label, context, limit,
+                                                           self._cutoff(name, timeout, deadline))): name
+                 for name in names}
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                results[name], status[name] = task.result()
+            if early_stop_score is not None and pending and any(
+                    candidate.score >= early_stop_score for task in done for candidate in results[tasks[task]]):
+                for task in pending:
+                    task.cancel()
+                    status[tasks[task]] = {"status": "skipped", "reason": "early_stop",
+                                           "seconds": round(time.perf_counter() - start, 4), "candidates": 0}
+                break
+        return results, {name: status[name] for name in names}
+    
+    async def _timed_asearch(self, name: str, label: str, context: Optional[Dict[str, Any]], limit: int,
+                             cutoff: Optional[float]) -> Tuple[List[EntityCandidate], Dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            with span("kb.search", kb=name), KB_DURATION.time(kb=name):
+                candidates = await asyncio.wait_for(
+                    self._knowledge_bases[name].asearch_entities(label, context, limit), cutoff)
+            KB_SEARCHES.inc(kb=name, outcome="ok")
+            state = {"status": "ok"}
+        except asyncio.TimeoutError:
+            logger.warning("Search of %s timed out after %.2fs", name, cutoff)
+            KB_SEARCHES.inc(kb=name, outcome="timeout")
+            candidates = []
+            state = {"status": "timeout"}
+        except Exception as e:
+            logger.warning("Error searching %s: %s", name, e)
+            KB_SEARCHES.inc(kb=name, outcome="error")
+            candidates = []
+            state = {"status": "error", "error": str(e)}
+        state.update(seconds=round(time.perf_counter() - start, 4), candidates=len(candidates))
+        return candidates, state
@@ -1,6 +1,11 @@
 from hybrid_linking.gemini_api import call_gemini
-from hybrid_linking.dbpedia_sparql import search_dbpedia_entity
+from hybrid_linking.dbpedia_sparql import search_dbpedia_entity, run_sparql_query, DBPEDIA_SPARQL_ENDPOINT
+from hybrid_linking.sparql_cache import get_sparql_cache
+from hybrid_linking.metrics import traced
 from typing import Optional, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
 
 def normalize_entity_name(entity_mention: str, context: Optional[str] = None) -> str:
     prompt = f"""
@@ -48,7 +53,7 @@ Return only the JSON object, no additional text.
                 "description": "Unknown entity type"
             }
     except Exception as e:
-        print(f"Error analyzing context: {e}")
+        logger.warning("Error analyzing context: %s", e)
         return {
             "entity_type": "other",
             "confidence": 0.5,
@@ -56,61 +61,111 @@ Return only the JSON object, no additional text.
             "description": "Error in analysis"
         }
 
-def search_dbpedia_with_context(label: str, context_analysis: dict, limit: int = 10) -> List[Tuple[str, str, float]]:
+def normalize_and_analyze_entity(entity_mention: str, context: str) -> Tuple[str, dict]:
+    """
+    Fused variant of normalize_entity_name plus analyze_entity_context: a single Gemini
+    call returns the canonical name and the context analysis together.
+    Returns (canonical_name, context_analysis). Falls back to normalize_entity_name if the
+    response has no canonical name.
+    """
+    prompt = f"""
+Given the following entity mention and context, return the canonical name as used in DBpedia and
+an analysis of the most likely entity type and characteristics.
+Return a JSON object with the following fields:
+- canonical_name: the canonical DBpedia name (just the name)
+- entity_type: "person", "company", "place", "product", "concept", or "other"
+- confidence: confidence score (0-1)
+- keywords: list of relevant keywords that might help in disambiguation
+- description: brief description of what this entity likely refers to
+
+Entity: {entity_mention}
+Context: {context}
+
+Return only the JSON object, no additional text.
+"""
+    analysis = {
+        "entity_type": "other",
+        "confidence": 0.5,
+        "keywords": [],
+        "description": "Unknown entity type"
+    }
+    canonical_name = None
+    try:
+        response = call_gemini(prompt).strip()
+        import json
+        import re
+        
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if json_match:
+            parsed = json.loads(json_match.group())
+            canonical_name = parsed.pop("canonical_name", None)
+            analysis = parsed
+    except Exception as e:
+        logger.warning("Error in fused analysis: %s", e)
+        analysis["description"] = "Error in analysis"
+    if not canonical_name:
+        canonical_name = normalize_entity_name(entity_mention, context)
+    return str(canonical_name).strip(), analysis
+
+def search_dbpedia_with_context(label: str, context_analysis: dict, limit: int = 10,
+                                use_cache: bool = True) -> List[Tuple[str, str, float]]:
     """
     Search DBpedia with context-aware filtering and scoring.
     Returns list of (URI, label, score) tuples.
+    The raw query rows are cached per label; scoring is applied on every call.
     """
-    from SPARQLWrapper import SPARQLWrapper, JSON
+    cache = get_sparql_cache()
+    rows = cache.get("context", DBPEDIA_SPARQL_ENDPOINT, label, limit) if use_cache else None
     
-    sparql = SPARQLWrapper("https://dbpedia.org/sparql")
-    
-    # Build context-aware query with more entity information
-    query = f'''
-    SELECT DISTINCT ?uri ?label ?type ?abstract WHERE {{
-      ?uri rdfs:label ?label .
-      FILTER (?label = "{label}"@en)
-      OPTIONAL {{
-        ?uri rdf:type ?type .
-      }}
-      OPTIONAL {{
-        ?uri dbo:abstract ?abstract .
-        FILTER (lang(?abstract) = 'en')
-      }}
-    }} LIMIT {limit}
-    '''
+    if rows is None:
+        # Build context-aware query with more entity information
+        query = f'''
+        SELECT DISTINCT ?uri ?label ?type ?abstract WHERE {{
+          ?uri rdfs:label ?label .
+          FILTER (?label = "{label}"@en)
+          OPTIONAL {{
+            ?uri rdf:type ?type .
+          }}
+          OPTIONAL {{
+            ?uri dbo:abstract ?abstract .
+            FILTER (lang(?abstract) = 'en')
+          }}
+        }} LIMIT {limit}
+        '''
+        
+        try:
+            results = run_sparql_query(query, DBPEDIA_SPARQL_ENDPOINT)
+        except Exception as e:
+            logger.warning("Error in context-aware search: %s", e)
+            return []
+        rows = [
+            [
+                result["uri"]["value"],
+                result["label"]["value"],
+                result.get("type", {}).get("value", ""),
+                result.get("abstract", {}).get("value", ""),
+            ]
+            for result in results["results"]["bindings"]
+        ]
+        if use_cache:
+            cache.set("context", DBPEDIA_SPARQL_ENDPOINT, label, rows, limit=limit)
     
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
+    candidates = []
+    seen_uris = set()
     
-    try:
-        results = sparql.query().convert()
-        candidates = []
-        seen_uris = set()
-        
-        for result in results["results"]["bindings"]:
-            uri = result["uri"]["value"]
-            
-            # Skip duplicates
-            if uri in seen_uris:
-                continue
-            seen_uris.add(uri)
-            
-            label = result["label"]["value"]
-            entity_type_uri = result.get("type", {}).get("value", "")
-            abstract = result.get("abstract", {}).get("value", "")
-            
-            # Score based on context analysis
-            score = calculate_context_score(uri, entity_type_uri, abstract, context_analysis)
-            candidates.append((uri, label, score))
+    for uri, row_label, entity_type_uri, abstract in rows:
+        # Skip duplicates
+        if uri in seen_uris:
+            continue
+        seen_uris.add(uri)
         
-        # Sort by score (highest first)
-        candidates.sort(key=lambda x: x[2], reverse=True)
-        return candidates
-        
-    except Exception as e:
-        print(f"Error in context-aware search: {e}")
-        return []
+        # Score based on context analysis
+        score = calculate_context_score(uri, entity_type_uri, abstract, context_analysis)
+        candidates.append((uri, row_label, score))
+    
+    # Sort by score (highest first)
+    candidates.sort(key=lambda x: x[2], reverse=True)
+    return candidates
 
 def calculate_context_score(uri: str, entity_type_uri: str, abstract: str, context_analysis: dict) -> float:
     """
@@ -156,15 +211,25 @@ def calculate_context_score(uri: str, entity_type_uri: str, abstract: str, conte
     
     return min(score, 1.0)  # Cap at 1.0
 
-def link_entity_to_dbpedia(entity_mention: str, context: Optional[str] = None, limit: int = 5):
-    # Step 1: Normalize entity name using Gemini
-    canonical_name = normalize_entity_name(entity_mention, context)
-    
-    # Step 2: Analyze context if provided
+@traced("linker.link_entity_to_dbpedia")
+def link_entity_to_dbpedia(entity_mention: str, context: Optional[str] = None, limit: int = 5, fused: bool = False):
+    """
+    Link a mention to DBpedia. With fused=True and a context, normalization and context
+    analysis share one Gemini call (normalize_and_analyze_entity) instead of two.
+    """
     context_analysis = {}
-    if context:
-        context_analysis = analyze_entity_context(entity_mention, context)
-        print(f"Context Analysis: {context_analysis}")
+    if fused and context:
+        # Steps 1 and 2 in one call
+        canonical_name, context_analysis = normalize_and_analyze_entity(entity_mention, context)
+        logger.debug("Context Analysis: %s", context_analysis)
+    else:
+        # Step 1: Normalize entity name using Gemini
+        canonical_name = normalize_entity_name(entity_mention, context)
+        
+        # Step 2: Analyze context if provided
+        if context:
+            context_analysis = analyze_entity_context(entity_mention, context)
+            logger.debug("Context Analysis: %s", context_analysis)
     
     # Step 3: Search DBpedia with context-aware filtering
     if context_analysis:
@@ -1,44 +1,200 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Any, List, Optional, Tuple
+import asyncio
+import contextvars
+import functools
+import logging
+import math
 import os
+import threading
+import time
+from .cache import TieredCache, get_response_cache, make_cache_key
+from .http_pool import get_http_pool
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter, get_rate_limiter, estimate_tokens
+from .singleflight import get_single_flight
+from .metrics import LLM_CALLS, LLM_DURATION, LLM_HEDGES, LLM_HEDGE_WINS, LLM_PROMPT_CHARS, span
+
+logger = logging.getLogger(__name__)
+
+# Set by LLMRegistry around a provider call; providers with reports_latency pass it the latency of
+# requests they actually send, so cache hits stay out of the hedge latency window
+_latency_recorder: contextvars.ContextVar[Optional[Callable[[float], None]]] = \
+    contextvars.ContextVar("llm_latency_recorder", default=None)
+
+
+def _report_latency(seconds: float):
+    recorder = _latency_recorder.get()
+    if recorder is not None:
+        recorder(seconds)
 
 class LLMProvider(ABC):
-    """Abstract interface for LLM providers."""
+    """
+    Abstract interface for LLM providers.
+    
+    Providers that answer some calls without a request (e.g. from a cache) set
+    reports_latency and report the latency of the requests they do send; for other
+    providers LLMRegistry times the whole call.
+    """
+    
+    reports_latency = False
     
     @abstractmethod
     def generate_text(self, prompt: str, **kwargs) -> str:
         """Generate text from a prompt."""
         pass
     
+    async def agenerate_text(self, prompt: str, **kwargs) -> str:
+        """
+        Async counterpart of generate_text.
+        
+        The default implementation runs generate_text in the event loop's
+        executor so existing sync providers work unchanged; providers with a
+        native async client should override it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.generate_text, prompt, **kwargs))
+    
     @abstractmethod
     def get_name(self) -> str:
         """Get the name of this LLM provider."""
         pass
 
 class GeminiProvider(LLMProvider):
-    """Gemini implementation of the LLM provider interface."""
+    """
+    Gemini implementation of the LLM provider interface.
     
-    def __init__(self, api_key: Optional[str] = None):
+    Responses are cached by model and prompt. By default the process-wide
+    response cache is shared with `gemini_api.call_gemini`; pass `cache` to use
+    a dedicated one, or `use_cache=False` (here or per call) to bypass it.
+    Transient failures are retried according to `retry_policy`. Every request
+    acquires from `rate_limiter` (default: the process-wide Gemini limiter shared
+    with `call_gemini`). Calls are counted in llm_calls_total{provider="gemini"} and
+    traced as "llm.generate" spans. With `coalesce` (default; overridable per call),
+    concurrent cache misses for the same prompt and use_cache share one request, in
+    the same single-flight group as `call_gemini`.
+    """
+    
+    reports_latency = True
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash",
+                 cache: Optional[TieredCache] = None, use_cache: bool = True,
+                 timeout: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None, coalesce: bool = True):
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        self.api_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent'
+        self.model = model
+        self.timeout = timeout
+        self.api_url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent'
+        self._cache = cache
+        self.use_cache = use_cache
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self.coalesce = coalesce
+    
+    @property
+    def cache(self) -> TieredCache:
+        return self._cache if self._cache is not None else get_response_cache()
+    
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter if self._rate_limiter is not None else get_rate_limiter()
+    
+    def _payload(self, prompt: str) -> Dict[str, Any]:
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+    
+    @staticmethod
+    def _extract_text(result: Dict[str, Any]) -> Optional[str]:
+        try:
+            return result["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception:
+            return None
+    
+    def _post(self, headers: Dict[str, str], params: Dict[str, str], prompt: str) -> Dict[str, Any]:
+        self.rate_limiter.acquire(estimate_tokens(prompt))
+        response = get_http_pool().post(self.api_url, headers=headers, params=params, json=self._payload(prompt),
+                                        timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _apost(self, headers: Dict[str, str], params: Dict[str, str], prompt: str) -> Dict[str, Any]:
+        await self.rate_limiter.aacquire(estimate_tokens(prompt))
+        return await get_http_pool().arequest_json("POST", self.api_url, timeout=self.timeout, headers=headers,
+                                                   params=params, json=self._payload(prompt))
     
     def generate_text(self, prompt: str, **kwargs) -> str:
-        import requests
+        use_cache = kwargs.get("use_cache", self.use_cache)
+        cache_key = make_cache_key(self.model, prompt)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                LLM_CALLS.inc(provider="gemini", outcome="cache_hit")
+                return cached
+        if kwargs.get("coalesce", self.coalesce):
+            return get_single_flight("llm").do((cache_key, use_cache), self._generate_uncached, prompt, cache_key,
+                                               use_cache)
+        return self._generate_uncached(prompt, cache_key, use_cache)
+    
+    def _generate_uncached(self, prompt: str, cache_key: str, use_cache: bool) -> str:
+        headers = {"Content-Type": "application/json"}
+        params = {"key": self.api_key}
+        
+        LLM_PROMPT_CHARS.inc(len(prompt), provider="gemini")
+        start = time.perf_counter()
+        with span("llm.generate", provider="gemini", model=self.model, prompt_chars=len(prompt)), \
+                LLM_DURATION.time(provider="gemini"):
+            try:
+                result = self.retry_policy.call(self._post, headers, params, prompt)
+            except Exception:
+                LLM_CALLS.inc(provider="gemini", outcome="error")
+                raise
+        LLM_CALLS.inc(provider="gemini", outcome="ok")
+        _report_latency(time.perf_counter() - start)
         
+        text = self._extract_text(result)
+        if text is None:
+            return str(result)
+        if use_cache:
+            self.cache.set(cache_key, text)
+        return text
+    
+    async def agenerate_text(self, prompt: str, **kwargs) -> str:
+        """Non-blocking generate_text over the shared async HTTP pool, sharing the same response cache."""
+        use_cache = kwargs.get("use_cache", self.use_cache)
+        cache_key = make_cache_key(self.model, prompt)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                LLM_CALLS.inc(provider="gemini", outcome="cache_hit")
+                return cached
+        if kwargs.get("coalesce", self.coalesce):
+            return await get_single_flight("llm").ado((cache_key, use_cache), self._agenerate_uncached, prompt,
+                                                      cache_key, use_cache)
+        return await self._agenerate_uncached(prompt, cache_key, use_cache)
+    
+    async def _agenerate_uncached(self, prompt: str, cache_key: str, use_cache: bool) -> str:
         headers = {"Content-Type": "application/json"}
         params = {"key": self.api_key}
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}]
-        }
         
-        response = requests.post(self.api_url, headers=headers, params=params, json=data)
-        response.raise_for_status()
-        result = response.json()
+        LLM_PROMPT_CHARS.inc(len(prompt), provider="gemini")
+        start = time.perf_counter()
+        with span("llm.generate", provider="gemini", model=self.model, prompt_chars=len(prompt)), \
+                LLM_DURATION.time(provider="gemini"):
+            try:
+                result = await self.retry_policy.acall(self._apost, headers, params, prompt)
+            except Exception:
+                LLM_CALLS.inc(provider="gemini", outcome="error")
+                raise
+        LLM_CALLS.inc(provider="gemini", outcome="ok")
+        _report_latency(time.perf_counter() - start)
         
-        try:
-            return result["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
+        text = self._extract_text(result)
+        if text is None:
             return str(result)
+        if use_cache:
+            self.cache.set(cache_key, text)
+        return text
     
     def get_name(self) -> str:
         return "Gemini"
@@ -57,10 +213,35 @@ class OpenAIProvider(LLMProvider):
         return "OpenAI"
 
 class LLMRegistry:
-    """Registry for managing multiple LLM providers."""
+    """
+    Registry for managing multiple LLM providers.
     
-    def __init__(self):
+    Besides lookup, the registry can call providers concurrently: generate_with_all
+    asks every provider at once, and generate_first returns the first good answer,
+    sending a backup request (hedge) when the first has not answered within the
+    provider's recent p95 latency. Latencies of calls made through the registry are
+    kept per provider (the last latency_window samples) to derive that delay; answers
+    a provider serves from its cache are not counted.
+    
+    Args:
+        max_workers: Threads used for concurrent provider calls.
+        hedge_quantile: Latency percentile (0-100) after which a backup request is sent.
+        default_hedge_delay: Delay in seconds used until min_samples latencies are known.
+        min_samples: Samples needed before the percentile replaces default_hedge_delay.
+        latency_window: Number of recent latencies kept per provider.
+    """
+    
+    def __init__(self, max_workers: int = 32, hedge_quantile: float = 95.0, default_hedge_delay: float = 2.0,
+                 min_samples: int = 20, latency_window: int = 200):
         self._providers: Dict[str, LLMProvider] = {}
+        self.max_workers = max_workers
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.latency_window = latency_window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
     
     def register(self, name: str, provider: LLMProvider):
         """Register an LLM provider."""
@@ -74,13 +255,235 @@ class LLMRegistry:
         """List all available LLM providers."""
         return list(self._providers.keys())
     
-    def generate_with_all(self, prompt: str, **kwargs) -> Dict[str, str]:
-        """Generate text using all registered providers."""
+    def record_latency(self, name: str, seconds: float):
+        """Add a successful call's latency to the named provider's window."""
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=self.latency_window)).append(seconds)
+    
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for the named provider before sending a backup request."""
+        with self._lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        rank = max(1, math.ceil(self.hedge_quantile / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+    
+    def generate_with_all(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> Dict[str, str]:
+        """
+        Generate text using all registered providers concurrently.
+        
+        Args:
+            prompt: Prompt sent to every provider.
+            timeout: Seconds to wait for all providers (None = no limit); late providers are reported as errors.
+        Returns:
+            Response per provider name, or "Error: ..." for providers that failed or timed out.
+        """
+        executor = self._get_executor()
+        futures = {name: executor.submit(contextvars.copy_context().run, self._timed_generate, name, prompt, kwargs)
+                   for name in self._providers}
+        wait(futures.values(), timeout=timeout)
         results = {}
-        for name, provider in self._providers.items():
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                logger.warning("Timed out waiting for %s", name)
+                results[name] = f"Error: timed out after {timeout}s"
+                continue
             try:
-                results[name] = provider.generate_text(prompt, **kwargs)
+                results[name] = future.result()
             except Exception as e:
-                print(f"Error with {name}: {e}")
+                logger.warning("Error with %s: %s", name, e)
                 results[name] = f"Error: {e}"
-        return results 
\ No newline at end of file
+        return results
+    
+    def generate_first(self, prompt: str, names: Optional[List[str]] = None, hedge_delay: Optional[float] = None,
+                       max_attempts: int = 2, **kwargs) -> str:
+        """
+        Return the first successful response, hedging slow requests with backups.
+        
+        Attempts go to the named providers in turn (wrapping around, so a single provider
+        is hedged with a second request to itself). Each backup is sent once the previous
+        attempt has been outstanding for hedge_delay, or immediately if it failed. The
+        first success wins; requests still queued are cancelled and running ones are
+        abandoned. With hedge_delay=0 all attempts race from the start. Backups are sent
+        with coalesce=False so they are not merged into the request they hedge.
+        
+        Args:
+            prompt: Prompt to send.
+            names: Providers to use, in order of preference (None = all registered).
+            hedge_delay: Seconds before each backup (None = the provider's hedge_delay).
+            max_attempts: Maximum number of requests sent in total.
+        Returns:
+            The winning response text.
+        Raises:
+            The last error if every attempt failed.
+        """
+        attempts = self._attempt_order(names, max_attempts)
+        executor = self._get_executor()
+        with span("llm.hedged_generate", attempts=len(attempts)) as hedge_span:
+            futures = {}
+            errors: List[Exception] = []
+            next_launch = time.perf_counter()
+            while True:
+                if len(futures) < len(attempts) and time.perf_counter() >= next_launch:
+                    name = attempts[len(futures)]
+                    if futures:
+                        LLM_HEDGES.inc(provider=name)
+                    attempt_kwargs = dict(kwargs, coalesce=False) if futures else kwargs
+                    future = executor.submit(contextvars.copy_context().run, self._timed_generate, name, prompt,
+                                             attempt_kwargs)
+                    futures[future] = (len(futures), name)
+                    next_launch = time.perf_counter() + (hedge_delay if hedge_delay is not None else self.hedge_delay(name))
+                    continue
+                pending = [f for f in futures if not f.done()]
+                if not pending and len(futures) == len(attempts):
+                    raise errors[-1]
+                if not pending:
+                    next_launch = time.perf_counter()
+                    continue
+                timeout = max(0.0, next_launch - time.perf_counter()) if len(futures) < len(attempts) else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    attempt, name = futures[future]
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        logger.warning("Error with %s: %s", name, e)
+                        errors.append(e)
+                        next_launch = time.perf_counter()
+                        continue
+                    for other in futures:
+                        other.cancel()
+                    if attempt:
+                        LLM_HEDGE_WINS.inc(provider=name)
+                    hedge_span.set_attribute("winner", name)
+                    hedge_span.set_attribute("winning_attempt", attempt)
+                    return text
+    
+    async def agenerate_with_all(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> Dict[str, str]:
+        """Async counterpart of generate_with_all."""
+        names = list(self._providers)
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(self._atimed_generate(name, prompt, kwargs), timeout) for name in names),
+            return_exceptions=True
+        )
+        results = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                logger.warning("Timed out waiting for %s", name)
+                results[name] = f"Error: timed out after {timeout}s"
+            elif isinstance(outcome, Exception):
+                logger.warning("Error with %s: %s", name, outcome)
+                results[name] = f"Error: {outcome}"
+            else:
+                results[name] = outcome
+        return results
+    
+    async def agenerate_first(self, prompt: str, names: Optional[List[str]] = None,
+                              hedge_delay: Optional[float] = None, max_attempts: int = 2, **kwargs) -> str:
+        """Async counterpart of generate_first; losing requests are cancelled."""
+        attempts = self._attempt_order(names, max_attempts)
+        with span("llm.hedged_generate", attempts=len(attempts)) as hedge_span:
+            tasks: Dict[asyncio.Task, Tuple[int, str]] = {}
+            errors: List[Exception] = []
+            next_launch = time.perf_counter()
+            try:
+                while True:
+                    if len(tasks) < len(attempts) and time.perf_counter() >= next_launch:
+                        name = attempts[len(tasks)]
+                        if tasks:
+                            LLM_HEDGES.inc(provider=name)
+                        attempt_kwargs = dict(kwargs, coalesce=False) if tasks else kwargs
+                        task = asyncio.ensure_future(self._atimed_generate(name, prompt, attempt_kwargs))
+                        tasks[task] = (len(tasks), name)
+                        next_launch = time.perf_counter() + (hedge_delay if hedge_delay is not None
+                                                             else self.hedge_delay(name))
+                        continue
+                    pending = [t for t in tasks if not t.done()]
+                    if not pending and len(tasks) == len(attempts):
+                        raise errors[-1]
+                    if not pending:
+                        next_launch = time.perf_counter()
+                        continue
+                    timeout = max(0.0, next_launch - time.perf_counter()) if len(tasks) < len(attempts) else None
+                    done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        attempt, name = tasks[task]
+                        if task.exception() is not None:
+                            logger.warning("Error with %s: %s", name, task.exception())
+                            errors.append(task.exception())
+                            next_launch = time.perf_counter()
+                            continue
+                        if attempt:
+                            LLM_HEDGE_WINS.inc(provider=name)
+                        hedge_span.set_attribute("winner", name)
+                        hedge_span.set_attribute("winning_attempt", attempt)
+                        return task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+    
+    def _attempt_order(self, names: Optional[List[str]], max_attempts: int) -> List[str]:
+        names = [name for name in (names or self._providers) if name in self._providers]
+        if not names:
+            raise ValueError("No LLM providers available")
+        return [names[i % len(names)] for i in range(max(1, max_attempts))]
+    
+    def _timed_generate(self, name: str, prompt: str, kwargs: Dict[str, Any]) -> str:
+        provider = self._providers[name]
+        if provider.reports_latency:
+            token = _latency_recorder.set(functools.partial(self.record_latency, name))
+            try:
+                return provider.generate_text(prompt, **kwargs)
+            finally:
+                _latency_recorder.reset(token)
+        start = time.perf_counter()
+        text = provider.generate_text(prompt, **kwargs)
+        self.record_latency(name, time.perf_counter() - start)
+        return text
+    
+    async def _atimed_generate(self, name: str, prompt: str, kwargs: Dict[str, Any]) -> str:
+        provider = self._providers[name]
+        if provider.reports_latency:
+            token = _latency_recorder.set(functools.partial(self.record_latency, name))
+            try:
+                return await provider.agenerate_text(prompt, **kwargs)
+            finally:
+                _latency_recorder.reset(token)
+        start = time.perf_counter()
+        text = await provider.agenerate_text(prompt, **kwargs)
+        self.record_latency(name, time.perf_counter() - start)
+        return text
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool shared by this registry's concurrent calls (created on first use)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+            return self._executor
+
+class HedgedProvider(LLMProvider):
+    """
+    LLM provider that answers through LLMRegistry.generate_first.
+    
+    Lets code written against a single provider (such as GeneralizedEntityLinker)
+    hedge its calls: each prompt goes to the providers in `names`, with backups
+    sent after the registry's hedge delay.
+    """
+    
+    def __init__(self, registry: LLMRegistry, names: Optional[List[str]] = None,
+                 hedge_delay: Optional[float] = None, max_attempts: int = 2):
+        self.registry = registry
+        self.names = names
+        self.hedge_delay = hedge_delay
+        self.max_attempts = max_attempts
+    
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        return self.registry.generate_first(prompt, self.names, self.hedge_delay, self.max_attempts, **kwargs)
+    
+    async def agenerate_text(self, prompt: str, **kwargs) -> str:
+        return await self.registry.agenerate_first(prompt, self.names, self.hedge_delay, self.max_attempts, **kwargs)
+    
+    def get_name(self) -> str:
+        return (self.names or self.registry.list_available() or ["hedged"])[0]
@@ -0,0 +1,229 @@
+"""
+Offline DBpedia knowledge base backed by a local label index.
+
+`build_label_index` reads DBpedia labels, instance types and redirects dumps
+(N-Triples / Turtle-as-N-Triples, optionally .gz or .bz2 compressed) once and
+writes a compact SQLite index. `LocalDBpediaKnowledgeBase` answers label lookups
+from that index without network access or loading the dump into memory.
+"""
+
+import bz2
+import gzip
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .knowledge_base import KnowledgeBase, EntityCandidate
+
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+DBO_REDIRECTS = "http://dbpedia.org/ontology/wikiPageRedirects"
+
+_TRIPLE_RE = re.compile(
+    r'^<([^>]*)>\s+<([^>]*)>\s+'
+    r'(?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:@([A-Za-z0-9-]+)|\^\^<[^>]*>)?)'
+    r'\s*\.\s*$'
+)
+_ESCAPE_RE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(literal: str) -> str:
+    def replace(match):
+        esc = match.group(1)
+        if esc[0] in "uU":
+            return chr(int(esc[1:], 16))
+        return _ESCAPES.get(esc, esc)
+    return _ESCAPE_RE.sub(replace, literal)
+
+
+def parse_ntriples_line(line: str) -> Optional[Tuple[str, str, str, Optional[str]]]:
+    """
+    Parse one N-Triples line into (subject, predicate, object, language).
+    Literal objects are unescaped; language is None for IRIs and untagged literals.
+    Returns None for comments, blank lines and unparseable lines.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    match = _TRIPLE_RE.match(line)
+    if not match:
+        return None
+    subject, predicate, iri, literal, lang = match.groups()
+    if iri is not None:
+        return subject, predicate, iri, None
+    return subject, predicate, _unescape(literal), lang
+
+
+def _open_dump(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _iter_triples(paths: Iterable[str], predicate: str) -> Iterator[Tuple[str, str, Optional[str]]]:
+    for path in paths:
+        with _open_dump(path) as f:
+            for line in f:
+                triple = parse_ntriples_line(line)
+                if triple is not None and triple[1] == predicate:
+                    yield triple[0], triple[2], triple[3]
+
+
+def _insert_batched(conn: sqlite3.Connection, sql: str, rows: Iterable[Tuple], batch_size: int) -> int:
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def build_label_index(
+    index_path: str,
+    labels_files: Iterable[str],
+    types_files: Iterable[str] = (),
+    redirects_files: Iterable[str] = (),
+    language: str = "en",
+    batch_size: int = 50000
+) -> Dict[str, int]:
+    """
+    Build (or rebuild) a SQLite label index from DBpedia dump files.
+
+    Args:
+        index_path: Output SQLite file.
+        labels_files: Dumps containing rdfs:label triples (e.g. labels_lang=en.ttl.bz2).
+        types_files: Dumps containing rdf:type triples (e.g. instance-types_lang=en_specific.ttl.bz2).
+        redirects_files: Dumps containing dbo:wikiPageRedirects triples.
+        language: Only labels with this language tag are indexed.
+        batch_size: Rows inserted per transaction batch.
+    Returns:
+        Dict with the number of labels, types and redirects indexed.
+    """
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE labels (label TEXT NOT NULL, uri TEXT NOT NULL)")
+    conn.execute("CREATE TABLE types (uri TEXT NOT NULL, type TEXT NOT NULL)")
+    conn.execute("CREATE TABLE redirects (source TEXT PRIMARY KEY, target TEXT NOT NULL) WITHOUT ROWID")
+    counts = {
+        "labels": _insert_batched(
+            conn, "INSERT INTO labels VALUES (?, ?)",
+            ((label, uri) for uri, label, lang in _iter_triples(labels_files, RDFS_LABEL) if lang == language),
+            batch_size,
+        ),
+        "types": _insert_batched(
+            conn, "INSERT INTO types VALUES (?, ?)",
+            ((uri, type_uri) for uri, type_uri, _ in _iter_triples(types_files, RDF_TYPE)),
+            batch_size,
+        ),
+        "redirects": _insert_batched(
+            conn, "INSERT OR REPLACE INTO redirects VALUES (?, ?)",
+            ((source, target) for source, target, _ in _iter_triples(redirects_files, DBO_REDIRECTS)),
+            batch_size,
+        ),
+    }
+    conn.execute("CREATE INDEX idx_labels_label ON labels (label)")
+    conn.execute("CREATE INDEX idx_labels_uri ON labels (uri)")
+    conn.execute("CREATE INDEX idx_types_uri ON types (uri)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return counts
+
+
+class LocalDBpediaKnowledgeBase(KnowledgeBase):
+    """
+    DBpedia knowledge base answered from a local index built by build_label_index.
+
+    Lookups match the exact label, and also the label with underscores replaced by
+    spaces (so canonical names like "Apple_Inc." match the label "Apple Inc.").
+    Redirect pages are resolved to their targets.
+    """
+
+    def __init__(self, index_path: str):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"DBpedia label index not found: {index_path}")
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _query(self, sql: str, params: Tuple) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _resolve(self, uri: str) -> str:
+        rows = self._query("SELECT target FROM redirects WHERE source = ?", (uri,))
+        return rows[0][0] if rows else uri
+
+    def _types(self, uri: str) -> List[str]:
+        return [row[0] for row in self._query("SELECT type FROM types WHERE uri = ?", (uri,))]
+
+    def search_entities(self, label: str, context: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[EntityCandidate]:
+        from .linker import calculate_context_score
+
+        variants = list(dict.fromkeys([label, label.replace("_", " ")]))
+        placeholders = ", ".join("?" for _ in variants)
+        rows = self._query(f"SELECT uri, label FROM labels WHERE label IN ({placeholders}) LIMIT ?",
+                           (*variants, limit))
+        candidates = []
+        seen = set()
+        for uri, label_text in rows:
+            uri = self._resolve(uri)
+            if uri in seen:
+                continue
+            seen.add(uri)
+            types = self._types(uri)
+            score = calculate_context_score(uri, " ".join(types), "", context) if context else 0.5
+            dbo_types = [t for t in types if t.startswith("http://dbpedia.org/ontology/")]
+            candidates.append(EntityCandidate(
+                uri=uri,
+                label=label_text,
+                score=score,
+                entity_type=dbo_types[0] if dbo_types else None
+            ))
+        candidates.sort(key=lambda x: x.score, reverse=True)
+        return candidates[:limit]
+
+    def get_entity_info(self, uri: str) -> Optional[Dict[str, Any]]:
+        uri = self._resolve(uri)
+        labels = [row[0] for row in self._query("SELECT label FROM labels WHERE uri = ?", (uri,))]
+        types = self._types(uri)
+        if not labels and not types:
+            return None
+        return {"uri": uri, "labels": labels, "types": types}
+
+    def get_name(self) -> str:
+        return "LocalDBpedia"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a local DBpedia label index from dump files.")
+    parser.add_argument("index_path", help="Output SQLite index file")
+    parser.add_argument("--labels", nargs="+", required=True, help="Labels dump file(s)")
+    parser.add_argument("--types", nargs="*", default=[], help="Instance types dump file(s)")
+    parser.add_argument("--redirects", nargs="*", default=[], help="Redirects dump file(s)")
+    parser.add_argument("--language", default="en", help="Label language to index (default: en)")
+    args = parser.parse_args()
+
+    counts = build_label_index(args.index_path, args.labels, args.types, args.redirects, args.language)
+    print(f"Indexed {counts['labels']} labels, {counts['types']} types, {counts['redirects']} redirects "
+          f"into {args.index_path}")
@@ -0,0 +1,472 @@
+"""
+Metrics and tracing for LLM calls, SPARQL queries, knowledge base searches and batch stages.
+
+A process-wide `MetricsRegistry` holds labelled counters, gauges and latency
+histograms that the HTTP pool, Gemini/SPARQL helpers, knowledge bases, linkers
+and batch stages update as they run. It renders the Prometheus text exposition
+format (`render_prometheus()`, or `start_metrics_server()` to serve /metrics).
+
+`span(name, **attributes)` times a call or chunk: its duration lands in the
+`span_duration_seconds` histogram, and finished spans are handed to any exporters
+registered with `add_span_exporter` (e.g. a `SpanRecorder`). After
+`use_opentelemetry()`, spans are also opened on an OpenTelemetry tracer. Spans
+opened inside another span (including in worker threads started through
+`batch_preprocessing.chunking`) record it as their parent.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Base class for labelled metrics; values are kept per label combination.
+
+    Args:
+        name: Metric name (Prometheus naming, e.g. "llm_calls_total").
+        help: One-line description.
+        labelnames: Names of the labels every sample carries.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down (e.g. requests in flight)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Increment the gauge for the duration of the block (in-flight tracking)."""
+        self.inc(1, **labels)
+        try:
+            yield
+        finally:
+            self.dec(1, **labels)
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram of observed values (latencies in seconds by default).
+
+    Args:
+        buckets: Upper bounds of the buckets, ascending; +Inf is added automatically.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Dict[str, Any]:
+        """Count, sum and cumulative bucket counts for one label combination."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            counts, total, count = (list(entry[0]), entry[1], entry[2]) if entry else ([0] * (len(self.buckets) + 1), 0.0, 0)
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            keys = list(self._values)
+        samples = []
+        for key in keys:
+            labels = self._labels(key)
+            snapshot = self.snapshot(**labels)
+            for bound, n in snapshot["buckets"]:
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), n))
+            samples.append((f"{self.name}_sum", labels, snapshot["sum"]))
+            samples.append((f"{self.name}_count", labels, snapshot["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics plus collector callbacks evaluated at export time.
+
+    Collectors return (name, kind, help, samples) tuples for values that are already
+    counted elsewhere (cache statistics, for example), so they cost nothing until exported.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        """Clear all recorded values (metrics and collectors stay registered)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def collect(self) -> List[Tuple[str, str, str, List[Sample]]]:
+        """Return (name, kind, help, samples) for every metric and collector; same-named families are merged."""
+        families = {m.name: (m.name, m.kind, m.help, m.samples()) for m in list(self._metrics.values())}
+        for collector in list(self._collectors):
+            for name, kind, help, samples in collector():
+                if name in families:
+                    families[name][3].extend(samples)
+                else:
+                    families[name] = (name, kind, help, list(samples))
+        return list(families.values())
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Plain-dict view of all samples, e.g. for JSON reports: {name: [{"labels": ..., "value": ...}]}."""
+        snapshot: Dict[str, List[Dict[str, Any]]] = {}
+        for _, _, _, samples in self.collect():
+            for sample_name, labels, value in samples:
+                snapshot.setdefault(sample_name, []).append({"labels": labels, "value": value})
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, kind, help, samples in self.collect():
+            if not samples:
+                continue
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+                         for sample_name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _metrics
+
+
+def render_prometheus() -> str:
+    """Render the process-wide registry in the Prometheus text format."""
+    return _metrics.render_prometheus()
+
+
+def start_metrics_server(port: int = 9464, addr: str = "0.0.0.0"):
+    """
+    Serve the process-wide registry at http://addr:port/metrics from a daemon thread.
+    Returns the server; call shutdown() on it to stop serving.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@dataclass
+class Span:
+    """A timed operation; times are epoch seconds, ids are hex strings (OpenTelemetry-compatible widths)."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time: float = 0.0
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time if self.end_time is not None else time.time()) - self.start_time
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "attributes": dict(self.attributes),
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class SpanRecorder:
+    """Span exporter keeping the most recent finished spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def __call__(self, span: Span):
+        self.spans.append(span)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [span.to_dict() for span in list(self.spans)]
+
+    def clear(self):
+        self.spans.clear()
+
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+_span_exporters: List[Callable[[Span], None]] = []
+_tracer = None
+
+
+def add_span_exporter(exporter: Callable[[Span], None]):
+    """Register a callable that receives every finished span."""
+    _span_exporters.append(exporter)
+
+
+def remove_span_exporter(exporter: Callable[[Span], None]):
+    if exporter in _span_exporters:
+        _span_exporters.remove(exporter)
+
+
+def use_opentelemetry(tracer=None, enabled: bool = True):
+    """
+    Also open every span on an OpenTelemetry tracer (requires `opentelemetry-api`).
+    Args:
+        tracer: Tracer to use (default: opentelemetry.trace.get_tracer("hybrid_linking")).
+        enabled: False turns the bridge off again.
+    """
+    global _tracer
+    if not enabled:
+        _tracer = None
+        return
+    if tracer is None:
+        from opentelemetry import trace
+        tracer = trace.get_tracer("hybrid_linking")
+    _tracer = tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time a block as a span named `name` with the given attributes.
+
+    The duration is observed in span_duration_seconds{span=name}; failures are counted in
+    span_errors_total{span=name} and re-raised. Attributes may be added via span.set_attribute.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}",
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent.span_id if parent is not None else None,
+        start_time=time.time(),
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    otel = _tracer.start_as_current_span(name, attributes=attributes) if _tracer is not None else None
+    otel_span = otel.__enter__() if otel is not None else None
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        SPAN_ERRORS.inc(span=name)
+        if otel_span is not None:
+            otel_span.record_exception(e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        current.end_time = current.start_time + elapsed
+        _current_span.reset(token)
+        SPAN_DURATION.observe(elapsed, span=name)
+        if otel is not None:
+            for key, value in current.attributes.items():
+                if key not in attributes:
+                    otel_span.set_attribute(key, value)
+            otel.__exit__(None, None, None)
+        for exporter in list(_span_exporters):
+            exporter(current)
+
+
+def traced(name: str):
+    """Decorator running a function or coroutine function inside span(name)."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+SPAN_DURATION = _metrics.histogram("span_duration_seconds", "Duration of traced calls and chunks", ["span"])
+SPAN_ERRORS = _metrics.counter("span_errors_total", "Traced calls and chunks that raised", ["span"])
+
+# Shared metric families updated across modules
+HTTP_REQUESTS = _metrics.counter("http_requests_total", "HTTP requests by host, method and status", ["host", "method", "status"])
+HTTP_DURATION = _metrics.histogram("http_request_duration_seconds", "HTTP request latency", ["host", "method"])
+HTTP_IN_FLIGHT = _metrics.gauge("http_requests_in_flight", "HTTP requests currently in flight", ["host"])
+HTTP_BYTES_SENT = _metrics.counter("http_request_bytes_total", "Bytes sent (URL and body)", ["host"])
+HTTP_BYTES_RECEIVED = _metrics.counter("http_response_bytes_total", "Response body bytes received", ["host"])
+LLM_CALLS = _metrics.counter("llm_calls_total", "LLM generate calls by provider and outcome (ok, cache_hit, error)", ["provider", "outcome"])
+LLM_DURATION = _metrics.histogram("llm_call_duration_seconds", "LLM call latency including retries", ["provider"])
+LLM_PROMPT_CHARS = _metrics.counter("llm_prompt_chars_total", "Characters sent in LLM prompts (cache misses)", ["provider"])
+LLM_HEDGES = _metrics.counter("llm_hedged_requests_total", "Backup LLM requests sent by hedged calls", ["provider"])
+LLM_HEDGE_WINS = _metrics.counter("llm_hedge_wins_total", "Hedged calls answered by a backup request", ["provider"])
+SPARQL_QUERIES = _metrics.counter("sparql_queries_total", "SPARQL queries by outcome", ["outcome"])
+SPARQL_DURATION = _metrics.histogram("sparql_query_duration_seconds", "SPARQL query latency including retries")
+KB_SEARCHES = _metrics.counter("kb_searches_total", "Knowledge base searches by knowledge base and outcome", ["kb", "outcome"])
+KB_DURATION = _metrics.histogram("kb_search_duration_seconds", "Knowledge base search latency", ["kb"])
+COALESCED_REQUESTS = _metrics.counter("coalesced_requests_total", "Requests that shared an identical in-flight call", ["group"])
+SINGLE_FLIGHT_IN_FLIGHT = _metrics.gauge("single_flight_in_flight", "Distinct coalescable requests in flight", ["group"])
+RETRIES = _metrics.counter("retries_total", "Retries of transient failures")
+RATE_LIMIT_WAIT = _metrics.counter("rate_limit_wait_seconds_total", "Seconds spent waiting for the Gemini rate limiter")
+WORK_UNITS = _metrics.counter("work_units_total", "Work units finished by distributed workers, by outcome (done, failed, lost)", ["outcome"])
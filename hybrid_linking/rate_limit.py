@@ -0,0 +1,161 @@
+"""
+Token-bucket rate limiting for LLM calls.
+
+`RateLimiter` keeps two buckets, requests per minute and tokens per minute,
+and every Gemini call site acquires from the process-wide limiter before each
+HTTP request. Acquiring reserves capacity immediately and then waits until the
+reservation is covered, so callers are served in order and throughput settles
+at exactly the configured ceiling. With `state_path`, the bucket levels live in
+a lock-protected file so several processes on one host share one quota.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .metrics import RATE_LIMIT_WAIT
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for quota purposes (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket that allows its level to go negative.
+
+    A reservation larger than the current level is granted at once, and the caller
+    waits until the refill brings the level back to zero. This serves callers in
+    reservation order without a separate queue.
+
+    Args:
+        rate_per_minute: Refill rate.
+        capacity: Maximum level (burst size); defaults to one second of refill, minimum 1.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.time()
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """Take amount from the bucket and return the seconds to wait before using it."""
+        now = time.time() if now is None else now
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def state(self) -> Tuple[float, float]:
+        return self.level, self.updated
+
+    def restore(self, state: Tuple[float, float]):
+        self.level, self.updated = state
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter with blocking and async acquire.
+
+    Args:
+        rpm: Requests per minute (None or 0 = unlimited).
+        tpm: Tokens per minute (None or 0 = unlimited).
+        state_path: Optional file holding the bucket state, shared by every process
+            that uses the same path (requires fcntl, i.e. a POSIX system).
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, state_path: Optional[str] = None):
+        self.buckets: Dict[str, TokenBucket] = {}
+        if rpm:
+            self.buckets["requests"] = TokenBucket(rpm)
+        if tpm:
+            self.buckets["tokens"] = TokenBucket(tpm)
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets)
+
+    def _reserve_all(self, tokens: int) -> float:
+        amounts = {"requests": 1, "tokens": tokens}
+        now = time.time()
+        return max((bucket.reserve(amounts[name], now) for name, bucket in self.buckets.items()), default=0.0)
+
+    def _reserve_shared(self, tokens: int) -> float:
+        import fcntl
+
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as f:
+                raw = f.read()
+                state = json.loads(raw) if raw.strip() else {}
+                for name, bucket in self.buckets.items():
+                    if name in state:
+                        bucket.restore(tuple(state[name]))
+                wait = self._reserve_all(tokens)
+                state.update({name: bucket.state() for name, bucket in self.buckets.items()})
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+        finally:
+            os.close(fd)  # releases the lock
+        return wait
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens` tokens; return the seconds to wait before sending."""
+        if not self.buckets:
+            return 0.0
+        with self._lock:
+            wait = self._reserve_shared(tokens) if self.state_path else self._reserve_all(tokens)
+            self.waited_seconds += wait
+        if wait > 0:
+            RATE_LIMIT_WAIT.inc(wait)
+        return wait
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request with `tokens` tokens may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Async counterpart of acquire; waits without blocking the event loop."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide Gemini rate limiter, created on first use from the environment:
+        GEMINI_RPM, GEMINI_TPM (unset or 0 = unlimited), GEMINI_RATE_LIMIT_FILE (share across processes).
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    rpm=float(os.getenv("GEMINI_RPM", "0")),
+                    tpm=float(os.getenv("GEMINI_TPM", "0")),
+                    state_path=os.getenv("GEMINI_RATE_LIMIT_FILE") or None,
+                )
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Replace the process-wide rate limiter (None resets it to the environment default)."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
@@ -0,0 +1,133 @@
+"""
+Retries with exponential backoff and full jitter for transient HTTP failures.
+
+Rate limiting (429), server errors (5xx), timeouts and dropped connections are
+retried; every other error is raised immediately. Defaults come from the
+environment: LLM_MAX_RETRIES (default 3), LLM_RETRY_BASE_DELAY (seconds,
+default 1.0) and LLM_RETRY_MAX_DELAY (seconds, default 30).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from .metrics import RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for errors worth retrying: 408/429/5xx responses, timeouts and connection failures."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import requests
+        if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+            return True
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+        if isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)):
+            return True
+    except ImportError:
+        pass
+    return False
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if the error carries one."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter delay before retry number attempt (0-based): uniform in [0, min(max_delay, base_delay * 2**attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class RetryPolicy:
+    """
+    How often and how long to wait between retries of transient failures.
+
+    Args:
+        max_retries: Retries after the first attempt (0 disables retrying).
+        base_delay: Backoff ceiling for the first retry, doubled for each further retry.
+        max_delay: Upper bound on any single wait.
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None):
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3")) if max_retries is None else max_retries
+        self.base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0")) if base_delay is None else base_delay
+        self.max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "30")) if max_delay is None else max_delay
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def call(self, fn: Callable[..., T], *args: Any,
+             on_retry: Optional[Callable[[BaseException], None]] = None, **kwargs: Any) -> T:
+        """
+        Call fn(*args, **kwargs), retrying transient failures with backoff.
+        on_retry is called with the error before each retry.
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = self.delay(attempt, e)
+                logger.warning("Transient error (%s); retry %d/%d in %.2fs", e, attempt + 1, self.max_retries, delay)
+                RETRIES.inc()
+                if on_retry is not None:
+                    on_retry(e)
+                time.sleep(delay)
+                attempt += 1
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args: Any,
+                    on_retry: Optional[Callable[[BaseException], None]] = None, **kwargs: Any) -> T:
+        """Async counterpart of call for coroutine functions."""
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = self.delay(attempt, e)
+                logger.warning("Transient error (%s); retry %d/%d in %.2fs", e, attempt + 1, self.max_retries, delay)
+                RETRIES.inc()
+                if on_retry is not None:
+                    on_retry(e)
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -0,0 +1,148 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When many threads or tasks ask for the same thing at once (a burst of articles
+all mentioning the same entity), only the first caller for a key performs the
+request; the others wait for it and receive the same result or exception. Unlike
+the response caches, nothing is kept once the call finishes, so failures are not
+remembered and the next caller simply tries again.
+
+Gemini calls are coalesced on the model and normalized prompt (the response cache
+key) in the "llm" group; SPARQL queries on the endpoint and whitespace-normalized
+query in the "sparql" group.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .metrics import COALESCED_REQUESTS, SINGLE_FLIGHT_IN_FLIGHT
+
+
+class _Call:
+    """One in-flight thread-path call, the listeners of its callers and the outcome shared with its waiters."""
+    __slots__ = ("event", "result", "error", "listeners")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.listeners: List[Callable[..., None]] = []
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    Args:
+        name: Group name used as the `group` label of coalesced_requests_total.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs), or wait for the identical call already in flight for key.
+        Args:
+            key: Identity of the request (callers with equal keys share one call).
+            fn: Function performing the request.
+        Returns:
+            fn's result; if fn raised, every waiter raises the same exception.
+        """
+        return self.do_notify(key, lambda notify, *a, **kw: fn(*a, **kw), None, *args, **kwargs)
+
+    def do_notify(self, key: Hashable, fn: Callable[..., Any], listener: Optional[Callable[..., None]],
+                  *args, **kwargs) -> Any:
+        """
+        Like do, for functions reporting progress: fn is called as fn(notify, *args, **kwargs), and
+        every notify(*event) is passed to the listener of each caller sharing the call (the leader
+        and every waiter that joined before the event).
+        Args:
+            key: Identity of the request (callers with equal keys share one call).
+            fn: Function performing the request, taking notify as its first argument.
+            listener: This caller's listener (None = not interested).
+        Returns:
+            fn's result; if fn raised, every waiter raises the same exception.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            if listener is not None:
+                call.listeners.append(listener)
+        if not leader:
+            COALESCED_REQUESTS.inc(group=self.name)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        def notify(*event: Any):
+            with self._lock:
+                listeners = list(call.listeners)
+            for notify_listener in listeners:
+                notify_listener(*event)
+
+        SINGLE_FLIGHT_IN_FLIGHT.inc(group=self.name)
+        try:
+            call.result = fn(notify, *args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            SINGLE_FLIGHT_IN_FLIGHT.dec(group=self.name)
+            call.event.set()
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Async counterpart of do: await fn(*args, **kwargs), or the identical call already in flight.
+
+        Calls are shared within one event loop. The shared call runs as its own task, so
+        cancelling one waiter does not cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = loop.create_task(fn(*args, **kwargs))
+        if leader:
+            SINGLE_FLIGHT_IN_FLIGHT.inc(group=self.name)
+            task.add_done_callback(lambda done: self._forget(task_key, done))
+        else:
+            COALESCED_REQUESTS.inc(group=self.name)
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[int, Hashable], task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+        SINGLE_FLIGHT_IN_FLIGHT.dec(group=self.name)
+        if not task.cancelled():
+            task.exception()  # retrieved here so an abandoned failure is not reported as unhandled
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently in flight (thread and async paths)."""
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Return the process-wide single-flight group with the given name, creating it on first use."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
@@ -0,0 +1,133 @@
+"""
+Label lookup cache for DBpedia SPARQL queries.
+
+Caches the rows returned for a label, per endpoint and query shape ("kind"),
+so repeated lookups skip the round-trip. Labels that resolve to nothing are
+cached too (negative caching) with a shorter TTL. Entries carry the time they
+were fetched, and the whole cache can be exported and re-imported to ship a
+pre-warmed cache to workers.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import TieredCache, cache_metric_families, create_cache_from_env
+from .metrics import get_metrics
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+
+class SPARQLResultCache:
+    """
+    Label -> result rows cache shared by all DBpedia lookup paths.
+
+    Args:
+        cache: Underlying key/value store (memory-only TieredCache if omitted).
+        ttl: Lifetime in seconds of entries with at least one row.
+        negative_ttl: Lifetime in seconds of entries with no rows.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None, ttl: Optional[float] = DEFAULT_TTL,
+                 negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL):
+        self.cache = cache if cache is not None else TieredCache()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    @property
+    def stats(self):
+        return self.cache.stats
+
+    @staticmethod
+    def make_key(kind: str, endpoint: str, label: str) -> str:
+        digest = hashlib.sha256(f"{endpoint}\x00{label}".encode("utf-8")).hexdigest()
+        return f"sparql:{kind}:{digest}"
+
+    def get(self, kind: str, endpoint: str, label: str, limit: Optional[int] = None) -> Optional[List[List[Any]]]:
+        """
+        Return cached rows for a label, or None if there is no usable entry.
+        An empty list is a cached miss. An entry fetched with a smaller LIMIT
+        than requested is only used if it was exhaustive.
+        """
+        entry = self.cache.get(self.make_key(kind, endpoint, label))
+        if entry is None:
+            return None
+        rows = entry["rows"]
+        cached_limit = entry.get("limit")
+        if limit is not None and cached_limit is not None and cached_limit < limit and len(rows) >= cached_limit:
+            return None
+        return rows[:limit] if limit is not None else rows
+
+    def set(self, kind: str, endpoint: str, label: str, rows: List[List[Any]],
+            limit: Optional[int] = None, fetched_at: Optional[float] = None):
+        """Store the rows for a label. Empty results use the negative TTL."""
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        ttl = self.ttl if rows else self.negative_ttl
+        entry = {
+            "kind": kind,
+            "endpoint": endpoint,
+            "label": label,
+            "limit": limit,
+            "rows": [list(row) for row in rows],
+            "fetched_at": fetched_at,
+        }
+        expires_at = fetched_at + ttl if ttl is not None else None
+        self.cache.set(self.make_key(kind, endpoint, label), entry, expires_at=expires_at)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Return all live entries as JSON-serializable dicts (see warm())."""
+        return [value for _, value, _ in self.cache.items()]
+
+    def warm(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """
+        Load entries produced by export(). Each entry keeps its original
+        fetched_at timestamp, so expiry is computed from when it was fetched.
+        Returns the number of entries loaded (already-expired entries are skipped).
+        """
+        loaded = 0
+        now = time.time()
+        for entry in entries:
+            ttl = self.ttl if entry["rows"] else self.negative_ttl
+            if ttl is not None and entry["fetched_at"] + ttl <= now:
+                continue
+            self.set(entry["kind"], entry["endpoint"], entry["label"], entry["rows"],
+                     limit=entry.get("limit"), fetched_at=entry["fetched_at"])
+            loaded += 1
+        return loaded
+
+
+_sparql_cache: Optional[SPARQLResultCache] = None
+_sparql_cache_lock = threading.Lock()
+
+
+def get_sparql_cache() -> SPARQLResultCache:
+    """
+    Return the process-wide SPARQL cache, created on first use from the
+    SPARQL_CACHE_* environment variables (PATH, TTL, MAX_ENTRIES, DISABLED)
+    plus SPARQL_CACHE_NEGATIVE_TTL.
+    """
+    global _sparql_cache
+    if _sparql_cache is None:
+        with _sparql_cache_lock:
+            if _sparql_cache is None:
+                ttl = os.getenv("SPARQL_CACHE_TTL")
+                negative_ttl = os.getenv("SPARQL_CACHE_NEGATIVE_TTL")
+                _sparql_cache = SPARQLResultCache(
+                    cache=create_cache_from_env("SPARQL_CACHE", name="sparql"),
+                    ttl=float(ttl) if ttl else DEFAULT_TTL,
+                    negative_ttl=float(negative_ttl) if negative_ttl else DEFAULT_NEGATIVE_TTL,
+                )
+    return _sparql_cache
+
+
+def set_sparql_cache(cache: Optional[SPARQLResultCache]):
+    """Replace the process-wide SPARQL cache (None resets it to the environment default)."""
+    global _sparql_cache
+    with _sparql_cache_lock:
+        _sparql_cache = cache
+
+
+get_metrics().add_collector(lambda: cache_metric_families([_sparql_cache.cache] if _sparql_cache is not None else []))